@@ -1,17 +1,38 @@
 # Main file for our Flask ATS application
 # --- THIS PYTHON CODE REMAINS THE SAME AS THE PREVIOUS VERSION ---
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, url_for
 import os
-import time # Added for simulating delay
-import random # Added for randomizing score
+import hashlib
+import json
+import multiprocessing
+import re
+import tempfile
+import time
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import extraction
+import scoring
 
 # Initialize the Flask application
 app = Flask(__name__)
 
 # Configuration (can be moved to a separate config file later)
-app.config['UPLOAD_FOLDER'] = 'uploads' # Folder to store uploaded resumes
+app.config['UPLOAD_FOLDER'] = 'uploads' # Folder to store uploaded resumes (named by content hash)
+app.config['CACHE_FOLDER'] = 'cache' # Extracted text and analysis results, keyed by content hashes
 app.config['ALLOWED_EXTENSIONS'] = {'txt', 'pdf', 'docx'} # Allowed resume file types
+app.config['ANALYSIS_WORKERS'] = 4 # Threads running extraction + analysis in the background
+app.config['ANALYSIS_QUEUE_LIMIT'] = 256 # Jobs queued or running at once; beyond this /upload answers 503
+app.config['JOB_RETENTION_SECONDS'] = 3600 # How long finished jobs stay available at /jobs/<id>
+app.config['RETRY_AFTER_SECONDS'] = 5 # Retry-After hint sent with a 503
+app.config['EXTRACTION_PROCESSES'] = 2 # Worker processes parsing PDF/DOCX files
+app.config['EXTRACTION_TIMEOUT_SECONDS'] = 30 # Give up on a batch of resumes (one upload, or one /rank request) whose text takes longer than this
+app.config['EXTRACTION_MAX_PAGES'] = extraction.MAX_PAGES # Pages read per resume
+app.config['EXTRACTION_MAX_CHARS'] = extraction.MAX_CHARS # Characters of text kept per resume
+app.config['RANK_MAX_RESUMES'] = 20000 # Resumes (uploads + stored hashes) accepted by one /rank request
+app.config['RANK_MAX_EXTRACTIONS'] = 64 # Resumes without cached text that /rank requests may extract at once; beyond this /rank answers 503
 
 # Ensure the upload folder exists
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
@@ -24,58 +45,350 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+# Parsing is CPU-bound pure Python, so it runs in worker processes rather than on the analysis threads
+extraction_pool = None
+extraction_pool_lock = threading.Lock()
+
+def get_extraction_pool():
+    """Returns the extraction process pool, starting it on first use."""
+    global extraction_pool
+    with extraction_pool_lock:
+        if extraction_pool is None:
+            # The pool is started from a request or analysis thread; forking a multithreaded process
+            # can copy locks another thread holds, so workers come from a fork server (or are spawned)
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            extraction_pool = ProcessPoolExecutor(max_workers=app.config['EXTRACTION_PROCESSES'],
+                                                  mp_context=multiprocessing.get_context(method))
+        return extraction_pool
+
+def reset_extraction_pool(old_pool):
+    """
+    Replaces a pool whose worker died or is stuck on a resume: its workers are
+    killed and the next resume gets a fresh pool. Other extractions still
+    running in the old pool fail.
+    """
+    global extraction_pool
+    with extraction_pool_lock:
+        if extraction_pool is old_pool:
+            extraction_pool = None
+    for process in list((old_pool._processes or {}).values()): # No public way to stop a busy worker
+        process.kill()
+    old_pool.shutdown(wait=False, cancel_futures=True)
+
+def extract_texts_from_resumes(filepaths):
+    """
+    Extracts the text of .txt, .pdf and .docx resumes in the extraction
+    process pool (see extraction.py), all files in parallel, reading at most
+    EXTRACTION_MAX_PAGES pages and EXTRACTION_MAX_CHARS characters of each.
+    The whole batch gets EXTRACTION_TIMEOUT_SECONDS; if any file is still
+    being read then, the pool is replaced so no worker stays stuck on it.
+    Returns one text per path, "" where extraction failed.
+    """
+    if not filepaths:
+        return []
+    pool = get_extraction_pool()
+    futures = []
+    try:
+        for filepath in filepaths:
+            futures.append(pool.submit(extraction.extract_text, filepath,
+                                       app.config['EXTRACTION_MAX_PAGES'], app.config['EXTRACTION_MAX_CHARS']))
+    except BrokenProcessPool as e:
+        print(f"Extraction pool is broken: {e}")
+        reset_extraction_pool(pool)
+    _, pending = wait(futures, timeout=app.config['EXTRACTION_TIMEOUT_SECONDS'])
+    if pending:
+        print(f"Extraction timed out with {len(pending)} of {len(filepaths)} resumes unread; restarting the extraction pool.")
+        reset_extraction_pool(pool)
+    texts = []
+    for filepath, future in zip(filepaths, futures):
+        if future in pending:
+            texts.append("")
+            continue
+        try:
+            texts.append(future.result())
+        except BrokenProcessPool as e:
+            print(f"Extraction worker died while reading {filepath}: {e}")
+            reset_extraction_pool(pool)
+            texts.append("")
+        except Exception as e:
+            print(f"Error extracting text from {filepath}: {e}")
+            texts.append("") # Empty string on error
+    return texts + [""] * (len(filepaths) - len(texts))
+
 def extract_text_from_resume(filepath):
+    """Text of one resume (see extract_texts_from_resumes); "" on failure."""
+    return extract_texts_from_resumes([filepath])[0]
+
+def analyze_resume_ai(resume_text, job_description_text):
+    """
+    Compares the resume against the job description with the term-frequency
+    scorer in scoring.py: cosine similarity of the two term vectors, the
+    terms they share and the job description terms the resume lacks.
+    """
+    t0 = time.perf_counter()
+    analysis_result = scoring.compare(resume_text, job_description_text)
+    print(f"Scored resume in {(time.perf_counter() - t0) * 1000:.2f} ms (similarity {analysis_result['similarity_score']:.2f})")
+    return analysis_result
+
+# --- Content-Addressed Storage & Cache ---
+# Uploads are stored as <sha256>.<ext>, hashed while they stream to disk, so a resume is kept once
+# however often, and under whatever name, it is sent. Extracted text is cached per stored file and
+# analysis results per (resume hash, job description hash), so a retried submission is answered
+# straight from disk.
+
+HASH_CHUNK = 64 * 1024
+
+def hash_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def save_upload(file, ext):
     """
-    Placeholder function to extract text from a resume file.
-    We will implement actual text extraction (from PDF, DOCX) later.
-    For now, it assumes a simple text file.
+    Streams an uploaded file into UPLOAD_FOLDER, hashing it on the way, and
+    returns (sha256 hex digest, path). A file already stored under that
+    hash is left as it is.
     """
-    # Simulate some processing time for extraction
-    time.sleep(0.5)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=app.config['UPLOAD_FOLDER'], suffix='.part')
     try:
-        # In a real app, use libraries like PyPDF2 for PDF, python-docx for DOCX
-        if filepath.lower().endswith('.txt'):
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f: # Added errors='ignore'
-                return f.read()
-        elif filepath.lower().endswith('.pdf'):
-            # Add PDF extraction logic here (e.g., using PyPDF2 or pdfminer.six)
-            print(f"PDF extraction not yet implemented for {filepath}")
-            return "Sample PDF text extracted. Lorem ipsum dolor sit amet, consectetur adipiscing elit. Ut enim ad minim veniam." # Placeholder
-        elif filepath.lower().endswith('.docx'):
-            # Add DOCX extraction logic here (e.g., using python-docx)
-            print(f"DOCX extraction not yet implemented for {filepath}")
-            return "Sample DOCX text extracted. Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua. Quis nostrud exercitation ullamco laboris nisi ut aliquip." # Placeholder
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(HASH_CHUNK)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        resume_hash = digest.hexdigest()
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{resume_hash}.{ext}")
+        if os.path.exists(filepath):
+            os.remove(tmp_path) # Seen before: keep the stored copy
         else:
-            # Handle case where file extension might be allowed but not handled
-            print(f"Text extraction not configured for this file type: {filepath}")
-            return ""
-    except Exception as e:
-        print(f"Error extracting text from {filepath}: {e}")
-        return "" # Return empty string on error
+            os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+    return resume_hash, filepath
 
-def analyze_resume_ai(resume_text, job_description_text):
+def cache_path(kind, key):
+    return os.path.join(app.config['CACHE_FOLDER'], kind, key)
+
+def read_cache(kind, key):
+    """Returns a cached entry's text, or None on a miss."""
+    try:
+        with open(cache_path(kind, key), 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def write_cache(kind, key, text):
+    """Stores an entry atomically, so a concurrent reader never sees half of it."""
+    path = cache_path(kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def extraction_settings_key():
+    # Everything besides the file that decides its extracted text: the extractor version and the limits
+    return f"x{extraction.EXTRACTOR_VERSION}_p{app.config['EXTRACTION_MAX_PAGES']}_c{app.config['EXTRACTION_MAX_CHARS']}"
+
+def analysis_cache_key(resume_hash, jd_hash):
+    # The scorer version and extraction settings are part of the key, so changing either never serves
+    # results computed by the old ones
+    return f"{resume_hash}_{jd_hash}_v{scoring.SCORER_VERSION}_{extraction_settings_key()}.json"
+
+def load_cached_analysis(resume_hash, jd_hash):
+    cached = read_cache('analysis', analysis_cache_key(resume_hash, jd_hash))
+    return json.loads(cached) if cached is not None else None
+
+def text_cache_key(filepath):
+    return f"{os.path.basename(filepath)}_{extraction_settings_key()}.txt"
+
+def cached_resume_texts(filepaths):
+    """Texts of stored resumes: read from the cache, or extracted (in parallel) and cached."""
+    keys = [text_cache_key(filepath) for filepath in filepaths]
+    texts = [read_cache('text', key) for key in keys]
+    missing = [i for i, text in enumerate(texts) if text is None]
+    for i, text in zip(missing, extract_texts_from_resumes([filepaths[i] for i in missing])):
+        texts[i] = text
+        if text:
+            write_cache('text', keys[i], text)
+    return texts
+
+def cached_resume_text(filepath):
+    """Text of a stored resume, extracted once and then read from the cache."""
+    return cached_resume_texts([filepath])[0]
+
+def stored_resume_path(resume_hash):
+    """Path of the stored upload with this hash, or None if there is none."""
+    if not re.fullmatch(r'[0-9a-f]{64}', resume_hash):
+        return None
+    for ext in sorted(app.config['ALLOWED_EXTENSIONS']):
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{resume_hash}.{ext}")
+        if os.path.exists(filepath):
+            return filepath
+    return None
+
+# /rank extracts the resumes it has no cached text for inside the request. Those extractions are
+# counted across requests and capped, so a large batch of new files cannot tie up the extraction
+# pool ahead of /upload jobs; a request that would go over the cap gets 503.
+rank_extractions = 0 # Extractions reserved by /rank requests in progress
+rank_extractions_lock = threading.Lock()
+
+def reserve_rank_extractions(count):
+    """Reserves count extractions for a /rank request; False if that would exceed RANK_MAX_EXTRACTIONS."""
+    global rank_extractions
+    with rank_extractions_lock:
+        if rank_extractions + count > app.config['RANK_MAX_EXTRACTIONS']:
+            return False
+        rank_extractions += count
+        return True
+
+def release_rank_extractions(count):
+    global rank_extractions
+    with rank_extractions_lock:
+        rank_extractions -= count
+
+# --- Analysis Jobs ---
+# /upload only saves the file and queues a job; the request worker is free again in milliseconds.
+# Jobs run on a small thread pool. A semaphore caps how many can be queued or running, so a burst
+# of uploads past that limit is turned away with 503 instead of piling up without bound. A resume
+# already being analyzed against the same job description joins the job in flight.
+# Every change to a job is also written to CACHE_FOLDER/jobs/<id>.json, so with several server
+# processes sharing the folders, a status poll answered by another process still finds the job.
+# The queue limit and joining a job in flight apply per process.
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+analysis_pool = ThreadPoolExecutor(max_workers=app.config['ANALYSIS_WORKERS'], thread_name_prefix='analysis')
+job_slots = threading.BoundedSemaphore(app.config['ANALYSIS_QUEUE_LIMIT'])
+jobs = {} # job_id -> job record (see submit_analysis_job)
+active_jobs = {} # (resume hash, job description hash) -> job_id of the queued or running job
+jobs_lock = threading.Lock()
+
+def job_expired(job, cutoff):
+    return job['status'] in (JOB_DONE, JOB_FAILED) and job['finished_at'] < cutoff
+
+def prune_jobs():
+    """Forgets finished jobs older than JOB_RETENTION_SECONDS, and deletes job files not written since then."""
+    cutoff = time.time() - app.config['JOB_RETENTION_SECONDS']
+    with jobs_lock:
+        expired = [job_id for job_id, job in jobs.items() if job_expired(job, cutoff)]
+        for job_id in expired:
+            del jobs[job_id]
+    try:
+        entries = list(os.scandir(os.path.join(app.config['CACHE_FOLDER'], 'jobs')))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass # Pruned by another process
+
+def save_job(job):
+    write_cache('jobs', f"{job['job_id']}.json", json.dumps(job))
+
+def load_job(job_id):
+    """A job record: this process's own, or one another process saved; None if unknown or expired."""
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+    if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+        return None
+    saved = read_cache('jobs', f"{job_id}.json")
+    if saved is None:
+        return None
+    job = json.loads(saved)
+    return None if job_expired(job, time.time() - app.config['JOB_RETENTION_SECONDS']) else job
+
+def update_job(job_id, **fields):
+    with jobs_lock:
+        jobs[job_id].update(fields)
+        job = dict(jobs[job_id])
+    save_job(job)
+
+def submit_analysis_job(filepath, resume_hash, original_filename, job_description, jd_hash):
+    """
+    Queues extraction + analysis of a stored resume and returns the job ID,
+    or the ID of the identical job already queued or running. Returns None
+    without queuing anything when ANALYSIS_QUEUE_LIMIT jobs are in progress.
     """
-    Placeholder for the core AI analysis function.
-    This is where we'll use sentence transformers or LLMs
-    to compare the resume against the job description.
-    """
-    print("AI Analysis Triggered (Placeholder)")
-    # Simulate analysis time more realistically
-    time.sleep(1.5) # Reduced delay slightly
-
-    # More detailed placeholder response
-    analysis_result = {
-        'similarity_score': 0.72, # Placeholder
-        'matched_keywords': ['python', 'flask', 'api design', 'sql', 'problem solving', 'git', 'docker', 'agile'], # Placeholder
-        'semantic_summary': 'Candidate profile shows strong alignment with backend development requirements, particularly in Python and API creation. SQL skills are mentioned, and familiarity with Git is noted. Communication seems clear. Further discussion on project specifics and Docker/Agile experience recommended.', # Placeholder AI insight
-        'warnings': ['Limited explicit mention of cloud platforms (AWS/Azure/GCP).', 'Frontend technology experience is not detailed.'], # Placeholder warnings
-        'candidate_strengths': ['Python (Flask)', 'API Development', 'SQL Database Interaction', 'Version Control (Git)', 'Problem Solving Approach'], # Placeholder
-        'potential_gaps': ['Cloud Deployment Experience', 'Frontend Frameworks (React/Vue/Angular)', 'NoSQL Database Knowledge', 'Specific Agile Methodology Depth'] # Placeholder
-    }
-    # Randomize score slightly for demo
-    analysis_result['similarity_score'] = round(random.uniform(0.50, 0.95), 2)
+    key = (resume_hash, jd_hash)
+    with jobs_lock:
+        if key in active_jobs:
+            return active_jobs[key]
+    if not job_slots.acquire(blocking=False):
+        return None
+    prune_jobs()
+    job_id = uuid.uuid4().hex
+    with jobs_lock:
+        if key in active_jobs: # Queued by another request meanwhile
+            job_slots.release()
+            return active_jobs[key]
+        jobs[job_id] = job = {
+            'job_id': job_id,
+            'status': JOB_QUEUED,
+            'filename': original_filename,
+            'submitted_at': time.time(),
+            'finished_at': None,
+            'result': None,
+            'error': None,
+        }
+        active_jobs[key] = job_id
+    try:
+        save_job(job)
+        analysis_pool.submit(run_analysis_job, job_id, filepath, resume_hash, original_filename, job_description, jd_hash)
+    except Exception:
+        with jobs_lock:
+            del jobs[job_id]
+            del active_jobs[key]
+        job_slots.release()
+        raise
+    return job_id
 
-    return analysis_result
+def run_analysis_job(job_id, filepath, resume_hash, original_filename, job_description, jd_hash):
+    """Worker side of a job: extracts the text, analyzes it, caches and records the outcome."""
+    update_job(job_id, status=JOB_RUNNING)
+    try:
+        # 1. Extract text from the stored resume file (or reuse the text extracted earlier)
+        print(f"[{job_id}] Attempting to extract text from: {filepath}")
+        resume_text = cached_resume_text(filepath)
+        if not resume_text:
+            print(f"[{job_id}] Failed to extract text from {filepath}.")
+            # The stored file is kept: it is shared by every upload with the same content and by /rank,
+            # and a failure here may be a timeout or a crashed extraction process rather than a bad file
+            update_job(job_id, status=JOB_FAILED, finished_at=time.time(),
+                       error=f"Could not extract text from the uploaded file '{original_filename}'. It might be empty, corrupted, or an unsupported format variant.")
+            return
+
+        # 2. Score the resume against the job description
+        print(f"[{job_id}] Starting AI analysis...")
+        analysis = analyze_resume_ai(resume_text, job_description)
+        print(f"[{job_id}] AI analysis complete.")
+
+        # 3. Cache the result for repeat submissions
+        write_cache('analysis', analysis_cache_key(resume_hash, jd_hash), json.dumps(analysis))
+
+        update_job(job_id, status=JOB_DONE, finished_at=time.time(), result={
+            "message": "Analysis successful.",
+            "filename": original_filename, # Return the original filename to the user
+            "resume_hash": resume_hash,
+            "analysis": analysis
+        })
+    except Exception as e:
+        print(f"[{job_id}] An unexpected error occurred during analysis for {original_filename}: {e}")
+        update_job(job_id, status=JOB_FAILED, finished_at=time.time(),
+                   error="An internal server error occurred. Please try again later.")
+    finally:
+        with jobs_lock:
+            active_jobs.pop((resume_hash, jd_hash), None)
+        job_slots.release()
 
 # --- Routes ---
 
@@ -87,7 +400,12 @@ def index():
 
 @app.route('/upload', methods=['POST'])
 def upload_resume():
-    """Handles resume file uploads and triggers analysis."""
+    """
+    Handles resume file uploads. Stores the file by content hash and answers
+    200 with the cached analysis when this resume was already analyzed against
+    this job description; otherwise queues the analysis and answers 202 with a
+    job ID at once, the outcome being served by /jobs/<id>.
+    """
     # Basic input validation
     if 'resume' not in request.files:
         return jsonify({"error": "No resume file part found in the request."}), 400
@@ -101,66 +419,172 @@ def upload_resume():
 
 
     if file and allowed_file(file.filename):
-        # NOTE: Using secure_filename is recommended in production
-        from werkzeug.utils import secure_filename
-        # Use secure_filename to prevent directory traversal issues
         original_filename = file.filename
-        safe_filename = secure_filename(original_filename)
-        # Consider adding a unique prefix/suffix (e.g., timestamp) to prevent overwrites
-        # filename = f"{int(time.time())}_{safe_filename}"
-        filename = safe_filename # Keep it simple for now
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        ext = original_filename.rsplit('.', 1)[1].lower()
+        jd_hash = hash_text(job_description)
 
         try:
-            file.save(filepath)
-
-            # 1. Extract text from the saved resume file
-            print(f"Attempting to extract text from: {filepath}")
-            resume_text = extract_text_from_resume(filepath)
-            if not resume_text:
-                 print(f"Failed to extract text from {filename}.")
-                 # Clean up failed upload
-                 if os.path.exists(filepath): os.remove(filepath)
-                 # Provide a more specific error message if possible
-                 return jsonify({"error": f"Could not extract text from the uploaded file '{original_filename}'. It might be empty, corrupted, or an unsupported format variant."}), 500
-
-            print(f"Successfully extracted text from {filename}.")
-
-            # 2. Perform AI Analysis (using the placeholder function for now)
-            print("Starting AI analysis...")
-            analysis = analyze_resume_ai(resume_text, job_description)
-            print("AI analysis complete.")
-
-            # 3. (Future) Store results in the database
+            # Stored by content hash: re-uploads are deduplicated and equal names no longer collide
+            resume_hash, filepath = save_upload(file, ext)
+            analysis = load_cached_analysis(resume_hash, jd_hash)
+            job_id = None if analysis is not None else submit_analysis_job(filepath, resume_hash, original_filename, job_description, jd_hash)
+        except Exception as e:
+            print(f"An unexpected error occurred during upload for {original_filename}: {e}")
+            return jsonify({"error": "An internal server error occurred. Please try again later."}), 500
 
-            # 4. Return analysis results
+        if analysis is not None:
+            print(f"Serving cached analysis for {original_filename} ({resume_hash[:12]}).")
             return jsonify({
-                "message": "Analysis successful.",
-                "filename": original_filename, # Return the original filename to the user
+                "message": "Analysis loaded from cache.",
+                "filename": original_filename,
+                "resume_hash": resume_hash,
+                "cached": True,
                 "analysis": analysis
                 }), 200
 
-        except Exception as e:
-            print(f"An unexpected error occurred during upload/analysis for {original_filename}: {e}")
-            # Clean up uploaded file if error occurs during processing
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                    print(f"Cleaned up file: {filepath}")
-                except OSError as rm_error:
-                    print(f"Error removing file {filepath}: {rm_error}")
-            # Return a generic server error message to the user
-            return jsonify({"error": f"An internal server error occurred. Please try again later."}), 500
-        finally:
-            # Optional: Decide whether to keep uploaded files after processing
-            pass
+        if job_id is None:
+            # Backpressure: the analysis queue is full, so tell the client to come back later
+            response = jsonify({"error": "The analyzer is busy. Please try again in a few seconds."})
+            response.headers['Retry-After'] = str(app.config['RETRY_AFTER_SECONDS'])
+            return response, 503
+
+        print(f"Queued analysis job {job_id} for {original_filename}.")
+        return jsonify({
+            "message": "Analysis queued.",
+            "job_id": job_id,
+            "status": JOB_QUEUED,
+            "filename": original_filename,
+            "resume_hash": resume_hash,
+            "status_url": url_for('job_status', job_id=job_id)
+            }), 202
 
     else:
         # Handle disallowed file types
         return jsonify({"error": f"File type not allowed. Please upload one of: {', '.join(app.config['ALLOWED_EXTENSIONS'])}"}), 400
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """
+    Status of an analysis job. While queued or running: {"job_id", "status", "filename"}.
+    Once done, the analysis response /upload used to return is merged in; once failed, "error".
+    """
+    job = load_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job ID."}), 404
+    body = {"job_id": job_id, "status": job['status'], "filename": job['filename']}
+    if job['status'] == JOB_DONE:
+        body.update(job['result'])
+    elif job['status'] == JOB_FAILED:
+        body['error'] = job['error']
+    return jsonify(body), 200
+
+@app.route('/rank', methods=['POST'])
+def rank_resumes():
+    """
+    Ranks many resumes against one job description. Takes a multipart form
+    ('resumes' files, 'resume_hashes' of earlier uploads, 'job_description',
+    optional 'top') or the same fields as JSON (without files). New files are
+    stored like /upload does; texts come from the cache or are extracted in
+    parallel, then all resumes are scored in one pass (scoring.rank). More
+    than RANK_MAX_EXTRACTIONS uncached resumes get 413; fewer than that, but
+    more than other /rank requests leave free, get 503. Both answers carry the
+    hashes of the resumes stored, so the retry needs no new upload.
+    """
+    t0 = time.perf_counter()
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "The JSON body must be an object."}), 400
+        files, hashes = [], data.get('resume_hashes') or []
+        job_description, top = str(data.get('job_description') or '').strip(), data.get('top')
+        if not isinstance(hashes, list):
+            return jsonify({"error": "resume_hashes must be a list."}), 400
+    else:
+        files = [f for f in request.files.getlist('resumes') if f.filename]
+        # One field per hash, or several hashes in one field separated by commas/whitespace
+        hashes = [h for field in request.form.getlist('resume_hashes') for h in re.split(r'[\s,]+', field) if h]
+        job_description, top = request.form.get('job_description', '').strip(), request.form.get('top')
+
+    if not job_description:
+        return jsonify({"error": "Job description cannot be empty."}), 400
+    if not files and not hashes:
+        return jsonify({"error": "No resumes given: upload 'resumes' files or pass 'resume_hashes'."}), 400
+    if len(files) + len(hashes) > app.config['RANK_MAX_RESUMES']:
+        return jsonify({"error": f"Too many resumes; at most {app.config['RANK_MAX_RESUMES']} per request."}), 400
+    try:
+        top = int(top) if top not in (None, '') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "top must be a whole number."}), 400
+    if top is not None and top < 1:
+        return jsonify({"error": "top must be at least 1."}), 400
+
+    candidates, errors = {}, [] # resume_hash -> (filepath, display name); duplicates are ranked once
+    for file in files:
+        if not allowed_file(file.filename):
+            errors.append({"filename": file.filename, "error": "File type not allowed."})
+            continue
+        resume_hash, filepath = save_upload(file, file.filename.rsplit('.', 1)[1].lower())
+        candidates.setdefault(resume_hash, (filepath, file.filename))
+    for resume_hash in hashes:
+        resume_hash = str(resume_hash).lower()
+        filepath = stored_resume_path(resume_hash)
+        if filepath is None:
+            errors.append({"resume_hash": resume_hash, "error": "No stored resume with this hash."})
+            continue
+        candidates.setdefault(resume_hash, (filepath, os.path.basename(filepath)))
+
+    resume_hashes = list(candidates)
+    filepaths = [candidates[h][0] for h in resume_hashes]
+    uncached = sum(1 for filepath in filepaths if not os.path.exists(cache_path('text', text_cache_key(filepath))))
+    if uncached > app.config['RANK_MAX_EXTRACTIONS']:
+        # Never fits, however long the client waits: no Retry-After
+        return jsonify({
+            "error": f"{uncached} of these resumes need their text extracted; at most {app.config['RANK_MAX_EXTRACTIONS']} "
+                     f"can be extracted per request. Rank them in smaller batches.",
+            "resume_hashes": resume_hashes,
+        }), 413
+    if not reserve_rank_extractions(uncached):
+        # Backpressure: other /rank requests are extracting, and this one would take the total over the cap
+        response = jsonify({
+            "error": f"{uncached} of these resumes need their text extracted, more than the server can take on now. Please retry shortly.",
+            "resume_hashes": resume_hashes,
+        })
+        response.headers['Retry-After'] = str(app.config['RETRY_AFTER_SECONDS'])
+        return response, 503
+    try:
+        texts = cached_resume_texts(filepaths)
+    finally:
+        release_rank_extractions(uncached)
+    scored = [i for i, text in enumerate(texts) if text]
+    for i, text in enumerate(texts):
+        if not text:
+            errors.append({"resume_hash": resume_hashes[i], "filename": candidates[resume_hashes[i]][1],
+                           "error": "Could not extract text from this resume."})
+
+    ranking = []
+    for position, (i, score, keywords) in enumerate(scoring.rank(job_description, [texts[i] for i in scored], top), 1):
+        resume_hash = resume_hashes[scored[i]]
+        ranking.append({
+            "rank": position,
+            "resume_hash": resume_hash,
+            "filename": candidates[resume_hash][1],
+            "similarity_score": score,
+            "matched_keywords": keywords,
+        })
+    seconds = time.perf_counter() - t0
+    print(f"Ranked {len(scored)} resumes in {seconds:.3f} s.")
+    return jsonify({
+        "message": "Ranking complete.",
+        "job_description_hash": hash_text(job_description),
+        "count": len(scored),
+        "ranking": ranking,
+        "errors": errors,
+        "seconds": round(seconds, 3)
+        }), 200
+
 # --- Running the App ---
 if __name__ == '__main__':
     # Debug mode is helpful during development
-    # Use a proper WSGI server like Gunicorn for production
+    # Use a proper WSGI server like Gunicorn for production; its worker processes must share
+    # UPLOAD_FOLDER and CACHE_FOLDER, where job status is kept for /jobs/<id>
     app.run(debug=True, host='0.0.0.0', port=5000) # Accessible on network if needed
@@ -0,0 +1,478 @@
+# Resume text extraction for .txt, .pdf and .docx files, in pure Python
+# These functions run in the extraction process pool (see app.py), so a heavy document only ever
+# occupies a worker process, never a Flask worker. Documents are read one page at a time and
+# extraction stops as soon as the page or character limit is reached: PDFs are memory-mapped and
+# only the objects a page needs are parsed, DOCX bodies are streamed out of the zip with iterparse.
+
+import itertools
+import mmap
+import os
+import re
+import zlib
+import zipfile
+from bisect import bisect_right
+from collections import namedtuple
+from xml.etree import ElementTree
+
+EXTRACTOR_VERSION = 1 # Bump whenever extract_text() can give a different text for the same file: cached texts are keyed by it
+MAX_PAGES = 20 # Pages read from a PDF or DOCX; later pages are ignored
+MAX_CHARS = 200_000 # Characters of text returned per resume
+MAX_STREAM_BYTES = 8 * 1024 * 1024 # Decompressed size allowed for a single PDF stream
+MAX_XML_BYTES = 32 * 1024 * 1024 # Uncompressed word/document.xml read from a DOCX
+MAX_FORM_DEPTH = 3 # Nesting of form XObjects followed for text
+MAX_CMAP_ENTRIES = 65536 # Code mappings read from one ToUnicode CMap, over all its ranges; the rest is ignored
+READ_CHUNK = 64 * 1024
+
+def extract_text(filepath, max_pages=MAX_PAGES, max_chars=MAX_CHARS):
+    """
+    Returns the text of a resume, read page by page until max_pages pages or
+    max_chars characters. Unsupported file types give ''. Parse errors are
+    raised to the caller.
+    """
+    ext = filepath.rsplit('.', 1)[-1].lower()
+    if ext == 'txt':
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read(max_chars)
+    iter_pages = {'pdf': iter_pdf_pages, 'docx': iter_docx_pages}.get(ext)
+    if iter_pages is None:
+        return ""
+    parts, size = [], 0
+    pages = iter_pages(filepath)
+    try:
+        for text in itertools.islice(pages, max_pages):
+            parts.append(text[:max_chars - size])
+            size += len(parts[-1])
+            if size >= max_chars:
+                break
+    finally:
+        pages.close() # Releases the mmap / zip member even when we stop early
+    return '\n'.join(parts).strip()
+
+def tidy_lines(text):
+    """Collapses runs of spaces and drops blank lines."""
+    lines = (re.sub(r'[ \t\xa0]+', ' ', line).strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+# --- PDF ---
+# Objects are located by scanning the mapped file for "N G obj" headers (later definitions win,
+# as incremental updates append), plus the members of compressed object streams on demand.
+# Page text comes from the Tj/TJ/'/" operators of each page's content streams, decoded through
+# the font's ToUnicode CMap when it has one.
+
+Ref = namedtuple('Ref', 'num gen')
+PDFStream = namedtuple('PDFStream', 'dict start')
+
+class Name(str):
+    """A PDF name such as /Font, stored without the slash."""
+
+class Operator(str):
+    """A bare keyword: a content-stream operator (Tj, BT, ...) or an unknown token."""
+
+_END = object() # End of data
+_CLOSE = object() # ">>" or "]"
+
+_WS = rb'\x00\t\n\x0c\r '
+_REGULAR = rb'[^\x00\t\n\x0c\r /<>\[\]()%{}]'
+_TOKEN_RE = re.compile(rb'(?:[' + _WS + rb']|%[^\r\n]*)*(?:'
+                       rb'(?P<ref>(?P<rnum>\d+)[' + _WS + rb']+(?P<rgen>\d+)[' + _WS + rb']+R(?!' + _REGULAR + rb'))'
+                       rb'|(?P<num>[+-]?(?:\d+\.?\d*|\.\d+))(?!' + _REGULAR + rb')'
+                       rb'|/(?P<name>' + _REGULAR + rb'*)'
+                       rb'|(?P<open><<|\[)'
+                       rb'|(?P<close>>>|\])'
+                       rb'|<(?P<hex>[0-9A-Fa-f' + _WS + rb']*)>'
+                       rb'|(?P<str>\()'
+                       rb'|(?P<word>' + _REGULAR + rb'+|[{}])'
+                       rb'|(?P<end>$))')
+_STRING_SPECIAL_RE = re.compile(rb'[()\\]')
+_OCTAL_RE = re.compile(rb'[0-7]{1,3}')
+_NAME_ESCAPE_RE = re.compile(rb'#([0-9A-Fa-f]{2})')
+_NON_HEX_RE = re.compile(rb'[^0-9A-Fa-f]')
+_OBJ_RE = re.compile(rb'(?<![0-9])(\d+)[' + _WS + rb']+(\d+)[' + _WS + rb']+obj(?!' + _REGULAR + rb')')
+_ROOT_RE = re.compile(rb'/Root[' + _WS + rb']*(\d+)[' + _WS + rb']+(\d+)[' + _WS + rb']+R')
+_OBJSTM_RE = re.compile(rb'/Type[' + _WS + rb']*/ObjStm(?!' + _REGULAR + rb')')
+_STREAM_RE = re.compile(rb'[' + _WS + rb']*stream(?:\r\n|\n|\r)?')
+_ESCAPES = {ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t', ord('b'): b'\b', ord('f'): b'\f'}
+
+def _literal_string(buf, pos):
+    # Body of a (...) string starting after the "("; returns (bytes, end)
+    out = bytearray()
+    depth = 1
+    while True:
+        m = _STRING_SPECIAL_RE.search(buf, pos)
+        if m is None:
+            out += buf[pos:]
+            return bytes(out), len(buf)
+        i = m.start()
+        out += buf[pos:i]
+        c = buf[i]
+        pos = i + 1
+        if c == 0x5C: # Backslash
+            octal = _OCTAL_RE.match(buf, pos)
+            if octal:
+                out.append(int(octal.group(), 8) & 0xFF)
+                pos = octal.end()
+            elif pos < len(buf):
+                nxt = buf[pos]
+                pos += 1
+                if nxt == 0x0D and buf[pos:pos + 1] == b'\n':
+                    pos += 1 # Escaped CRLF: line continuation
+                elif nxt not in (0x0A, 0x0D):
+                    out += _ESCAPES.get(nxt, bytes((nxt,)))
+        elif c == 0x28:
+            depth += 1
+            out.append(c)
+        else:
+            depth -= 1
+            if depth == 0:
+                return bytes(out), pos
+            out.append(c)
+
+def parse_value(buf, pos):
+    """Parses one PDF object at pos. Returns (value, end); value is _END at end of data."""
+    m = _TOKEN_RE.match(buf, pos)
+    if m is None: # Stray byte the grammar does not allow; skip it
+        return Operator(''), pos + 1
+    kind, end = m.lastgroup, m.end()
+    if kind == 'ref':
+        return Ref(int(m.group('rnum')), int(m.group('rgen'))), end
+    if kind == 'num':
+        text = m.group('num')
+        return (float(text) if b'.' in text else int(text)), end
+    if kind == 'name':
+        return Name(_NAME_ESCAPE_RE.sub(lambda e: bytes((int(e.group(1), 16),)), m.group('name')).decode('latin-1')), end
+    if kind == 'open':
+        if m.group('open') == b'[':
+            items = []
+            while True:
+                value, end = parse_value(buf, end)
+                if value is _CLOSE or value is _END:
+                    return items, end
+                items.append(value)
+        d = {}
+        while True:
+            key, end = parse_value(buf, end)
+            if key is _CLOSE or key is _END:
+                return d, end
+            value, end = parse_value(buf, end)
+            if value is _CLOSE or value is _END:
+                return d, end
+            d[key] = value
+    if kind == 'close':
+        return _CLOSE, end
+    if kind == 'hex':
+        digits = _NON_HEX_RE.sub(b'', m.group('hex'))
+        return bytes.fromhex((digits + b'0' * (len(digits) % 2)).decode('ascii')), end
+    if kind == 'str':
+        return _literal_string(buf, end)
+    if kind == 'word':
+        word = m.group('word')
+        if word == b'true': return True, end
+        if word == b'false': return False, end
+        if word == b'null': return None, end
+        return Operator(word.decode('latin-1')), end
+    return _END, end
+
+def _inflate(data, limit):
+    # FlateDecode in READ_CHUNK pieces, stopping at limit bytes; damaged streams keep what decoded
+    d = zlib.decompressobj()
+    out = []
+    size = 0
+    try:
+        for i in range(0, len(data), READ_CHUNK):
+            piece = d.decompress(data[i:i + READ_CHUNK], limit - size)
+            out.append(piece)
+            size += len(piece)
+            if size >= limit:
+                break
+    except zlib.error:
+        pass
+    return b''.join(out)
+
+def _as_list(value):
+    if value is None: return []
+    return value if isinstance(value, list) else [value]
+
+class PDFDocument:
+    """Lazy object access over a memory-mapped PDF (only what the pages need is parsed)."""
+    def __init__(self, buf):
+        self.buf = buf
+        self.offsets = {int(m.group(1)): m.end() for m in _OBJ_RE.finditer(buf)}
+        self._cache = {}
+        self._compressed = None # Object number -> (object stream number, offset in it), built on first miss
+        self._fonts = {}
+        roots = [m for m in _ROOT_RE.finditer(buf)]
+        self.root = Ref(int(roots[-1].group(1)), int(roots[-1].group(2))) if roots else None
+
+    def get(self, num):
+        if num in self._cache:
+            return self._cache[num]
+        value = None
+        if num in self.offsets:
+            value, end = parse_value(self.buf, self.offsets[num])
+            if isinstance(value, dict):
+                stream = _STREAM_RE.match(self.buf, end)
+                if stream and stream.end() > end:
+                    value = PDFStream(value, stream.end())
+        else:
+            value = self._from_object_stream(num)
+        self._cache[num] = value
+        return value
+
+    def resolve(self, value):
+        depth = 0
+        while isinstance(value, Ref) and depth < 32:
+            value = self.get(value.num)
+            depth += 1
+        return value
+
+    def stream_data(self, stream, limit=MAX_STREAM_BYTES):
+        """Decoded bytes of a stream, or None for filters we cannot decode."""
+        if not isinstance(stream, PDFStream):
+            return None
+        length = self.resolve(stream.dict.get('Length'))
+        if not isinstance(length, int) or length < 0 or stream.start + length > len(self.buf):
+            end = self.buf.find(b'endstream', stream.start)
+            length = (end if end >= 0 else len(self.buf)) - stream.start
+        filters = [self.resolve(f) for f in _as_list(self.resolve(stream.dict.get('Filter')))]
+        if not filters:
+            return self.buf[stream.start:stream.start + min(length, limit)]
+        if filters == ['FlateDecode']:
+            return _inflate(self.buf[stream.start:stream.start + length], limit)
+        return None
+
+    def _from_object_stream(self, num):
+        if self._compressed is None:
+            self._compressed = {}
+            starts = sorted(self.offsets.values())
+            owners = {v: k for k, v in self.offsets.items()}
+            for m in _OBJSTM_RE.finditer(self.buf):
+                i = bisect_right(starts, m.start()) - 1
+                if i >= 0:
+                    self._index_object_stream(owners[starts[i]])
+        if num not in self._compressed:
+            return None
+        stream_num, offset = self._compressed[num]
+        data = self.stream_data(self.get(stream_num))
+        return parse_value(data, offset)[0] if data else None
+
+    def _index_object_stream(self, stream_num):
+        stream = self.get(stream_num)
+        if not isinstance(stream, PDFStream) or stream.dict.get('Type') != 'ObjStm':
+            return
+        data = self.stream_data(stream)
+        first, count = self.resolve(stream.dict.get('First')), self.resolve(stream.dict.get('N'))
+        if not data or not isinstance(first, int) or not isinstance(count, int):
+            return
+        pos = 0
+        for _ in range(count):
+            obj_num, pos = parse_value(data, pos)
+            offset, pos = parse_value(data, pos)
+            if not isinstance(obj_num, int) or not isinstance(offset, int):
+                break
+            self._compressed.setdefault(obj_num, (stream_num, first + offset))
+
+    def pages(self):
+        """Yields (page dict, resources) in document order, walking the page tree lazily."""
+        catalog = self.resolve(self.root)
+        if not isinstance(catalog, dict):
+            return
+        stack, seen = [(catalog.get('Pages'), None)], set()
+        while stack:
+            node, resources = stack.pop()
+            if isinstance(node, Ref):
+                if node.num in seen:
+                    continue # Broken trees can loop
+                seen.add(node.num)
+            node = self.resolve(node)
+            if not isinstance(node, dict):
+                continue
+            resources = node.get('Resources', resources)
+            kids = self.resolve(node.get('Kids'))
+            if isinstance(kids, list):
+                stack.extend((kid, resources) for kid in reversed(kids))
+            elif node.get('Type') == 'Page' or 'Contents' in node:
+                yield node, resources
+
+    def page_text(self, page, resources):
+        contents = [self.resolve(c) for c in _as_list(self.resolve(page.get('Contents')))]
+        data = b'\n'.join(d for d in (self.stream_data(c) for c in contents) if d)
+        return tidy_lines(self._content_text(data, resources, 0))
+
+    def font_decoder(self, font_ref):
+        key = font_ref.num if isinstance(font_ref, Ref) else id(font_ref)
+        if key not in self._fonts:
+            self._fonts[key] = self._make_font_decoder(self.resolve(font_ref))
+        return self._fonts[key]
+
+    def _make_font_decoder(self, font):
+        font = font if isinstance(font, dict) else {}
+        two_byte = font.get('Subtype') == 'Type0'
+        cmap = self.stream_data(self.resolve(font.get('ToUnicode')))
+        mapping, width = parse_cmap(cmap) if cmap else ({}, None)
+        width = width or (2 if two_byte else 1)
+        if not mapping:
+            # No ToUnicode: single-byte fonts are close enough to WinAnsi; CIDs of composite fonts mean nothing
+            return (lambda s: '') if two_byte else (lambda s: s.decode('cp1252', errors='ignore'))
+        def decode(s):
+            out = []
+            for i in range(0, len(s) - width + 1, width):
+                code = s[i:i + width]
+                text = mapping.get(code)
+                if text is None and width == 1:
+                    text = code.decode('cp1252', errors='ignore')
+                out.append(text or '')
+            return ''.join(out)
+        return decode
+
+    def _content_text(self, data, resources, depth):
+        # Text shown by a content stream, with line breaks where the text position moves down
+        resources = self.resolve(resources)
+        resources = resources if isinstance(resources, dict) else {}
+        fonts = self.resolve(resources.get('Font'))
+        fonts = fonts if isinstance(fonts, dict) else {}
+        decode = lambda s: s.decode('cp1252', errors='ignore')
+        out, operands, pos, line_y = [], [], 0, None
+        while True:
+            value, pos = parse_value(data, pos)
+            if value is _END:
+                break
+            if not isinstance(value, Operator):
+                operands.append(value)
+                continue
+            op = value
+            if op == 'Tf' and len(operands) >= 2 and operands[-2] in fonts:
+                decode = self.font_decoder(fonts[operands[-2]])
+            elif op in ('Tj', "'", '"') and operands and isinstance(operands[-1], bytes):
+                if op != 'Tj':
+                    out.append('\n')
+                out.append(decode(operands[-1]))
+            elif op == 'TJ' and operands and isinstance(operands[-1], list):
+                for item in operands[-1]:
+                    if isinstance(item, bytes):
+                        out.append(decode(item))
+                    elif isinstance(item, (int, float)) and item < -200:
+                        out.append(' ') # A large kern is a word gap
+            elif op in ('Td', 'TD') and len(operands) >= 2:
+                out.append('\n' if operands[-1] else ' ')
+            elif op == 'T*':
+                out.append('\n')
+            elif op == 'Tm' and len(operands) >= 6:
+                if operands[-1] != line_y:
+                    out.append('\n')
+                line_y = operands[-1]
+            elif op == 'ET':
+                out.append('\n')
+            elif op == 'ID':
+                # Inline image data is binary: skip to the EI that ends it
+                end = data.find(b'EI', pos)
+                while end > 0 and not (data[end - 1:end].isspace() and data[end + 2:end + 3] in (b'', b' ', b'\n', b'\r', b'\t')):
+                    end = data.find(b'EI', end + 2)
+                pos = len(data) if end < 0 else end + 2
+            elif op == 'Do' and operands and depth < MAX_FORM_DEPTH:
+                xobjects = self.resolve(resources.get('XObject'))
+                form = self.resolve(xobjects.get(operands[-1])) if isinstance(xobjects, dict) else None
+                if isinstance(form, PDFStream) and form.dict.get('Subtype') == 'Form':
+                    form_data = self.stream_data(form)
+                    if form_data:
+                        out.append('\n' + self._content_text(form_data, form.dict.get('Resources', resources), depth + 1) + '\n')
+            operands = []
+        return ''.join(out)
+
+def _utf16(b):
+    return b.decode('utf-16-be', errors='ignore')
+
+def parse_cmap(data):
+    """Reads a ToUnicode CMap. Returns ({code bytes: text}, code width in bytes or None)."""
+    mapping, width, operands, pos = {}, None, [], 0
+    budget = MAX_CMAP_ENTRIES # Entries left to read, counting repeats, so repeated full ranges stay cheap
+    while budget > 0:
+        value, pos = parse_value(data, pos)
+        if value is _END:
+            break
+        if not isinstance(value, Operator):
+            operands.append(value)
+            continue
+        if value == 'endcodespacerange' and operands and isinstance(operands[0], bytes):
+            width = len(operands[0])
+        elif value == 'endbfchar':
+            for src, dst in zip(operands[0::2][:budget], operands[1::2]):
+                budget -= 1
+                if isinstance(src, bytes) and isinstance(dst, bytes):
+                    mapping[src] = _utf16(dst)
+        elif value == 'endbfrange':
+            for lo, hi, dst in zip(operands[0::3], operands[1::3], operands[2::3]):
+                if not isinstance(lo, bytes) or not isinstance(hi, bytes):
+                    continue
+                first, last = int.from_bytes(lo, 'big'), int.from_bytes(hi, 'big')
+                count = max(0, min(last - first + 1, budget))
+                budget -= count
+                for k in range(count):
+                    code = (first + k).to_bytes(len(lo), 'big')
+                    if isinstance(dst, list):
+                        if k < len(dst) and isinstance(dst[k], bytes):
+                            mapping[code] = _utf16(dst[k])
+                    elif isinstance(dst, bytes) and dst:
+                        # Consecutive codes map to consecutive values of the last byte(s) of dst (wrapping, not overflowing)
+                        value = (int.from_bytes(dst, 'big') + k) % (1 << 8 * len(dst))
+                        mapping[code] = _utf16(value.to_bytes(len(dst), 'big'))
+        operands = []
+    return mapping, width
+
+def iter_pdf_pages(filepath):
+    """Yields the text of each page of a PDF, parsing a page only when it is asked for."""
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            doc = PDFDocument(buf)
+            for page, resources in doc.pages():
+                yield doc.page_text(page, resources)
+
+# --- DOCX ---
+# word/document.xml is decompressed from the zip as it is parsed; finished paragraphs are
+# cleared so memory stays flat. Explicit page breaks and Word's last-rendered page breaks
+# separate pages.
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+class _LimitedReader:
+    """File-like wrapper that reports end of file after limit bytes."""
+    def __init__(self, raw, limit):
+        self.raw, self.remaining = raw, limit
+    def read(self, n=-1):
+        if self.remaining <= 0:
+            return b''
+        n = self.remaining if n is None or n < 0 else min(n, self.remaining)
+        data = self.raw.read(n)
+        self.remaining -= len(data)
+        return data
+
+def iter_docx_pages(filepath):
+    """Yields the text of each page of a DOCX body."""
+    with zipfile.ZipFile(filepath) as z, z.open('word/document.xml') as raw:
+        page, para = [], []
+        try:
+            for _, elem in ElementTree.iterparse(_LimitedReader(raw, MAX_XML_BYTES), events=('end',)):
+                tag = elem.tag
+                if tag == W_NS + 't':
+                    para.append(elem.text or '')
+                elif tag == W_NS + 'tab':
+                    para.append('\t')
+                elif tag in (W_NS + 'br', W_NS + 'cr') and elem.get(W_NS + 'type') != 'page':
+                    para.append('\n')
+                elif tag in (W_NS + 'br', W_NS + 'lastRenderedPageBreak'):
+                    page.append(''.join(para))
+                    para = []
+                    text = tidy_lines('\n'.join(page))
+                    page = []
+                    if text:
+                        yield text
+                elif tag == W_NS + 'p':
+                    page.append(''.join(para))
+                    para = []
+                    elem.clear()
+        except ElementTree.ParseError:
+            pass # Cut off by MAX_XML_BYTES (or damaged); keep what was read
+        text = tidy_lines('\n'.join(page + [''.join(para)]))
+        if text:
+            yield text
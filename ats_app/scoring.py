@@ -0,0 +1,173 @@
+# Lexical resume scoring: term-frequency vectors and cosine similarity with NumPy
+# Text is tokenized with one compiled pattern into lowercase terms (words such as "c++", "node.js"
+# or "ci/cd", plus two-word phrases), terms are numbered by a Vocabulary, and each document becomes
+# a sparse vector: sorted term ids and their weights. Weights use sublinear term frequency only, with
+# no IDF. Document frequencies over just the documents being compared would count against the terms
+# they share. A document's weights also never depend on the other documents, so compare() and rank()
+# give a resume the same score. Scoring needs no model and no stored corpus.
+
+import math
+import re
+import numpy as np
+
+SCORER_VERSION = 2 # Bump whenever compare() can give a different result for the same texts: cached analyses are keyed by it
+MAX_KEYWORDS = 15 # Matched terms reported per resume
+MAX_GAPS = 5 # Job description terms reported as missing from the resume
+SHORT_RESUME_WORDS = 150 # Fewer words than this in a resume gets a warning
+SHORT_JD_TERMS = 10 # Fewer distinct terms than this in a job description gets a warning
+LOW_SCORE = 0.05 # Cosine below this gets a warning
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*")
+SHORT_TERMS = frozenset({'c', 'r'}) # One-letter terms worth keeping
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each etc every few for from further had has
+have having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own per same she should
+so some such than that the their theirs them themselves then there these they this those through to too
+under until up us very via was we were what when where which while who whom why will with within without
+would you your yours yourself yourselves able must may might shall well new using use used including
+ability candidate experience hiring join knowledge looking preferred required requirements responsibilities
+role skills strong team work working years
+""".split()) # Plus words every job posting uses
+
+def tokenize(text):
+    """Terms of a text: words that are not stopwords, then two-word phrases of neighbouring words."""
+    words = []
+    phrases = []
+    prev = None
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS or token.isdigit() or (len(token) == 1 and token not in SHORT_TERMS):
+            prev = None # Phrases never span a dropped word
+            continue
+        words.append(token)
+        if prev is not None:
+            phrases.append(prev + ' ' + token)
+        prev = token
+    return words + phrases
+
+class Vocabulary:
+    """Numbers terms in the order they are first seen; shared by the documents of one comparison."""
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+    def __len__(self):
+        return len(self.terms)
+    def encode(self, terms):
+        """Term ids of a token list, as an int64 array (unseen terms are added)."""
+        ids = self.ids
+        out = np.empty(len(terms), dtype=np.int64)
+        for i, term in enumerate(terms):
+            tid = ids.get(term)
+            if tid is None:
+                tid = ids[term] = len(self.terms)
+                self.terms.append(term)
+            out[i] = tid
+        return out
+
+def term_counts(ids):
+    """(sorted unique term ids, counts) of an encoded document."""
+    return np.unique(ids, return_counts=True)
+
+def tf_weights(counts):
+    """Sublinear term frequency weights, 1 + log(count)."""
+    return 1.0 + np.log(counts)
+
+def unit_weights(counts):
+    """Unit-length term weights of a document (see tf_weights)."""
+    weights = tf_weights(counts)
+    norm = math.sqrt(float(np.dot(weights, weights)))
+    return weights / norm if norm else weights
+
+def cosine(a_ids, a_weights, b_ids, b_weights):
+    """Cosine of two unit sparse vectors, with the positions of their shared terms."""
+    shared, ia, ib = np.intersect1d(a_ids, b_ids, assume_unique=True, return_indices=True)
+    return float(np.dot(a_weights[ia], b_weights[ib])), shared, ia, ib
+
+def compare(resume_text, job_description_text):
+    """
+    Scores a resume against a job description. Returns the analysis dict:
+    similarity_score (cosine, 0..1), matched_keywords, semantic_summary,
+    warnings, candidate_strengths and potential_gaps.
+    """
+    vocab = Vocabulary()
+    r_ids, r_counts = term_counts(vocab.encode(tokenize(resume_text)))
+    j_ids, j_counts = term_counts(vocab.encode(tokenize(job_description_text)))
+    r_weights = unit_weights(r_counts)
+    j_weights = unit_weights(j_counts)
+    score, shared, ir, ij = cosine(r_ids, r_weights, j_ids, j_weights)
+    return describe(vocab, score, shared, r_counts[ir], r_weights[ir] * j_weights[ij],
+                    j_ids, j_weights, len(resume_text.split()))
+
+def describe(vocab, score, shared, shared_counts, contributions, j_ids, j_weights, resume_words):
+    """Builds the analysis dict from a scored comparison (shared term ids, their resume counts and score contributions)."""
+    order = np.argsort(-contributions, kind='stable')
+    matched = [vocab.terms[t] for t in shared[order[:MAX_KEYWORDS]]]
+    strengths = [f"{vocab.terms[t]} (mentioned {int(c)}x)" for t, c in zip(shared[order[:5]], shared_counts[order[:5]])]
+    missing = ~np.isin(j_ids, shared, assume_unique=True)
+    gap_order = np.argsort(-j_weights[missing], kind='stable')
+    gaps = [vocab.terms[t] for t in j_ids[missing][gap_order[:MAX_GAPS]]]
+    covered = float(j_weights[~missing].sum() / j_weights.sum()) if len(j_ids) else 0.0
+
+    summary = (f"The resume uses {len(shared)} of the {len(j_ids)} terms in the job description, "
+               f"covering {covered:.0%} of its term weight.")
+    if matched:
+        summary += f" Strongest overlap: {', '.join(matched[:3])}."
+    if gaps:
+        summary += f" Not found in the resume: {', '.join(gaps[:3])}."
+    warnings = []
+    if resume_words < SHORT_RESUME_WORDS:
+        warnings.append(f"Only {resume_words} words were extracted from the resume; parts of it may not have been read.")
+    if len(j_ids) < SHORT_JD_TERMS:
+        warnings.append("The job description is very short, so the score is less reliable.")
+    if score < LOW_SCORE:
+        warnings.append("The resume shares very little vocabulary with the job description.")
+    return {
+        'similarity_score': round(score, 4),
+        'matched_keywords': matched,
+        'semantic_summary': summary,
+        'warnings': warnings,
+        'candidate_strengths': strengths,
+        'potential_gaps': gaps,
+    }
+
+def rank(job_description_text, resume_texts, top=None):
+    """
+    Scores many resumes against one job description in one pass. The job
+    description is vectorized once, the resumes form a sparse (CSR) term
+    matrix and every cosine comes out of a single matrix-vector product.
+    Weights are the same as in compare(), so each score equals that resume's
+    similarity_score there. Returns
+    [(index in resume_texts, score, matched keywords)], best first, at most top.
+    """
+    vocab = Vocabulary()
+    j_ids, j_counts = term_counts(vocab.encode(tokenize(job_description_text)))
+    n = len(resume_texts)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    id_parts, count_parts = [], []
+    for i, text in enumerate(resume_texts):
+        ids, counts = term_counts(vocab.encode(tokenize(text)))
+        id_parts.append(ids)
+        count_parts.append(counts)
+        indptr[i + 1] = indptr[i] + len(ids)
+    indices = np.concatenate(id_parts) if n else np.zeros(0, dtype=np.int64)
+    counts = np.concatenate(count_parts) if n else np.zeros(0, dtype=np.int64)
+    rows = np.repeat(np.arange(n), np.diff(indptr)) # Row of every stored entry
+
+    query = np.zeros(len(vocab))
+    query[j_ids] = unit_weights(j_counts)
+
+    weights = tf_weights(counts)
+    norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+    contributions = weights * query[indices]
+    dots = np.bincount(rows, weights=contributions, minlength=n)
+    scores = np.divide(dots, norms, out=np.zeros(n), where=norms > 0)
+    order = np.argsort(-scores, kind='stable')[:top]
+
+    # Matched keywords: each row's shared terms, biggest contribution first
+    hits = np.flatnonzero(contributions > 0)
+    hits = hits[np.lexsort((-contributions[hits], rows[hits]))]
+    hit_ptr = np.searchsorted(rows[hits], np.arange(n + 1))
+    return [(int(i), round(float(scores[i]), 4),
+             [vocab.terms[t] for t in indices[hits[hit_ptr[i]:hit_ptr[i + 1]][:MAX_KEYWORDS]]])
+            for i in order]
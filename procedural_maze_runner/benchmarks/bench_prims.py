@@ -0,0 +1,44 @@
+# Prim's generation scaling benchmark
+# Usage: python benchmarks/bench_prims.py [--sizes 80x60,200x150,...] [--repeat N]
+# Time per cell should stay roughly flat as the grid grows (linear total time).
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from maze_engine import Maze, set_verbose
+
+DEFAULT_SIZES = "80x60,200x150,400x300,700x700,1000x1000"
+
+def time_prims(cols, rows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        maze = Maze(cols, rows, 1)
+        t0 = time.perf_counter()
+        maze.start_generation_prims()
+        maze.run_generation(maze.generate_step_prims)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Prim's maze generation across grid sizes.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="comma-separated COLSxROWS list")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per size (best time is reported)")
+    args = parser.parse_args()
+    set_verbose(False) # Keep the generator's progress lines out of the report
+    sizes = [tuple(int(v) for v in s.lower().split('x')) for s in args.sizes.split(',')]
+    results = []
+    for cols, rows in sizes:
+        secs = time_prims(cols, rows, args.repeat)
+        results.append((cols, rows, secs))
+    print(f"{'size':>12} {'cells':>10} {'seconds':>10} {'us/cell':>9}")
+    for cols, rows, secs in results:
+        cells = cols * rows
+        print(f"{cols:>5}x{rows:<6} {cells:>10} {secs:>10.3f} {secs / cells * 1e6:>9.3f}")
+    first, last = results[0], results[-1]
+    ratio = (last[2] / (last[0] * last[1])) / (first[2] / (first[0] * first[1]))
+    print(f"per-cell cost ratio (largest/smallest): {ratio:.2f}  (~1.0 means linear scaling)")
+
+if __name__ == '__main__':
+    main()
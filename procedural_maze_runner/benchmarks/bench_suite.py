@@ -0,0 +1,242 @@
+# Benchmark suite: generation, solving and rendering across grid sizes
+# Usage:
+#   python benchmarks/bench_suite.py                                 # everything, 20x15 up to 2000x2000
+#   python benchmarks/bench_suite.py --only generation,solving --sizes 80x60,1000x1000
+#   python benchmarks/bench_suite.py --json results.json             # machine-readable results
+#   python benchmarks/bench_suite.py --json new.json --compare old.json --level-cache levels/
+# Reports wall time, peak traced memory and steps/second. Rendering runs against an
+# offscreen surface (SDL dummy video driver), so no display is needed.
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from maze_engine import Maze, MazeSolver, DistanceField, SOLVER_BFS, SOLVER_ASTAR, set_verbose
+
+DEFAULT_SIZES = "20x15,40x30,80x60,200x150,500x500,1000x1000,2000x2000"
+SUITES = ("generation", "solving", "storage", "rendering")
+RENDER_FRAMES = 120
+GEN_FRAME_BUDGET_MS = 1 # Generation time between frames in the generation_frames benchmark
+
+def measure(fn, track_memory):
+    # Runs fn() once for wall time and, if asked, once more under tracemalloc for peak memory
+    t0 = time.perf_counter()
+    value = fn()
+    seconds = time.perf_counter() - t0
+    peak = None
+    if track_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak, value
+
+def record(suite, name, cols, rows, seconds, peak, steps=None, **extra):
+    r = {'suite': suite, 'name': name, 'cols': cols, 'rows': rows, 'seconds': round(seconds, 6), 'peak_mem_bytes': peak}
+    if steps is not None:
+        r['steps'] = steps
+        r['steps_per_sec'] = round(steps / seconds, 1) if seconds > 0 else None
+    r.update(extra)
+    return r
+
+def bench_generation(cols, rows, track_memory, seed):
+    # Every pass builds the same maze from the same seed, so timings compare like with like
+    results = []
+    for algorithm in Maze.GENERATORS:
+        def run():
+            maze = Maze(cols, rows, seed=seed)
+            step = maze.start_generation(algorithm)
+            n = 0
+            while step():
+                n += 1
+            return n
+        seconds, peak, steps = measure(run, track_memory)
+        results.append(record('generation', algorithm, cols, rows, seconds, peak, steps))
+        if Maze.GENERATORS[algorithm][2]:
+            seconds, peak, _ = measure(lambda: Maze(cols, rows, seed=seed).generate(algorithm), track_memory)
+            results.append(record('generation', algorithm + '_bulk', cols, rows, seconds, peak, cols * rows))
+    return results
+
+def reference_maze(cls, cols, rows, seed, cache_dir, cell_size=1):
+    # The maze the solving, storage and rendering suites run on; from the level cache when one is given
+    algorithm = next(iter(Maze.GENERATORS))
+    if cache_dir:
+        return cls.cached(cache_dir, cols, rows, algorithm, seed, cell_size)
+    return cls(cols, rows, cell_size, seed=seed).generate(algorithm)
+
+def bench_solving(cols, rows, track_memory, seed, cache_dir):
+    maze = reference_maze(Maze, cols, rows, seed, cache_dir)
+    start, end = (0, 0), maze.end_pos
+    results = []
+    for method in (SOLVER_BFS, SOLVER_ASTAR):
+        solver = MazeSolver(maze.grid)
+        solver.solve(start, end, method) # Warm up: buffers allocated, as on every hint after the first
+        seconds, peak, path = measure(lambda: solver.solve(start, end, method), track_memory)
+        # Steps = cells the search reached (same epoch stamp)
+        reached = sum(1 for s in solver.stamp if s == solver.epoch)
+        results.append(record('solving', method, cols, rows, seconds, peak, reached, path_length=len(path) if path else None))
+    def build_field():
+        field = DistanceField(maze.grid, end)
+        field.step()
+        return field
+    seconds, peak, field = measure(build_field, track_memory)
+    results.append(record('solving', 'distance_field', cols, rows, seconds, peak, cols * rows))
+    seconds, peak, path = measure(lambda: field.path(start), track_memory)
+    results.append(record('solving', 'distance_field_path', cols, rows, seconds, peak, len(path), path_length=len(path)))
+    return results
+
+def bench_storage(cols, rows, track_memory, seed, cache_dir):
+    maze = reference_maze(Maze, cols, rows, seed, cache_dir)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.maze')
+        seconds, peak, _ = measure(lambda: maze.save(path), track_memory)
+        results.append(record('storage', 'save', cols, rows, seconds, peak, cols * rows, file_bytes=os.path.getsize(path)))
+        seconds, peak, loaded = measure(lambda: Maze.load(path), track_memory)
+        results.append(record('storage', 'load', cols, rows, seconds, peak, cols * rows))
+        # Touch every cell through the memory map (what a first solve or render pays)
+        seconds, peak, _ = measure(lambda: sum(1 for _ in loaded.grid.flat_walls), track_memory)
+        results.append(record('storage', 'scan_loaded', cols, rows, seconds, peak, cols * rows))
+        loaded.grid.flat_walls.buf.close()
+    return results
+
+def bench_rendering(cols, rows, track_memory, frames, seed, cache_dir):
+    import pygame
+    import maze_runner as mr
+    mr.LOG_ENABLED = False # The game's own progress lines; main() turned the engine's off
+    if not pygame.display.get_init():
+        pygame.init()
+    screen = pygame.display.get_surface() or pygame.display.set_mode((mr.SCREEN_WIDTH, mr.SCREEN_HEIGHT))
+    cs = max(1, min(mr.SCREEN_WIDTH // cols, mr.SCREEN_HEIGHT // rows))
+    maze = reference_maze(mr.Maze, cols, rows, seed, cache_dir, cs)
+    results = []
+    seconds, peak, _ = measure(lambda: maze.draw_generation_overlay(screen, mr.VISITED_CELL_COLOR, mr.CURRENT_CELL_MARKER_COLOR), track_memory)
+    results.append(record('rendering', 'generation_overlay', cols, rows, seconds, peak, cell_size=cs))
+    seconds, peak, _ = measure(lambda: maze.render_static(screen.get_size(), mr.WALL_COLOR, mr.START_COLOR, mr.END_COLOR), track_memory)
+    results.append(record('rendering', 'render_static', cols, rows, seconds, peak, cell_size=cs))
+    def generation_frames():
+        # What the generating screen costs per frame: maze + overlay after each slice of steps (drawing time only)
+        gen = mr.Maze(cols, rows, cs, seed=seed)
+        step = gen.start_generation(next(iter(Maze.GENERATORS)))
+        frames, drawing = 0, 0.0
+        while gen.run_generation(step, GEN_FRAME_BUDGET_MS):
+            t0 = time.perf_counter()
+            gen.draw(screen, mr.WALL_COLOR, mr.START_COLOR, mr.END_COLOR, (0, 0), False, 5, frames, None, mr.HINT_PATH_COLOR)
+            gen.draw_generation_overlay(screen, mr.VISITED_CELL_COLOR, mr.CURRENT_CELL_MARKER_COLOR)
+            drawing += time.perf_counter() - t0
+            frames += 1
+        return frames, drawing
+    _, peak, (frames, seconds) = measure(generation_frames, track_memory)
+    results.append(record('rendering', 'generation_frames', cols, rows, seconds, peak, frames, cell_size=cs, ms_per_frame=round(seconds / max(1, frames) * 1000, 4)))
+    field = maze.build_distance_field()
+    field.step()
+    hint = field.path(maze.start_pos)
+    for fog in (False, True):
+        # Random walk through the maze; a hint appears and disappears along the way
+        rng = random.Random(seed)
+        walk = [maze.start_pos]
+        for _ in range(frames):
+            walk.append(rng.choice(maze.grid.open_neighbours(*walk[-1])) if rng.random() < 0.5 else walk[-1])
+        def full_frames():
+            for frame, pos in enumerate(walk):
+                maze.draw(screen, mr.WALL_COLOR, mr.START_COLOR, mr.END_COLOR, pos, fog, 5, frame, hint if frame % 60 < 30 else None, mr.HINT_PATH_COLOR)
+                pygame.display.flip()
+        def dirty_frames():
+            maze.draw(screen, mr.WALL_COLOR, mr.START_COLOR, mr.END_COLOR, walk[0], fog, 5, 0, None, mr.HINT_PATH_COLOR)
+            for frame, pos in enumerate(walk[1:], 1):
+                pygame.display.update(maze.draw_dirty(screen, pos, fog, 5, frame, hint if frame % 60 < 30 else None, mr.HINT_PATH_COLOR))
+        suffix = '_fog' if fog else ''
+        for name, fn in (('draw_full' + suffix, full_frames), ('draw_dirty' + suffix, dirty_frames)):
+            seconds, peak, _ = measure(fn, track_memory)
+            results.append(record('rendering', name, cols, rows, seconds, peak, len(walk), cell_size=cs, ms_per_frame=round(seconds / len(walk) * 1000, 4)))
+    return results
+
+def parse_sizes(text):
+    return [tuple(int(v) for v in s.lower().split('x')) for s in text.split(',') if s]
+
+def result_key(r):
+    return (r['suite'], r['name'], r['cols'], r['rows'])
+
+def compare(results, baseline_path, threshold, log):
+    # Prints time ratios against a previous JSON report; returns the regressions beyond threshold
+    with open(baseline_path) as f:
+        baseline = {result_key(r): r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\nComparison with {baseline_path} (new/old wall time):", file=log)
+    for r in results:
+        old = baseline.get(result_key(r))
+        if not old or not old['seconds']:
+            continue
+        ratio = r['seconds'] / old['seconds']
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"  {r['suite']:<10} {r['name']:<20} {r['cols']:>5}x{r['rows']:<5} {ratio:6.2f}x{flag}", file=log)
+        if flag:
+            regressions.append(r)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark maze generation, solving and rendering.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="comma-separated COLSxROWS list")
+    parser.add_argument('--only', default=','.join(SUITES), help="comma-separated subset of: " + ', '.join(SUITES))
+    parser.add_argument('--frames', type=int, default=RENDER_FRAMES, help="frames per rendering benchmark")
+    parser.add_argument('--seed', type=int, default=12345, help="random seed (mazes and walks)")
+    parser.add_argument('--level-cache', metavar='DIR', help="reuse reference mazes saved here (same seed = same maze across runs)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass (halves run time)")
+    parser.add_argument('--json', metavar='PATH', help="write results as JSON ('-' for stdout)")
+    parser.add_argument('--compare', metavar='PATH', help="previous JSON report to compare wall times against")
+    parser.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+    set_verbose(False) # The engine's progress lines would end up in the report
+    suites = [s for s in args.only.split(',') if s]
+    for s in suites:
+        if s not in SUITES:
+            parser.error(f"unknown suite '{s}'")
+    log = sys.stderr if args.json == '-' else sys.stdout
+    results = []
+    for cols, rows in parse_sizes(args.sizes):
+        for suite in suites:
+            if suite == 'generation':
+                batch = bench_generation(cols, rows, not args.no_memory, args.seed)
+            elif suite == 'solving':
+                batch = bench_solving(cols, rows, not args.no_memory, args.seed, args.level_cache)
+            elif suite == 'storage':
+                batch = bench_storage(cols, rows, not args.no_memory, args.seed, args.level_cache)
+            else:
+                batch = bench_rendering(cols, rows, not args.no_memory, args.frames, args.seed, args.level_cache)
+            for r in batch:
+                mem = f"{r['peak_mem_bytes'] / 1e6:9.2f} MB" if r['peak_mem_bytes'] is not None else "        - MB"
+                rate = f"{r['steps_per_sec']:>14,.0f} steps/s" if r.get('steps_per_sec') else ""
+                print(f"{r['suite']:<10} {r['name']:<20} {cols:>5}x{rows:<5} {r['seconds']:>10.4f} s {mem} {rate}", file=log)
+            results.extend(batch)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'sizes': args.sizes,
+        },
+        'results': results,
+    }
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.json}", file=log)
+    if args.compare and compare(results, args.compare, args.threshold, log):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
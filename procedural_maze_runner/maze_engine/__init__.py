@@ -0,0 +1,11 @@
+# Headless maze engine: grid storage, generation, solving and move validation.
+# CLI modules (maze_engine.batch, maze_engine.replay) are imported on their own.
+# Importing it never touches pygame (or NumPy, until a 2D array view or a shuffled Kruskal edge list is needed).
+from .grid import MazeGrid, IndexedSet, DisjointSet, WALL_N, WALL_S, WALL_E, WALL_W, WALL_ALL, DIRECTIONS
+from .maze import Maze, new_seed, set_verbose, GEN_RECURSIVE_BACKTRACK, GEN_PRIMS, GEN_KRUSKAL, GEN_WILSON, GEN_ELLER
+from .solver import MazeSolver, DistanceField, find_path_bfs, SOLVER_BFS, SOLVER_ASTAR
+from .eller import eller_rows, StreamingGrid
+from .tiles import TiledGrid, GridTiles
+from .mazefile import write_maze, read_maze, PackedWalls, MazeFileError
+from .movement import MOVE_DELTAS, try_move, replay_moves
+from .worker import BackgroundJob, JobCancelled, generation_job, distance_field_job, drain, JOB_PROGRESS, JOB_DONE, JOB_CANCELLED, JOB_FAILED
@@ -0,0 +1,72 @@
+# Batch maze generation across a process pool (no pygame)
+# Usage:
+#   python -m maze_engine.batch --count 1000 --size 200x150 --algorithm kruskal --out levels/
+#   python -m maze_engine.batch --count 64 --size 1000x1000 --seed-start 5000 --workers 8 --out big/
+# Each worker builds whole mazes and writes them straight to the compact .maze format; only
+# (seed, file size) goes back to the parent, so nothing large is pickled between processes.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .maze import Maze, set_verbose
+
+def maze_filename(seed):
+    return f"maze_{seed:08d}.maze"
+
+def _quiet_worker():
+    # Generators print progress lines meant for the game console; turn them off in workers
+    set_verbose(False)
+
+def generate_one(task):
+    # Worker entry point: task = (seed, cols, rows, algorithm, out_dir). Returns (seed, bytes written).
+    seed, cols, rows, algorithm, out_dir = task
+    maze = Maze(cols, rows, seed=seed).generate(algorithm)
+    path = os.path.join(out_dir, maze_filename(seed))
+    maze.save(path)
+    return seed, os.path.getsize(path)
+
+def run_batch(count, cols, rows, algorithm, out_dir, seed_start=0, workers=None, chunksize=None, progress=None):
+    # Generates mazes for seeds seed_start .. seed_start + count - 1 into out_dir; returns a stats dict
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    tasks = [(seed, cols, rows, algorithm, out_dir) for seed in range(seed_start, seed_start + count)]
+    # Several small mazes per round trip keeps IPC overhead out of the way; big mazes go one at a time
+    chunksize = chunksize or max(1, min(64, count // (workers * 4), 1_000_000 // max(1, cols * rows)))
+    total_bytes = done = 0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as pool:
+        for seed, nbytes in pool.map(generate_one, tasks, chunksize=chunksize):
+            done += 1
+            total_bytes += nbytes
+            if progress:
+                progress(done, count)
+    seconds = time.perf_counter() - t0
+    return {
+        'count': count, 'cols': cols, 'rows': rows, 'algorithm': algorithm, 'workers': workers,
+        'chunksize': chunksize, 'seconds': seconds, 'bytes': total_bytes,
+        'mazes_per_sec': count / seconds if seconds > 0 else None,
+        'cells_per_sec': count * cols * rows / seconds if seconds > 0 else None,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m maze_engine.batch", description="Generate many mazes in parallel into .maze files.")
+    parser.add_argument('--count', type=int, required=True, help="number of mazes")
+    parser.add_argument('--size', default="40x30", help="COLSxROWS (default 40x30)")
+    parser.add_argument('--algorithm', default="recursive_backtrack", choices=sorted(Maze.GENERATORS), help="generator")
+    parser.add_argument('--seed-start', type=int, default=0, help="first seed; maze i uses seed-start + i")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunksize', type=int, default=None, help="mazes per worker round trip (default: automatic)")
+    parser.add_argument('--out', required=True, help="output directory (one maze_<seed>.maze per maze)")
+    args = parser.parse_args(argv)
+    cols, rows = (int(v) for v in args.size.lower().split('x'))
+    step = max(1, args.count // 20)
+    def progress(done, count):
+        if done % step == 0 or done == count:
+            print(f"  {done}/{count}", file=sys.stderr)
+    stats = run_batch(args.count, cols, rows, args.algorithm, args.out, args.seed_start, args.workers, args.chunksize, progress)
+    print(f"{stats['count']} {args.algorithm} mazes of {cols}x{rows} in {stats['seconds']:.2f} s with {stats['workers']} workers: "
+          f"{stats['mazes_per_sec']:.1f} mazes/s, {stats['cells_per_sec'] / 1e6:.2f} Mcells/s, {stats['bytes'] / 1e6:.1f} MB written")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Eller's algorithm: mazes generated one row at a time with O(width) state (no pygame)
+# eller_rows() streams finished rows; StreamingGrid keeps a sliding window of them around
+# the player, so an endless maze uses the same memory at row 10 as at row 10 million.
+import random
+from collections import deque
+from .grid import WALL_N, WALL_S, WALL_E, WALL_W, WALL_ALL, DIRECTIONS
+
+JOIN_CHANCE = 0.5 # Chance of joining two horizontally adjacent cells from different sets
+DOWN_CHANCE = 0.5 # Chance of each extra cell in a set opening downwards (one per set always does)
+
+def eller_rows(cols, rows=None, rng=random):
+    # Yields each row's wall bits (bytearray of cols cells) top to bottom; rows=None never stops.
+    # Only the current row's set labels and downward openings are kept between rows.
+    # rng is anything with random() and choice() (a random.Random for reproducible rows).
+    sets = [0] * cols # Set label per column, 0 = not yet in a set
+    down = [False] * cols # Which cells of the previous row opened south
+    next_label = 1
+    y = 0
+    while rows is None or y < rows:
+        last = rows is not None and y == rows - 1
+        row = bytearray([WALL_ALL]) * cols
+        cells = {} # Set label -> its columns in this row, so a merge only relabels the cells it moves
+        for x in range(cols):
+            if down[x]:
+                row[x] &= ~WALL_N & 0xFF
+            else:
+                sets[x] = next_label
+                next_label += 1
+            cells.setdefault(sets[x], []).append(x)
+        # Join neighbours from different sets (all of them on the last row, which closes the maze)
+        for x in range(cols - 1):
+            a, b = sets[x], sets[x + 1]
+            if a != b and (last or rng.random() < JOIN_CHANCE):
+                if len(cells[a]) < len(cells[b]):
+                    a, b = b, a # Relabel the smaller set: O(cols log cols) per row overall
+                moved = cells.pop(b)
+                for k in moved:
+                    sets[k] = a
+                cells[a] += moved
+                row[x] &= ~WALL_E & 0xFF
+                row[x + 1] &= ~WALL_W & 0xFF
+        if last:
+            yield row
+            return
+        # Every set opens downwards at least once, so no region is cut off from the rows below
+        members = {}
+        for x in range(cols):
+            members.setdefault(sets[x], []).append(x)
+        down = [False] * cols
+        for xs in members.values():
+            opened = [x for x in xs if rng.random() < DOWN_CHANCE] or [rng.choice(xs)]
+            for x in opened:
+                down[x] = True
+                row[x] &= ~WALL_S & 0xFF
+        yield row
+        y += 1
+
+class StreamingGrid:
+    """
+    Sliding window of rows from eller_rows(), answering the same move queries
+    as MazeGrid (in_bounds, can_move, has_wall, open_neighbours) in absolute
+    row coordinates. follow(y) pulls rows ahead of y and drops rows more than
+    `behind` rows above it; dropped rows are gone for good (Eller's cannot
+    regenerate them), so they count as out of bounds.
+    """
+    def __init__(self, cols, behind, ahead, rows=None, seed=None):
+        self.cols, self.rows = cols, rows
+        self.behind, self.ahead = behind, ahead
+        self.seed = seed
+        self._source = eller_rows(cols, rows, random.Random(seed))
+        self._rows = deque()
+        self.first_row = 0 # Absolute index of the oldest row still held
+    @property
+    def last_row(self):
+        return self.first_row + len(self._rows) - 1
+    def follow(self, y):
+        # Slides the window to cover rows y - behind .. y + ahead (as far as the maze goes)
+        while self.last_row < y + self.ahead:
+            row = next(self._source, None)
+            if row is None:
+                break
+            self._rows.append(row)
+        while self.first_row < y - self.behind:
+            self._rows.popleft()
+            self.first_row += 1
+    def row(self, y):
+        # Wall bits of row y, or None outside the window
+        return self._rows[y - self.first_row] if self.first_row <= y <= self.last_row else None
+    def in_bounds(self, x, y):
+        return 0 <= x < self.cols and self.first_row <= y <= self.last_row
+    def has_wall(self, x, y, bit):
+        return bool(self._rows[y - self.first_row][x] & bit)
+    def can_move(self, x, y, dx, dy):
+        for bit, ddx, ddy, _ in DIRECTIONS:
+            if ddx == dx and ddy == dy:
+                return self.in_bounds(x + dx, y + dy) and not self._rows[y - self.first_row][x] & bit
+        return False
+    def open_neighbours(self, x, y):
+        bits = self._rows[y - self.first_row][x]
+        return [(x + dx, y + dy) for bit, dx, dy, _ in DIRECTIONS if not bits & bit and self.in_bounds(x + dx, y + dy)]
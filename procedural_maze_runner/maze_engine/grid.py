@@ -0,0 +1,177 @@
+# Compact array-backed maze grid (no pygame)
+# One byte of wall bits per cell plus flag arrays, instead of a Cell object
+# with a walls dict per cell. A 2000x2000 grid costs ~24 MB instead of gigabytes.
+import random
+from array import array
+
+# --- Wall Bits ---
+WALL_N = 1; WALL_S = 2; WALL_E = 4; WALL_W = 8
+WALL_ALL = WALL_N | WALL_S | WALL_E | WALL_W
+# (wall bit, dx, dy, opposite wall bit) in N, S, E, W order
+DIRECTIONS = ((WALL_N, 0, -1, WALL_S), (WALL_S, 0, 1, WALL_N), (WALL_E, 1, 0, WALL_W), (WALL_W, -1, 0, WALL_E))
+
+class MazeGrid:
+    """
+    Wall bitmask and visited flags for a cols x rows maze.
+    `flat_walls` / `flat_visited` are flat memoryviews for fast scalar access
+    from Python loops (indexed by y * cols + x); `walls` / `visited_gen` are
+    2D NumPy views over the same memory for vectorized work. NumPy is only
+    imported when those views are first used, so headless generation and
+    solving never pay for it.
+    `walls` may instead be a read-only sequence of wall bits (a PackedWalls
+    over a memory-mapped maze file); reset() swaps in writable buffers.
+    """
+    def __init__(self, cols, rows, walls=None):
+        self.cols, self.rows = cols, rows
+        self.size = cols * rows
+        self._visited_buf = bytearray(self.size)
+        self.flat_visited = memoryview(self._visited_buf)
+        if walls is None:
+            self._wall_buf = bytearray([WALL_ALL]) * self.size
+            self.flat_walls = memoryview(self._wall_buf)
+        else:
+            self._wall_buf = None
+            self.flat_walls = walls
+        self._walls = self._visited_gen = self._visited_frame = None
+    @property
+    def walls(self):
+        if self._walls is None:
+            import numpy as np
+            if self._wall_buf is None:
+                self._walls = self.flat_walls.to_array().reshape(self.rows, self.cols) # Unpacked copy
+            else:
+                self._walls = np.frombuffer(self._wall_buf, dtype=np.uint8).reshape(self.rows, self.cols)
+        return self._walls
+    @property
+    def visited_gen(self):
+        if self._visited_gen is None:
+            import numpy as np
+            self._visited_gen = np.frombuffer(self._visited_buf, dtype=np.uint8).reshape(self.rows, self.cols)
+        return self._visited_gen
+    @property
+    def visited_frame(self):
+        # Last frame each cell was visible under fog of war (renderer-only state)
+        if self._visited_frame is None:
+            import numpy as np
+            self._visited_frame = np.zeros((self.rows, self.cols), dtype=np.int32)
+        return self._visited_frame
+    def reset(self):
+        if self._wall_buf is None:
+            self._wall_buf = bytearray(self.size)
+            self.flat_walls = memoryview(self._wall_buf)
+            self._walls = None
+        self.flat_walls[:] = bytes((WALL_ALL,)) * self.size
+        self.flat_visited[:] = bytes(self.size)
+        if self._visited_frame is not None:
+            self._visited_frame.fill(0)
+    def visited_count(self):
+        return self.size - self._visited_buf.count(0)
+    @property
+    def nbytes(self):
+        walls = len(self._wall_buf) if self._wall_buf is not None else 0 # Packed walls live in the page cache
+        return walls + self.size + (self._visited_frame.nbytes if self._visited_frame is not None else 0)
+    def index(self, x, y):
+        return y * self.cols + x
+    def coords(self, i):
+        return i % self.cols, i // self.cols
+    def in_bounds(self, x, y):
+        return 0 <= x < self.cols and 0 <= y < self.rows
+    def has_wall(self, x, y, bit):
+        return bool(self.flat_walls[y * self.cols + x] & bit)
+    def can_move(self, x, y, dx, dy):
+        for bit, ddx, ddy, _ in DIRECTIONS:
+            if ddx == dx and ddy == dy:
+                return self.in_bounds(x + dx, y + dy) and not self.flat_walls[y * self.cols + x] & bit
+        return False
+    def neighbours(self, i):
+        # Flat indices of the in-bounds neighbours of cell i (N, S, E, W order)
+        cols = self.cols
+        x = i % cols
+        n = []
+        if i >= cols: n.append(i - cols)
+        if i + cols < self.size: n.append(i + cols)
+        if x + 1 < cols: n.append(i + 1)
+        if x > 0: n.append(i - 1)
+        return n
+    def open_neighbours(self, x, y):
+        # Coordinates reachable from (x, y) in one move
+        bits = self.flat_walls[y * self.cols + x]
+        moves = []
+        for bit, dx, dy, _ in DIRECTIONS:
+            if not bits & bit and self.in_bounds(x + dx, y + dy):
+                moves.append((x + dx, y + dy))
+        return moves
+    def remove_wall(self, i, j):
+        # Knock down the wall between adjacent flat cells i and j
+        d = j - i
+        if d == self.cols: bi, bj = WALL_S, WALL_N
+        elif d == -self.cols: bi, bj = WALL_N, WALL_S
+        elif d == 1: bi, bj = WALL_E, WALL_W
+        elif d == -1: bi, bj = WALL_W, WALL_E
+        else: return
+        w = self.flat_walls
+        w[i] &= ~bi & 0xFF
+        w[j] &= ~bj & 0xFF
+    # Walls as edge ids: 2*i is the wall east of cell i, 2*i+1 the wall south of it
+    def edge_between(self, i, j):
+        if j < i: i, j = j, i
+        return 2 * i + (0 if j - i == 1 and self.cols > 1 else 1)
+    def edge_cells(self, e):
+        i = e >> 1
+        return i, (i + self.cols if e & 1 else i + 1)
+    @property
+    def edge_count(self):
+        return 2 * self.size
+
+class IndexedSet:
+    """
+    Set of ints in [0, capacity) with O(1) add, discard and random pop.
+    Members are packed densely in `items`; `pos` maps each value to its slot
+    (-1 when absent) so removal swaps the last item into the hole.
+    """
+    def __init__(self, capacity):
+        self.items = array('i')
+        self.pos = array('i', [-1]) * capacity
+    def __len__(self):
+        return len(self.items)
+    def __contains__(self, v):
+        return self.pos[v] >= 0
+    def add(self, v):
+        if self.pos[v] < 0:
+            self.pos[v] = len(self.items)
+            self.items.append(v)
+    def _remove_at(self, p):
+        items = self.items
+        v = items[p]
+        last = items.pop()
+        if last != v:
+            items[p] = last
+            self.pos[last] = p
+        self.pos[v] = -1
+        return v
+    def discard(self, v):
+        p = self.pos[v]
+        if p >= 0:
+            self._remove_at(p)
+    def pop_random(self, rng=random):
+        return self._remove_at(rng.randrange(len(self.items)))
+
+class DisjointSet:
+    """
+    Union-find over ints in [0, size) with path halving, stored in one flat
+    array. Hot loops (bulk Kruskal) inline find() on `parent` directly.
+    """
+    def __init__(self, size):
+        self.parent = array('i', range(size))
+    def find(self, v):
+        parent = self.parent
+        while parent[v] != v:
+            parent[v] = v = parent[parent[v]]
+        return v
+    def union(self, a, b):
+        # Merges the sets of a and b; False if they were already joined
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        self.parent[ra] = rb
+        return True
@@ -0,0 +1,431 @@
+# Headless maze state and generation (no pygame), shared by the game, batch jobs and the benchmarks
+# Cells are addressed by flat index (y * cols + x) during generation and by (x, y) elsewhere.
+import os
+import random
+import sys
+import time
+from array import array
+from .grid import MazeGrid, IndexedSet, DisjointSet, WALL_N, WALL_S, WALL_E, WALL_W
+from .solver import MazeSolver, DistanceField
+from .eller import eller_rows
+from .mazefile import write_maze, read_maze
+
+VERBOSE = True # Progress lines ("Resetting grid...") on stdout; set_verbose(False) silences them
+
+def set_verbose(flag):
+    global VERBOSE
+    VERBOSE = bool(flag)
+
+def log(*args):
+    if VERBOSE:
+        print(*args)
+
+def new_seed():
+    # Fresh seed for a maze created without one; any int in [0, 2**63) can be stored in a maze file
+    return random.randrange(1 << 63)
+
+GEN_RECURSIVE_BACKTRACK = "recursive_backtrack"; GEN_PRIMS = "prims"; GEN_KRUSKAL = "kruskal"; GEN_WILSON = "wilson"; GEN_ELLER = "eller"
+
+class Maze:
+    # Generator name -> (start method, step method, bulk method or None).
+    # The bulk method builds the whole maze in one tight loop, skipping per-step bookkeeping.
+    GENERATORS = {
+        GEN_RECURSIVE_BACKTRACK: ("start_generation_rb", "generate_step_rb", None),
+        GEN_PRIMS: ("start_generation_prims", "generate_step_prims", None),
+        GEN_KRUSKAL: ("start_generation_kruskal", "generate_step_kruskal", "generate_kruskal_bulk"),
+        GEN_WILSON: ("start_generation_wilson", "generate_step_wilson", "generate_wilson_bulk"),
+        GEN_ELLER: ("start_generation_eller", "generate_step_eller", None),
+    }
+    def __init__(self, grid_cols, grid_rows, cell_size=1, grid=None, seed=None):
+        self.grid_cols, self.grid_rows, self.cell_size = grid_cols, grid_rows, cell_size
+        self.grid = grid if grid is not None else MazeGrid(grid_cols, grid_rows)
+        self.generation_stack = array('i')
+        self.frontier = IndexedSet(0)
+        self.current_gen_cell = None
+        self.algorithm = None
+        # Every generator draws from self.rng, which reset_grid() re-seeds from self.seed:
+        # the same seed and algorithm always give the same maze, stepped or bulk.
+        self.seed = seed if seed is not None else new_seed()
+        self.rng = random.Random(self.seed)
+        self._generating = False
+        self._reset_walk_state()
+        self.start_pos = (0, 0)
+        self.end_pos = (grid_cols - 1, grid_rows - 1)
+        self._solver = None
+        self.distance_field = None
+    @property
+    def solver(self):
+        # Created on first use; its buffers are reused for every later search on this maze
+        if self._solver is None:
+            self._solver = MazeSolver(self.grid)
+        return self._solver
+    def reset_grid(self):
+        log("Resetting grid...")
+        self.grid.reset()
+        self.rng = random.Random(self.seed)
+        self.generation_stack = array('i')
+        self.frontier = IndexedSet(0)
+        self.current_gen_cell = None # Simplified reset
+        self._reset_walk_state()
+        self.distance_field = None
+    def _reset_walk_state(self):
+        # Kruskal: shuffled edge ids, read position and union-find.
+        # Wilson: next cell of the current walk per cell, scan position for walk starts, walk head.
+        self.edge_queue = array('i'); self.edge_pos = 0; self.edge_sets = None
+        self.walk_next = None; self.walk_scan = 0; self.walk_start = self.walk_head = -1; self.walk_carving = False
+        self.row_source = None; self.row_index = 0 # Eller's: row generator and the next row to copy in
+    def _start_index(self):
+        sx, sy = self.start_pos
+        return self.grid.index(sx, sy) if self.grid.in_bounds(sx, sy) else 0
+    def start_generation_rb(self):
+        self.reset_grid()
+        si = self._start_index()
+        self.grid.flat_visited[si] = 1
+        self.generation_stack.append(si)
+        self.current_gen_cell = self.grid.coords(si)
+        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
+        log(f"Starting RB Gen from {self.current_gen_cell}")
+    def generate_step_rb(self):
+        if not self.generation_stack:
+            self.current_gen_cell = None
+            return False
+        g = self.grid
+        cur = self.generation_stack[-1]
+        self.current_gen_cell = g.coords(cur)
+        visited = g.flat_visited
+        unvisited = [n for n in g.neighbours(cur) if not visited[n]]
+        if unvisited:
+            nxt = self.rng.choice(unvisited)
+            g.remove_wall(cur, nxt)
+            visited[nxt] = 1
+            self.generation_stack.append(nxt)
+        else:
+            self.generation_stack.pop()
+        return True
+    def _add_walls_to_frontier(self, cell):
+        # Walls to unvisited neighbours join the frontier; walls to visited ones can no longer carve, so drop them
+        g = self.grid
+        visited = g.flat_visited
+        for n in g.neighbours(cell):
+            if visited[n]:
+                self.frontier.discard(g.edge_between(cell, n))
+            else:
+                self.frontier.add(g.edge_between(cell, n))
+    def start_generation_prims(self):
+        self.reset_grid()
+        si = self._start_index()
+        self.frontier = IndexedSet(self.grid.edge_count)
+        self.grid.flat_visited[si] = 1
+        self._add_walls_to_frontier(si)
+        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
+        self.current_gen_cell = self.grid.coords(si)
+        log(f"Starting Prim's Gen from {self.current_gen_cell}")
+    def generate_step_prims(self):
+        if not self.frontier:
+            self.current_gen_cell = None
+            return False
+        c1, c2 = self.grid.edge_cells(self.frontier.pop_random(self.rng))
+        visited = self.grid.flat_visited
+        if visited[c1] ^ visited[c2]:
+            self.grid.remove_wall(c1, c2)
+            nc = c1 if not visited[c1] else c2
+            visited[nc] = 1
+            self._add_walls_to_frontier(nc)
+            self.current_gen_cell = self.grid.coords(nc)
+        return True
+    def _shuffled_edges(self):
+        # Interior walls (east walls off the last column, south walls off the last row) in random order.
+        # The order is a stable sort on one 32-bit key per edge drawn from self.rng, so the seed alone
+        # decides it: with or without NumPy, on any machine.
+        g = self.grid
+        cols = g.cols
+        n = (cols - 1) * g.rows + g.size - cols
+        keys = self.rng.getrandbits(32 * n).to_bytes(4 * n, 'little') if n else b''
+        try:
+            import numpy as np
+        except ImportError:
+            edges = array('i', [2 * i for i in range(g.size) if i % cols < cols - 1])
+            edges.extend(2 * i + 1 for i in range(g.size - cols))
+            k = array('I', keys) # 4-byte items on every platform CPython supports
+            if sys.byteorder == 'big':
+                k.byteswap()
+            return array('i', [edges[i] for i in sorted(range(n), key=k.__getitem__)])
+        idx = np.arange(g.size, dtype=np.int32)
+        edges = np.concatenate((2 * idx[idx % cols < cols - 1], 2 * idx[:g.size - cols] + 1))
+        edges = edges[np.argsort(np.frombuffer(keys, dtype='<u4'), kind='stable')]
+        return array('i', edges.tobytes())
+    def start_generation_kruskal(self):
+        self.reset_grid()
+        self.edge_queue = None # Shuffled on the first step, so a bulk run right after start doesn't shuffle twice
+        self.edge_sets = DisjointSet(self.grid.size)
+        self.grid.flat_visited[self._start_index()] = 1
+        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
+        log("Starting Kruskal's Gen")
+    def generate_step_kruskal(self):
+        # Skips walls whose cells are already connected, then knocks down the next one that joins two trees
+        if self.edge_queue is None:
+            self.edge_queue = self._shuffled_edges()
+        g, queue = self.grid, self.edge_queue
+        while self.edge_pos < len(queue):
+            c1, c2 = g.edge_cells(queue[self.edge_pos])
+            self.edge_pos += 1
+            if self.edge_sets.union(c1, c2):
+                g.remove_wall(c1, c2)
+                g.flat_visited[c1] = g.flat_visited[c2] = 1
+                self.current_gen_cell = g.coords(c2)
+                return True
+        self.current_gen_cell = None
+        return False
+    def generate_kruskal_bulk(self):
+        # Kruskal over a random edge order builds the minimum spanning tree with edge rank as weight. That
+        # tree is unique, so Boruvka's algorithm, which vectorizes, yields exactly the stepper's maze
+        self.reset_grid()
+        try:
+            import numpy as np
+        except ImportError:
+            return self._kruskal_bulk_loop()
+        g = self.grid
+        cols = g.cols
+        edges = np.frombuffer(self._shuffled_edges(), dtype=np.int32)
+        u = edges >> 1
+        v = np.where(edges & 1, u + cols, u + 1)
+        rank = np.arange(len(edges))
+        comp = np.arange(g.size) # Component label per cell
+        tree = []
+        while len(u):
+            cu, cv = comp[u], comp[v]
+            keep = cu != cv # Edges inside a component never join anything again
+            u, v, rank, cu, cv = u[keep], v[keep], rank[keep], cu[keep], cv[keep]
+            if not len(u):
+                break
+            # Each component's cheapest outgoing edge: edges stay in rank order, so it is the first one to mention
+            # it. Scattering positions in reverse leaves the first one, as the last write to an index wins
+            ends = np.empty(2 * len(u), dtype=cu.dtype)
+            ends[0::2], ends[1::2] = cu, cv
+            first = np.full(g.size, -1)
+            first[ends[::-1]] = np.arange(len(ends) - 1, -1, -1)
+            labels = np.flatnonzero(first >= 0)
+            best = first[labels] >> 1
+            picked = np.zeros(len(u), dtype=bool)
+            picked[best] = True
+            tree.append(rank[picked])
+            # Hook every component onto the one across its cheapest edge (mutual picks: lower label wins),
+            # then flatten the pointers so every cell maps straight to its new root
+            parent = np.arange(g.size)
+            parent[labels] = np.where(cu[best] == labels, cv[best], cu[best])
+            mutual = parent[parent[labels]] == labels
+            parent[labels[mutual & (labels < parent[labels])]] = labels[mutual & (labels < parent[labels])]
+            while True:
+                hop = parent[parent]
+                if np.array_equal(hop, parent):
+                    break
+                parent = hop
+            comp = parent[comp]
+        chosen = edges[np.concatenate(tree)] if tree else edges[:0]
+        walls = np.frombuffer(g.flat_walls, dtype=np.uint8)
+        east, south = chosen[(chosen & 1) == 0] >> 1, chosen[(chosen & 1) == 1] >> 1
+        walls[east] &= ~WALL_E & 0xFF; walls[east + 1] &= ~WALL_W & 0xFF
+        walls[south] &= ~WALL_S & 0xFF; walls[south + cols] &= ~WALL_N & 0xFF
+        g.flat_visited[:] = b'\x01' * g.size
+        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
+        return self
+    def _kruskal_bulk_loop(self):
+        # Without NumPy: the stepper's algorithm with find() and remove_wall() inlined; stops once size-1 walls are down
+        g = self.grid
+        cols, walls = g.cols, g.flat_walls
+        parent = array('i', range(g.size))
+        keep_e, keep_w, keep_s, keep_n = ~WALL_E & 0xFF, ~WALL_W & 0xFF, ~WALL_S & 0xFF, ~WALL_N & 0xFF
+        remaining = g.size - 1
+        for e in self._shuffled_edges():
+            if not remaining:
+                break
+            i = e >> 1
+            j = i + cols if e & 1 else i + 1
+            ri = i
+            while parent[ri] != ri:
+                parent[ri] = ri = parent[parent[ri]]
+            rj = j
+            while parent[rj] != rj:
+                parent[rj] = rj = parent[parent[rj]]
+            if ri != rj:
+                parent[ri] = rj
+                if e & 1:
+                    walls[i] &= keep_s; walls[j] &= keep_n
+                else:
+                    walls[i] &= keep_e; walls[j] &= keep_w
+                remaining -= 1
+        g.flat_visited[:] = b'\x01' * g.size
+        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
+        return self
+    def start_generation_wilson(self):
+        self.reset_grid()
+        si = self._start_index()
+        self.grid.flat_visited[si] = 1 # visited = in the tree
+        self.walk_next = array('i', [0]) * self.grid.size
+        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
+        self.current_gen_cell = self.grid.coords(si)
+        log(f"Starting Wilson's Gen from {self.current_gen_cell}")
+    def _random_neighbour(self, i):
+        g = self.grid
+        cols = g.cols
+        while True:
+            d = self.rng.getrandbits(2)
+            if d == 0:
+                if i >= cols: return i - cols
+            elif d == 1:
+                if i + cols < g.size: return i + cols
+            elif d == 2:
+                if (i + 1) % cols: return i + 1
+            elif i % cols:
+                return i - 1
+    def generate_step_wilson(self):
+        # One step: a move of the random walk, or one cell of a finished walk joining the tree.
+        # walk_next keeps only the last exit from each cell, which erases loops implicitly.
+        g = self.grid
+        visited = g.flat_visited
+        if self.walk_carving:
+            cur = self.walk_head
+            nxt = self.walk_next[cur]
+            visited[cur] = 1
+            g.remove_wall(cur, nxt)
+            self.walk_head = nxt
+            if visited[nxt]:
+                self.walk_carving = False
+                self.walk_head = -1
+            self.current_gen_cell = g.coords(cur)
+            return True
+        if self.walk_head < 0:
+            while self.walk_scan < g.size and visited[self.walk_scan]:
+                self.walk_scan += 1
+            if self.walk_scan == g.size:
+                self.current_gen_cell = None
+                return False
+            self.walk_start = self.walk_head = self.walk_scan
+        cur = self.walk_head
+        nxt = self._random_neighbour(cur)
+        self.walk_next[cur] = nxt
+        if visited[nxt]:
+            self.walk_carving = True
+            self.walk_head = self.walk_start
+        else:
+            self.walk_head = nxt
+        self.current_gen_cell = g.coords(nxt)
+        return True
+    def generate_wilson_bulk(self):
+        # Loop-erased random walks from every cell not yet in the tree, with neighbour picking inlined
+        self.reset_grid()
+        g = self.grid
+        cols, size, visited = g.cols, g.size, g.flat_visited
+        nxt_of = array('i', [0]) * size
+        getrandbits = self.rng.getrandbits
+        remove_wall = g.remove_wall
+        visited[self._start_index()] = 1
+        for start in range(size):
+            if visited[start]:
+                continue
+            cur = start
+            while not visited[cur]:
+                d = getrandbits(2)
+                if d == 0:
+                    if cur < cols: continue
+                    nxt = cur - cols
+                elif d == 1:
+                    nxt = cur + cols
+                    if nxt >= size: continue
+                elif d == 2:
+                    nxt = cur + 1
+                    if not nxt % cols: continue
+                else:
+                    if not cur % cols: continue
+                    nxt = cur - 1
+                nxt_of[cur] = nxt
+                cur = nxt
+            cur = start
+            while not visited[cur]:
+                visited[cur] = 1
+                nxt = nxt_of[cur]
+                remove_wall(cur, nxt)
+                cur = nxt
+        self.walk_scan = size
+        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
+        return self
+    def start_generation_eller(self):
+        self.reset_grid()
+        self.row_source = eller_rows(self.grid_cols, self.grid_rows, self.rng)
+        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
+        log("Starting Eller's Gen")
+    def generate_step_eller(self):
+        # One step = one finished row copied into the grid
+        row = next(self.row_source, None) if self.row_source else None
+        if row is None:
+            self.current_gen_cell = None
+            return False
+        g = self.grid
+        start = self.row_index * g.cols
+        g.flat_walls[start:start + g.cols] = row
+        g.flat_visited[start:start + g.cols] = b'\x01' * g.cols
+        self.current_gen_cell = (g.cols - 1, self.row_index)
+        self.row_index += 1
+        return True
+    def build_distance_field(self):
+        # end_pos is fixed once generation finishes; the field is filled in by step() calls
+        self.distance_field = DistanceField(self.grid, self.end_pos)
+        return self.distance_field
+    def start_generation(self, algorithm, seed=None):
+        # Starts the named generator (from seed, if given) and returns its step function
+        start, step, _ = self.GENERATORS[algorithm]
+        if seed is not None:
+            self.seed = seed
+        self.algorithm = algorithm
+        getattr(self, start)()
+        self._generating = True
+        return getattr(self, step)
+    def advance_generation(self, budget_ms=None):
+        # Continues the generator begun by start_generation(); see run_generation(). False once nothing is left to do.
+        # budget_ms=None finishes it, through the bulk method (from scratch) when the generator has one.
+        if not self._generating:
+            return False
+        _, step, bulk = self.GENERATORS[self.algorithm]
+        if budget_ms is None and bulk:
+            getattr(self, bulk)()
+            self._generating = False
+        else:
+            self._generating = self.run_generation(getattr(self, step), budget_ms)
+        return self._generating
+    def generate(self, algorithm, seed=None):
+        # Builds a complete maze with the named generator (no animation)
+        self.start_generation(algorithm, seed)
+        self.advance_generation()
+        return self
+    def save(self, path):
+        # Compact binary file (see mazefile.py): 4 wall bits per cell, start/end, seed and algorithm
+        write_maze(path, self.grid, self.start_pos, self.end_pos, self.seed, self.algorithm)
+    @classmethod
+    def load(cls, path, cell_size=1):
+        # The walls stay in a read-only memory map, so even multi-megacell mazes open instantly
+        grid, info = read_maze(path, cls.GENERATORS)
+        maze = cls(grid.cols, grid.rows, cell_size, grid=grid)
+        maze.start_pos, maze.end_pos = info['start_pos'], info['end_pos']
+        maze.seed, maze.algorithm = info['seed'], info['algorithm']
+        return maze
+    @classmethod
+    def cached(cls, cache_dir, cols, rows, algorithm, seed, cell_size=1):
+        # Same (size, algorithm, seed) always gives the same maze, so it is generated once and loaded after that
+        path = os.path.join(cache_dir, f"{algorithm}_{cols}x{rows}_{seed}.maze")
+        if os.path.exists(path):
+            return cls.load(path, cell_size)
+        os.makedirs(cache_dir, exist_ok=True)
+        maze = cls(cols, rows, cell_size, seed=seed).generate(algorithm)
+        maze.save(path)
+        return maze
+    def run_generation(self, step_func, budget_ms=None):
+        # Runs step_func until generation finishes or budget_ms elapses (always at least one step).
+        # budget_ms=None runs to completion. Returns True while generation is still unfinished.
+        if budget_ms is None:
+            while step_func(): pass
+            return False
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        while step_func():
+            if time.perf_counter() >= deadline:
+                return True
+        return False
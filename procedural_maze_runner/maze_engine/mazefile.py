@@ -0,0 +1,113 @@
+# Compact binary maze files (no pygame)
+# Layout (little-endian): a fixed HEADER, then the wall bits packed two cells per byte
+# (low nibble = even flat index, high nibble = odd). A 2000x2000 maze is 2 MB on disk.
+# Loading memory-maps the file: only the header is parsed, and cells are unpacked on access.
+import mmap
+import os
+import struct
+from .grid import MazeGrid
+
+MAGIC = b"MAZE"; FORMAT_VERSION = 2
+FLAG_HAS_SEED = 1
+# magic, version, flags, cols, rows, start x, start y, end x, end y, seed, algorithm (NUL-padded)
+HEADER = struct.Struct("<4sHHIIIIIIq32s")
+# Version 1 had a 16-byte algorithm field, which cut longer names short ("recursive_backtr")
+HEADERS = {1: struct.Struct("<4sHHIIIIIIq16s"), FORMAT_VERSION: HEADER}
+
+class MazeFileError(ValueError):
+    pass
+
+class PackedWalls:
+    """
+    Read-only stand-in for MazeGrid.flat_walls over nibble-packed bytes
+    (normally an mmap). Indexing unpacks a single cell, so a loaded maze is
+    usable straight away; to_array() unpacks everything for vectorized work.
+    """
+    def __init__(self, buf, offset, size):
+        self.buf, self.offset, self.size = buf, offset, size
+    def __len__(self):
+        return self.size
+    def __getitem__(self, i):
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        b = self.buf[self.offset + (i >> 1)]
+        return b >> 4 if i & 1 else b & 0x0F
+    @property
+    def packed(self):
+        return memoryview(self.buf)[self.offset:self.offset + (self.size + 1) // 2]
+    def to_array(self):
+        import numpy as np
+        packed = np.frombuffer(self.buf, dtype=np.uint8, count=(self.size + 1) // 2, offset=self.offset)
+        out = np.empty(2 * len(packed), dtype=np.uint8)
+        out[0::2] = packed & 0x0F
+        out[1::2] = packed >> 4
+        return out[:self.size]
+
+def pack_walls(flat_walls):
+    # Two cells per byte; a PackedWalls source is copied as-is
+    if isinstance(flat_walls, PackedWalls):
+        return bytes(flat_walls.packed)
+    try:
+        import numpy as np
+    except ImportError:
+        w = bytes(flat_walls) + b'\x00'
+        return bytes(w[i] | w[i + 1] << 4 for i in range(0, len(w) - 1, 2))
+    w = np.frombuffer(flat_walls, dtype=np.uint8)
+    if len(w) % 2:
+        w = np.append(w, np.uint8(0))
+    return (w[0::2] | (w[1::2] << 4)).tobytes()
+
+def write_maze(path, grid, start_pos, end_pos, seed=None, algorithm=None):
+    # Written to a temp file and renamed, so readers never see a partial maze
+    name = (algorithm or "").encode('ascii')
+    if len(name) > HEADER.size - struct.calcsize("<4sHHIIIIIIq"):
+        raise MazeFileError(f"algorithm name '{algorithm}' is too long for a maze file")
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_HAS_SEED if seed is not None else 0, grid.cols, grid.rows,
+                         start_pos[0], start_pos[1], end_pos[0], end_pos[1], seed if seed is not None else 0,
+                         name)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(header)
+        f.write(pack_walls(grid.flat_walls))
+    os.replace(tmp, path)
+
+def _parse_header(data, algorithms=None):
+    # algorithms: the generator names a file may name (None accepts any). Version 1 names that were
+    # truncated are restored when exactly one known name starts with them.
+    if len(data) < 6 or data[:4] != MAGIC:
+        raise MazeFileError("not a maze file")
+    version = struct.unpack_from("<H", data, 4)[0]
+    header = HEADERS.get(version)
+    if header is None:
+        raise MazeFileError(f"unsupported maze file version {version}")
+    if len(data) < header.size:
+        raise MazeFileError("file too short for a maze header")
+    magic, version, flags, cols, rows, sx, sy, ex, ey, seed, algorithm = header.unpack_from(data)
+    if len(data) < header.size + (cols * rows + 1) // 2:
+        raise MazeFileError("maze file is truncated")
+    try:
+        algorithm = algorithm.rstrip(b'\x00').decode('ascii') or None
+    except UnicodeDecodeError:
+        raise MazeFileError("maze file has a malformed algorithm name") from None
+    if algorithm is not None and algorithms is not None and algorithm not in algorithms:
+        matches = [a for a in algorithms if a.startswith(algorithm)] if version == 1 else []
+        if len(matches) != 1:
+            raise MazeFileError(f"maze file names an unknown algorithm '{algorithm}'")
+        algorithm = matches[0]
+    return {
+        'cols': cols, 'rows': rows, 'start_pos': (sx, sy), 'end_pos': (ex, ey),
+        'seed': seed if flags & FLAG_HAS_SEED else None,
+        'algorithm': algorithm, 'header_size': header.size,
+    }
+
+def read_maze(path, algorithms=None):
+    # Returns (grid, info); the grid's walls are read from a read-only memory map of the file
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        info = _parse_header(mm, algorithms)
+    except MazeFileError:
+        mm.close()
+        raise
+    cols, rows = info['cols'], info['rows']
+    return MazeGrid(cols, rows, walls=PackedWalls(mm, info['header_size'], cols * rows)), info
@@ -0,0 +1,18 @@
+# Move validation against a MazeGrid (no pygame)
+MOVE_DELTAS = {'N': (0, -1), 'S': (0, 1), 'E': (1, 0), 'W': (-1, 0)}
+
+def try_move(grid, pos, dx, dy):
+    # Position after moving (dx, dy) from pos, or None if a wall or the maze edge blocks it
+    x, y = pos
+    return (x + dx, y + dy) if grid.can_move(x, y, dx, dy) else None
+
+def replay_moves(grid, start, moves):
+    # Applies (dx, dy) moves in order from start.
+    # Returns (final position, index of the first blocked move or None if every move was legal).
+    pos = start
+    for i, (dx, dy) in enumerate(moves):
+        nxt = try_move(grid, pos, dx, dy)
+        if nxt is None:
+            return pos, i
+        pos = nxt
+    return pos, None
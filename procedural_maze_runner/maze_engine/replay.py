@@ -0,0 +1,105 @@
+# Recorded runs: what rebuilds a maze (kind, size, algorithm, seed) plus the player's moves (no pygame)
+# A run is a small JSON document, so a run can be replayed and validated headlessly, and the
+# same inputs re-run for performance comparisons.
+# Usage: python -m maze_engine.replay run.json [run2.json ...] [--cache DIR]
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from .maze import Maze
+from .eller import StreamingGrid
+from .tiles import TiledGrid
+from .movement import MOVE_DELTAS, try_move, replay_moves
+
+RUN_MAZE = "maze"; RUN_ENDLESS = "endless"; RUN_TILED = "tiled"
+RUN_FORMAT_VERSION = 1
+MOVE_CODES = {delta: code for code, delta in MOVE_DELTAS.items()}
+
+class MoveLog:
+    """Moves the player actually made, as (dx, dy) pairs; stored as a string of N/S/E/W."""
+    def __init__(self, moves=()):
+        self.moves = list(moves)
+    def __len__(self):
+        return len(self.moves)
+    def record(self, dx, dy):
+        self.moves.append((dx, dy))
+    def encode(self):
+        return ''.join(MOVE_CODES[m] for m in self.moves)
+    @classmethod
+    def decode(cls, text):
+        return cls(MOVE_DELTAS[c] for c in text)
+
+def make_run(kind, cols, rows, algorithm, seed, move_log, won, **extra):
+    run = {'version': RUN_FORMAT_VERSION, 'kind': kind, 'cols': cols, 'rows': rows, 'algorithm': algorithm,
+           'seed': seed, 'won': won, 'moves': move_log.encode()}
+    run.update(extra)
+    return run
+
+def save_run(path, run):
+    with open(path, 'w') as f:
+        json.dump(run, f)
+
+def load_run(path):
+    with open(path) as f:
+        return json.load(f)
+
+def build_grid(run, cache_dir=None):
+    # Regenerates the run's maze from its seed; returns (grid, start, end) with end None for endless runs.
+    # With cache_dir, plain mazes are generated once per seed and loaded from .maze files after that.
+    kind, cols, rows = run['kind'], run['cols'], run['rows']
+    if kind == RUN_MAZE:
+        if cache_dir:
+            maze = Maze.cached(cache_dir, cols, rows, run['algorithm'], run['seed'])
+        else:
+            maze = Maze(cols, rows, seed=run['seed']).generate(run['algorithm'])
+        return maze.grid, maze.start_pos, maze.end_pos
+    if kind == RUN_TILED:
+        return TiledGrid(cols, rows, run['algorithm'], seed=run['seed']), (0, 0), (cols - 1, rows - 1)
+    if kind == RUN_ENDLESS:
+        grid = StreamingGrid(cols, run['behind'], run['ahead'], seed=run['seed'])
+        grid.follow(0)
+        return grid, (0, 0), None
+    raise ValueError(f"unknown run kind '{kind}'")
+
+def validate_run(run, cache_dir=None):
+    # Replays the moves on the regenerated maze. Valid = every move legal and, for a won run, ending on the exit.
+    grid, start, end = build_grid(run, cache_dir)
+    moves = MoveLog.decode(run['moves']).moves
+    if run['kind'] == RUN_ENDLESS:
+        # The window follows the player exactly as in the game, so rows left too far behind stay closed
+        pos, blocked = start, None
+        for i, (dx, dy) in enumerate(moves):
+            nxt = try_move(grid, pos, dx, dy)
+            if nxt is None:
+                blocked = i
+                break
+            pos = nxt
+            grid.follow(pos[1])
+    else:
+        pos, blocked = replay_moves(grid, start, moves)
+    reached_exit = end is not None and pos == end
+    valid = blocked is None and (reached_exit or not run.get('won'))
+    return {'valid': valid, 'final_pos': pos, 'blocked_at': blocked, 'reached_exit': reached_exit, 'moves': len(moves)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m maze_engine.replay", description="Replay recorded runs headlessly and check every move.")
+    parser.add_argument('runs', nargs='+', metavar='RUN.json', help="runs saved by the game (--record)")
+    parser.add_argument('--cache', metavar='DIR', help="keep regenerated mazes as .maze files, keyed by size, algorithm and seed")
+    args = parser.parse_args(argv)
+    ok = True
+    for path in args.runs:
+        run = load_run(path)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()): # Generator progress lines
+            result = validate_run(run, args.cache)
+        seconds = time.perf_counter() - t0
+        ok = ok and result['valid']
+        status = "valid" if result['valid'] else f"INVALID (blocked at move {result['blocked_at']})" if result['blocked_at'] is not None else "INVALID (exit not reached)"
+        print(f"{path}: {status}; {run['kind']} {run['cols']}x{run['rows']} {run['algorithm']} seed {run['seed']}, "
+              f"{result['moves']} moves, ends at {result['final_pos']}, {seconds:.3f} s")
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
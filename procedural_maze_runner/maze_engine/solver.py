@@ -0,0 +1,203 @@
+# Maze path solving (no pygame): parent-pointer BFS and A* over a MazeGrid
+# Searches run from the goal back towards the source, so following parent
+# pointers from the source walks the path in order and the first k steps
+# can be read without touching the rest of it.
+import heapq
+import time
+from array import array
+from collections import deque
+from .grid import WALL_N, WALL_S, WALL_E, WALL_W
+
+SOLVER_BFS = "BFS"; SOLVER_ASTAR = "A*"
+
+class MazeSolver:
+    """
+    Reusable solver bound to one grid. `parent`, `stamp` and `g_score` are
+    allocated once and reused across searches: a cell counts as visited only
+    when its stamp equals the current search epoch, so nothing is cleared
+    between calls. A search can be advanced in time-budgeted slices with
+    step() so long solves never block a frame.
+    """
+    def __init__(self, grid):
+        self.grid = grid
+        self.parent = array('i', [-1]) * grid.size
+        self.stamp = array('I', [0]) * grid.size
+        self.g_score = None # Allocated on first A* search
+        self.epoch = 0
+        self.method = None
+        self.source = self.goal = -1
+        self.found = False
+        self._open = None
+    def _new_epoch(self):
+        self.epoch += 1
+        if self.epoch > 0xFFFFFFFF:
+            self.stamp = array('I', [0]) * self.grid.size
+            self.epoch = 1
+    def start(self, source_coords, goal_coords, method=SOLVER_BFS):
+        g = self.grid
+        self._new_epoch()
+        self.method = method
+        self.source = g.index(*source_coords)
+        self.goal = g.index(*goal_coords)
+        self.found = False
+        self.stamp[self.goal] = self.epoch
+        self.parent[self.goal] = -1
+        if method == SOLVER_ASTAR:
+            if self.g_score is None:
+                self.g_score = array('i', [0]) * g.size
+            self.g_score[self.goal] = 0
+            self._open = [(self._heuristic(self.goal), 0, self.goal)]
+        else:
+            self._open = deque([self.goal])
+    def _heuristic(self, i):
+        # Manhattan distance to the search target (the source cell)
+        cols = self.grid.cols
+        return abs(i % cols - self.source % cols) + abs(i // cols - self.source // cols)
+    def step(self, budget_ms=None):
+        # Advance the current search. Returns True while it is still unfinished.
+        if not self._open:
+            return False
+        deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000.0
+        done = self._step_astar(deadline) if self.method == SOLVER_ASTAR else self._step_bfs(deadline)
+        if done:
+            self._open = None
+        return not done
+    def _step_bfs(self, deadline):
+        q = self._open
+        walls, parent, stamp, epoch = self.grid.flat_walls, self.parent, self.stamp, self.epoch
+        cols, target = self.grid.cols, self.source
+        n_popped = 0
+        while q:
+            i = q.popleft()
+            if i == target:
+                self.found = True
+                return True
+            bits = walls[i]
+            # Outer walls are never removed, so an open side always leads to an in-bounds cell
+            for bit, n in ((WALL_N, i - cols), (WALL_S, i + cols), (WALL_E, i + 1), (WALL_W, i - 1)):
+                if not bits & bit and stamp[n] != epoch:
+                    stamp[n] = epoch
+                    parent[n] = i
+                    q.append(n)
+            n_popped += 1
+            if deadline is not None and n_popped & 255 == 0 and time.perf_counter() >= deadline:
+                return False
+        return True
+    def _step_astar(self, deadline):
+        heap = self._open
+        walls, parent, stamp, epoch, g_score = self.grid.flat_walls, self.parent, self.stamp, self.epoch, self.g_score
+        cols, target = self.grid.cols, self.source
+        n_popped = 0
+        while heap:
+            _, g, i = heapq.heappop(heap)
+            if i == target:
+                self.found = True
+                return True
+            if g > g_score[i]:
+                continue # Stale entry
+            bits = walls[i]
+            ng = g + 1
+            for bit, n in ((WALL_N, i - cols), (WALL_S, i + cols), (WALL_E, i + 1), (WALL_W, i - 1)):
+                if not bits & bit and (stamp[n] != epoch or ng < g_score[n]):
+                    stamp[n] = epoch
+                    parent[n] = i
+                    g_score[n] = ng
+                    heapq.heappush(heap, (ng + self._heuristic(n), ng, n))
+            n_popped += 1
+            if deadline is not None and n_popped & 255 == 0 and time.perf_counter() >= deadline:
+                return False
+        return True
+    def reached(self, coords):
+        return self.stamp[self.grid.index(*coords)] == self.epoch
+    def path(self, from_coords=None, max_steps=None):
+        # Path from from_coords (default: the search source) to the goal, including both ends.
+        # max_steps limits it to the next k moves. Any cell the search reached has a valid chain.
+        g = self.grid
+        cur = self.source if from_coords is None else g.index(*from_coords)
+        if self.stamp[cur] != self.epoch or (cur == self.source and not self.found):
+            return None
+        parent = self.parent
+        path = [g.coords(cur)]
+        while cur != self.goal and (max_steps is None or len(path) <= max_steps):
+            cur = parent[cur]
+            path.append(g.coords(cur))
+        return path
+    def solve(self, source_coords, goal_coords, method=SOLVER_BFS, max_steps=None):
+        self.start(source_coords, goal_coords, method)
+        self.step()
+        return self.path(max_steps=max_steps)
+
+def find_path_bfs(maze, start_coords, end_coords, max_steps=None):
+    return maze.solver.solve(start_coords, end_coords, SOLVER_BFS, max_steps)
+
+class DistanceField:
+    """
+    Distance from every cell to one goal cell, from a single reverse BFS.
+    Mazes are perfect, so walking to any open neighbour one step closer
+    follows the only path to the goal: hints and the distance remaining are
+    O(path length) reads with no search. The BFS can be built in
+    time-budgeted slices; a cell is usable as soon as it has been reached.
+    """
+    def __init__(self, grid, goal_coords):
+        self.grid = grid
+        self.goal = grid.index(*goal_coords)
+        self.dist = array('i', [-1]) * grid.size
+        self.dist[self.goal] = 0
+        self._queue = deque([self.goal])
+        self.settled = 0 # Cells whose neighbours have been expanded (== grid.size once complete)
+    @property
+    def complete(self):
+        return not self._queue
+    def step(self, budget_ms=None):
+        # Extend the BFS. Returns True while the field is still incomplete.
+        q = self._queue
+        walls, dist, cols = self.grid.flat_walls, self.dist, self.grid.cols
+        deadline = None if budget_ms is None else time.perf_counter() + budget_ms / 1000.0
+        n_popped = 0
+        while q:
+            i = q.popleft()
+            bits = walls[i]
+            nd = dist[i] + 1
+            for bit, n in ((WALL_N, i - cols), (WALL_S, i + cols), (WALL_E, i + 1), (WALL_W, i - 1)):
+                if not bits & bit and dist[n] < 0:
+                    dist[n] = nd
+                    q.append(n)
+            n_popped += 1
+            if deadline is not None and n_popped & 255 == 0 and time.perf_counter() >= deadline:
+                self.settled += n_popped
+                return bool(q)
+        self.settled += n_popped
+        return False
+    def reached(self, coords):
+        return self.dist[self.grid.index(*coords)] >= 0
+    def distance(self, coords):
+        # Moves left to the goal, or None if the BFS has not reached this cell yet
+        d = self.dist[self.grid.index(*coords)]
+        return d if d >= 0 else None
+    def _next_index(self, i):
+        bits = self.grid.flat_walls[i]
+        cols, dist = self.grid.cols, self.dist
+        d = dist[i] - 1
+        for bit, n in ((WALL_N, i - cols), (WALL_S, i + cols), (WALL_E, i + 1), (WALL_W, i - 1)):
+            if not bits & bit and dist[n] == d:
+                return n
+        return -1
+    def next_step(self, coords):
+        i = self.grid.index(*coords)
+        if self.dist[i] <= 0:
+            return None
+        n = self._next_index(i)
+        return self.grid.coords(n) if n >= 0 else None
+    def path(self, from_coords, max_steps=None):
+        # Cells from from_coords to the goal (both included), optionally only the next k moves
+        g = self.grid
+        cur = g.index(*from_coords)
+        if self.dist[cur] < 0:
+            return None
+        path = [from_coords]
+        while cur != self.goal and (max_steps is None or len(path) <= max_steps):
+            cur = self._next_index(cur)
+            if cur < 0:
+                return None
+            path.append(g.coords(cur))
+        return path
@@ -0,0 +1,146 @@
+# Tiled maze storage for mazes too big to generate or hold up front (no pygame)
+# The maze is split into tile_size x tile_size tiles. A small "tile maze" (one cell per tile)
+# decides which neighbouring tiles are connected; each tile is generated on first access as
+# an independent perfect maze, and connected tiles open exactly one shared border cell, so
+# the whole grid is still a perfect maze. Least recently used tiles spill to a temp file.
+import random
+import tempfile
+from array import array
+from collections import OrderedDict
+from .grid import WALL_N, WALL_S, WALL_E, DIRECTIONS
+from .maze import Maze, GEN_KRUSKAL, new_seed
+
+TILE_SIZE = 64
+MAX_RESIDENT_TILES = 256 # 64x64 tiles: 1 MB of wall bytes in memory at most
+
+class TiledGrid:
+    """
+    cols x rows wall bits generated and stored one tile at a time. Answers
+    the MazeGrid move queries (in_bounds, can_move, has_wall, open_neighbours)
+    plus tile(tx, ty) for renderers. At most max_resident tiles are held in
+    memory; older ones are written to a spill file and read back on demand.
+    """
+    def __init__(self, cols, rows, algorithm=GEN_KRUSKAL, tile_size=TILE_SIZE, max_resident=MAX_RESIDENT_TILES, seed=None):
+        self.cols, self.rows, self.size = cols, rows, cols * rows
+        self.seed = seed if seed is not None else new_seed() # Tile layout and every tile derive from it
+        self.algorithm = algorithm
+        self.tile_size = tile_size
+        self.max_resident = max_resident
+        self.tile_cols = -(-cols // tile_size)
+        self.tile_rows = -(-rows // tile_size)
+        # Tile-level maze: an open wall between two tiles means their border gets one opening
+        self.tile_maze = Maze(self.tile_cols, self.tile_rows, seed=self.seed).generate(GEN_KRUSKAL)
+        # Opening position along each tile border, indexed by tile-maze edge id (see MazeGrid.edge_between)
+        rng = random.Random(self.seed + 1)
+        self.opening = array('H', (rng.randrange(tile_size) for _ in range(self.tile_maze.grid.edge_count)))
+        self._tiles = OrderedDict() # Tile index -> bytearray of wall bits, most recently used last
+        self._spill = None
+        self._spilled = bytearray(self.tile_cols * self.tile_rows)
+        self._generated = bytearray(self.tile_cols * self.tile_rows)
+        self.tiles_generated = self.tiles_loaded = self.tiles_evicted = 0
+    def tile_shape(self, tx, ty):
+        ts = self.tile_size
+        return min(ts, self.cols - tx * ts), min(ts, self.rows - ty * ts)
+    def is_generated(self, tx, ty):
+        return bool(self._generated[ty * self.tile_cols + tx])
+    def tile(self, tx, ty):
+        # Wall bits of tile (tx, ty), row-major over its tile_shape()
+        ti = ty * self.tile_cols + tx
+        t = self._tiles.get(ti)
+        if t is not None:
+            self._tiles.move_to_end(ti)
+            return t
+        t = self._load_tile(ti) if self._spilled[ti] else self._generate_tile(tx, ty)
+        self._tiles[ti] = t
+        if len(self._tiles) > self.max_resident:
+            self._evict(*self._tiles.popitem(last=False))
+        return t
+    def _generate_tile(self, tx, ty):
+        w, h = self.tile_shape(tx, ty)
+        tile_seed = random.Random(self.seed * 1_000_003 + ty * self.tile_cols + tx).getrandbits(63)
+        walls = bytearray(Maze(w, h, seed=tile_seed).generate(self.algorithm).grid.flat_walls)
+        # Open this tile's side of every border the tile maze connects
+        tg = self.tile_maze.grid
+        ti = tg.index(tx, ty)
+        for bit, dx, dy, _ in DIRECTIONS:
+            nx, ny = tx + dx, ty + dy
+            if not tg.in_bounds(nx, ny) or tg.flat_walls[ti] & bit:
+                continue
+            off = self.opening[tg.edge_between(ti, tg.index(nx, ny))]
+            if bit == WALL_N: i = off % w
+            elif bit == WALL_S: i = (h - 1) * w + off % w
+            elif bit == WALL_E: i = off % h * w + w - 1
+            else: i = off % h * w
+            walls[i] &= ~bit & 0xFF
+        self._generated[ti] = 1
+        self.tiles_generated += 1
+        return walls
+    def _tile_offset(self, ti):
+        return ti * self.tile_size * self.tile_size
+    def _evict(self, ti, walls):
+        # Tiles never change once generated, so each one is written at most once
+        if not self._spilled[ti]:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile(prefix="maze_tiles_")
+            self._spill.seek(self._tile_offset(ti))
+            self._spill.write(walls)
+            self._spilled[ti] = 1
+        self.tiles_evicted += 1
+    def _load_tile(self, ti):
+        w, h = self.tile_shape(ti % self.tile_cols, ti // self.tile_cols)
+        walls = bytearray(w * h)
+        self._spill.seek(self._tile_offset(ti))
+        self._spill.readinto(walls)
+        self.tiles_loaded += 1
+        return walls
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+    def bits(self, x, y):
+        ts = self.tile_size
+        tx, ty = x // ts, y // ts
+        w = min(ts, self.cols - tx * ts)
+        return self.tile(tx, ty)[(y - ty * ts) * w + x - tx * ts]
+    def in_bounds(self, x, y):
+        return 0 <= x < self.cols and 0 <= y < self.rows
+    def has_wall(self, x, y, bit):
+        return bool(self.bits(x, y) & bit)
+    def can_move(self, x, y, dx, dy):
+        for bit, ddx, ddy, _ in DIRECTIONS:
+            if ddx == dx and ddy == dy:
+                return self.in_bounds(x + dx, y + dy) and not self.bits(x, y) & bit
+        return False
+    def open_neighbours(self, x, y):
+        bits = self.bits(x, y)
+        return [(x + dx, y + dy) for bit, dx, dy, _ in DIRECTIONS if not bits & bit and self.in_bounds(x + dx, y + dy)]
+
+class GridTiles:
+    """
+    An existing MazeGrid (a loaded level, say) seen through the TiledGrid
+    interface, so renderers that scroll tile by tile can show it. Tiles are
+    cut from the grid on request; move queries go straight to the grid.
+    """
+    def __init__(self, grid, tile_size=TILE_SIZE):
+        self.grid = grid
+        self.cols, self.rows, self.size = grid.cols, grid.rows, grid.size
+        self.tile_size = tile_size
+        self.tile_cols = -(-self.cols // tile_size)
+        self.tile_rows = -(-self.rows // tile_size)
+        self.in_bounds, self.has_wall = grid.in_bounds, grid.has_wall
+        self.can_move, self.open_neighbours = grid.can_move, grid.open_neighbours
+    def tile_shape(self, tx, ty):
+        ts = self.tile_size
+        return min(ts, self.cols - tx * ts), min(ts, self.rows - ty * ts)
+    def is_generated(self, tx, ty):
+        return True
+    def tile(self, tx, ty):
+        # Wall bits of tile (tx, ty), row-major over its tile_shape()
+        w, h = self.tile_shape(tx, ty)
+        walls, cols = self.grid.flat_walls, self.cols
+        first = ty * self.tile_size * cols + tx * self.tile_size
+        return bytes(walls[first + y * cols + x] for y in range(h) for x in range(w))
+    def bits(self, x, y):
+        return self.grid.flat_walls[y * self.cols + x]
+    def close(self):
+        pass
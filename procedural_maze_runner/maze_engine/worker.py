@@ -0,0 +1,107 @@
+# Background jobs: maze generation and solving on a worker thread (no pygame)
+# A job reports through a queue that the caller drains once per frame, so the thread that
+# pumps events and renders never waits on a long computation. Threads rather than processes:
+# the game draws the live grid while it is being carved, which a process could only offer by
+# shipping the grid back with every snapshot. Work runs in short slices and yields between
+# them, so the render thread gets the GIL back promptly.
+import queue
+import threading
+import time
+
+JOB_PROGRESS = "progress"; JOB_DONE = "done"; JOB_CANCELLED = "cancelled"; JOB_FAILED = "failed"
+SLICE_MS = 8 # Work done between pause/cancel checks
+PROGRESS_INTERVAL_MS = 50 # Minimum time between progress snapshots
+
+class JobCancelled(Exception):
+    pass
+
+class BackgroundJob:
+    """
+    Runs work(job) on a daemon thread. The work calls job.checkpoint() between
+    slices (waits while paused, raises JobCancelled once cancelled) and
+    job.publish(snapshot) when job.progress_due(). Messages (kind, job, payload)
+    go on `results`: JOB_PROGRESS with a snapshot dict, then exactly one of
+    JOB_DONE (the work's return value), JOB_CANCELLED or JOB_FAILED (the exception).
+    """
+    def __init__(self, name, work, results=None):
+        self.name = name
+        self.results = results if results is not None else queue.Queue()
+        self._work = work
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+        self._last_publish = 0.0
+        self.thread = threading.Thread(target=self._run, name=f"maze-{name}", daemon=True)
+    def start(self):
+        self.thread.start()
+        return self
+    def _run(self):
+        try:
+            result = self._work(self)
+        except JobCancelled:
+            self.results.put((JOB_CANCELLED, self, None))
+        except Exception as e:
+            self.results.put((JOB_FAILED, self, e))
+        else:
+            self.results.put((JOB_DONE, self, result))
+    @property
+    def paused(self):
+        return not self._running.is_set()
+    @property
+    def done(self):
+        return not self.thread.is_alive()
+    def pause(self):
+        self._running.clear()
+    def resume(self):
+        self._running.set()
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set() # A paused job has to wake up to notice
+    def checkpoint(self):
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise JobCancelled(self.name)
+        time.sleep(0) # Hand the GIL to the render thread between slices
+    def progress_due(self):
+        # True at most once per PROGRESS_INTERVAL_MS, so snapshots are only built when they will be sent
+        now = time.perf_counter()
+        if now - self._last_publish < PROGRESS_INTERVAL_MS / 1000.0:
+            return False
+        self._last_publish = now
+        return True
+    def publish(self, snapshot):
+        self.results.put((JOB_PROGRESS, self, snapshot))
+
+def drain(results):
+    # Every message waiting on a results queue, without blocking
+    while True:
+        try:
+            yield results.get_nowait()
+        except queue.Empty:
+            return
+
+def generation_job(maze, results=None, slice_ms=SLICE_MS):
+    # Finishes the generation begun by maze.start_generation(). slice_ms=None runs the bulk
+    # generator in one go (no pause or cancel until it returns). Result: the maze.
+    def work(job):
+        total = maze.grid.size if hasattr(maze.grid, 'visited_count') else None
+        t0 = time.perf_counter()
+        while maze.advance_generation(slice_ms):
+            if total and job.progress_due():
+                job.publish({'done': maze.grid.visited_count(), 'total': total,
+                             'current': maze.current_gen_cell, 'seconds': time.perf_counter() - t0})
+            job.checkpoint()
+        return maze
+    return BackgroundJob("generation", work, results)
+
+def distance_field_job(field, results=None, slice_ms=SLICE_MS):
+    # Builds a DistanceField. Cells are usable (field.reached) while the BFS is still running,
+    # since each distance is written once, before the cell is queued. Result: the field.
+    def work(job):
+        total = field.grid.size
+        while field.step(slice_ms):
+            if job.progress_due():
+                job.publish({'done': field.settled, 'total': total})
+            job.checkpoint()
+        return field
+    return BackgroundJob("distance-field", work, results)
@@ -1,13 +1,21 @@
 # Import necessary libraries
 import pygame
 import sys
-import random
+import os
 import numpy as np
 import time
 import math
+import json
+import csv
+import hashlib
+import threading
+import queue
 from collections import deque
-
-print("Script started. Importing modules...") # DIAGNOSTIC
+from maze_engine import Maze as MazeBase, WALL_N, WALL_S, WALL_E, WALL_W, try_move
+from maze_engine import GEN_RECURSIVE_BACKTRACK, GEN_PRIMS, GEN_KRUSKAL, GEN_WILSON, GEN_ELLER, StreamingGrid, TiledGrid, GridTiles, new_seed, set_verbose
+from maze_engine import generation_job, distance_field_job, drain, JOB_PROGRESS, JOB_DONE, JOB_FAILED
+from maze_engine.replay import MoveLog, make_run, save_run, RUN_MAZE, RUN_ENDLESS, RUN_TILED
+from collections import OrderedDict
 
 # --- Constants ---
 # (Constants remain the same as the previous version)
@@ -20,17 +28,33 @@ CURRENT_CELL_MARKER_COLOR=COLOR_GREEN; PLAYER_COLOR=COLOR_CYAN; START_COLOR=COLO
 END_COLOR=COLOR_RED; TIMER_COLOR=COLOR_ORANGE; HINT_PATH_COLOR=COLOR_YELLOW; FOG_COLOR=COLOR_DARK_GREY
 
 # --- Game Settings Structure ---
-ALGORITHM_RECURSIVE_BACKTRACK="Recursive Backtrack"; ALGORITHM_PRIMS="Prim's"
-ALGORITHM_CHOICES=[ALGORITHM_RECURSIVE_BACKTRACK, ALGORITHM_PRIMS]
-SETTINGS_OPTIONS=["Difficulty", "Timer", "Fog of War", "Hints", "Algorithm", "Back"]
+ALGORITHM_RECURSIVE_BACKTRACK="Recursive Backtrack"; ALGORITHM_PRIMS="Prim's"; ALGORITHM_KRUSKAL="Kruskal's"; ALGORITHM_WILSON="Wilson's"
+ALGORITHM_ELLER="Eller's"; ALGORITHM_ENDLESS="Endless (Eller's)"
+ALGORITHM_CHOICES=[ALGORITHM_RECURSIVE_BACKTRACK, ALGORITHM_PRIMS, ALGORITHM_KRUSKAL, ALGORITHM_WILSON, ALGORITHM_ELLER, ALGORITHM_ENDLESS]
+ALGORITHM_GENERATORS={ALGORITHM_RECURSIVE_BACKTRACK:GEN_RECURSIVE_BACKTRACK, ALGORITHM_PRIMS:GEN_PRIMS, ALGORITHM_KRUSKAL:GEN_KRUSKAL, ALGORITHM_WILSON:GEN_WILSON, ALGORITHM_ELLER:GEN_ELLER, ALGORITHM_ENDLESS:GEN_ELLER} # Menu name -> engine generator
+GEN_MODE_ANIMATED="Animated"; GEN_MODE_FAST="Fast"; GEN_MODE_INSTANT="Instant"
+GEN_MODE_CHOICES=[GEN_MODE_ANIMATED, GEN_MODE_FAST, GEN_MODE_INSTANT]
+GEN_MODE_BUDGET_MS={GEN_MODE_ANIMATED:0, GEN_MODE_FAST:8, GEN_MODE_INSTANT:None} # ms per generation slice (0 = one step per frame, None = run to completion)
+SETTINGS_OPTIONS=["Difficulty", "Timer", "Fog of War", "Hints", "Algorithm", "Generation", "Back"]
 settings_menu_selection_index = 0
-game_settings={"difficulty":"Medium", "timer_enabled":False, "fog_enabled":False, "hints_enabled":True, "algorithm":ALGORITHM_RECURSIVE_BACKTRACK}
-DIFFICULTY_MAP={"Easy":1, "Medium":2, "Hard":3}; DIFFICULTY_LEVELS=["Easy", "Medium", "Hard"]
+game_settings={"difficulty":"Medium", "timer_enabled":False, "fog_enabled":False, "hints_enabled":True, "algorithm":ALGORITHM_RECURSIVE_BACKTRACK, "gen_mode":GEN_MODE_FAST}
+DIFFICULTY_MAP={"Easy":1, "Medium":2, "Hard":3, "Huge":4}; DIFFICULTY_LEVELS=["Easy", "Medium", "Hard", "Huge"]
 DIFFICULTY_SETTINGS_MAP = {
     "Easy":{'cols':20,'rows':15,'cell_size':40,'time_factor':2.0,'fog_radius':7,'hint_base_ms':3000},
     "Medium":{'cols':40,'rows':30,'cell_size':20,'time_factor':1.0,'fog_radius':5,'hint_base_ms':2000},
-    "Hard":{'cols':80,'rows':60,'cell_size':10,'time_factor':0.6,'fog_radius':4,'hint_base_ms':1500}
+    "Hard":{'cols':80,'rows':60,'cell_size':10,'time_factor':0.6,'fog_radius':4,'hint_base_ms':1500},
+    "Huge":{'cols':10000,'rows':10000,'cell_size':10,'time_factor':0.6,'fog_radius':4,'hint_base_ms':1500} # Tiled, scrolls with the player
 }
+TILE_SURFACE_CACHE=24 # Rendered tiles kept for scrolling mazes (64x64 cells at 10 px: 1.6 MB each)
+LEVEL_MIN_CELL_SIZE=5 # Loaded levels are scaled to fit the window down to this cell size...
+LEVEL_SCROLL_CELL_SIZE=10 # ...and bigger ones scroll, drawn at this cell size
+DISTANCE_FIELD_BUDGET_MS=4 # Distance-to-exit field is built on a worker thread in slices of this many ms
+HINT_MAX_STEPS=None # Show only the next k steps of the hint path (None = whole path)
+PROFILE_PHASES=("events", "generation", "draw", "text", "flip") # Per-frame phases timed by FrameProfiler
+PROFILE_WINDOW=240 # Frames kept for the rolling percentiles (4 s at 60 FPS)
+PROFILE_HUD_KEY=pygame.K_F3 # Toggles the profiling overlay in any state
+TEXT_CACHE_SIZE=256 # Rendered text surfaces kept by draw_text, least recently used dropped first
+LOG_ENABLED=True # Console progress lines; --quiet turns them (and the engine's) off
 grid_cols=DIFFICULTY_SETTINGS_MAP[game_settings["difficulty"]]['cols']; grid_rows=DIFFICULTY_SETTINGS_MAP[game_settings["difficulty"]]['rows']
 cell_size=DIFFICULTY_SETTINGS_MAP[game_settings["difficulty"]]['cell_size']; fog_radius=DIFFICULTY_SETTINGS_MAP[game_settings["difficulty"]]['fog_radius']
 hint_duration_ms=DIFFICULTY_SETTINGS_MAP[game_settings["difficulty"]]['hint_base_ms']
@@ -41,24 +65,24 @@ STATE_MENU=0; STATE_SETTINGS=1; STATE_GENERATING=2; STATE_PLAYING=3; STATE_WON=4
 # --- Audio Settings ---
 SAMPLE_RATE = 44100; AUDIO_BUFFER_SIZE = 1024; AMBIENCE_CHANNEL_NUM = 0
 
-# --- Sound Generation --- (Functions Unchanged - Assume OK unless error points here)
+# --- Sound Generation --- (float32 intermediates: the 15 s ambience buffer is half the size)
 def generate_sine_wave(f, d, sr=SAMPLE_RATE, a=0.3):
-    t = np.linspace(0., d, int(sr * d), endpoint=False)
+    t = np.linspace(0., d, int(sr * d), endpoint=False, dtype=np.float32)
     w = a * np.sin(2. * np.pi * f * t)
     p = (w * 32767).astype(np.int16)
     return np.column_stack((p, p))
 def generate_square_wave(f, d, sr=SAMPLE_RATE, a=0.2):
-    t = np.linspace(0., d, int(sr * d), endpoint=False)
+    t = np.linspace(0., d, int(sr * d), endpoint=False, dtype=np.float32)
     w = a * np.sign(np.sin(2. * np.pi * f * t))
     p = (w * 32767).astype(np.int16)
     return np.column_stack((p, p))
-def generate_noise(d, sr=SAMPLE_RATE, a=0.15):
+def generate_noise(d, sr=SAMPLE_RATE, a=0.15, seed=None):
     n = int(sr * d)
-    w = a * (2 * np.random.random(n) - 1)
+    w = a * (2 * np.random.default_rng(seed).random(n, dtype=np.float32) - 1) # seed=None: fresh noise every call
     p = (w * 32767).astype(np.int16)
     return np.column_stack((p, p))
 def generate_slow_sine_mod(base_freq, mod_freq, mod_depth, duration, sr=SAMPLE_RATE, a=0.1):
-    t = np.linspace(0., duration, int(sr * duration), endpoint=False)
+    t = np.linspace(0., duration, int(sr * duration), endpoint=False, dtype=np.float32)
     mod_wave = mod_depth * np.sin(2. * np.pi * mod_freq * t)
     main_wave = a * np.sin(2. * np.pi * (base_freq + mod_wave) * t)
     pcm_wave = (main_wave * 32767).astype(np.int16)
@@ -66,171 +90,545 @@ def generate_slow_sine_mod(base_freq, mod_freq, mod_depth, duration, sr=SAMPLE_R
 def generate_combined_wave(wl):
     return np.concatenate(wl, axis=0)
 
-# --- Pathfinding (BFS) --- (Function Unchanged - Assume OK unless error points here)
-def find_path_bfs(maze, start_coords, end_coords):
-    q = deque([(start_coords, [start_coords])])
-    visited = {start_coords}
-    while q:
-        (x, y), path = q.popleft()
-        if (x, y) == end_coords:
-            return path
-        curr = maze.grid[y][x]
-        moves = []
-        if not curr.walls['N']:
-            moves.append((x, y - 1))
-        if not curr.walls['S']:
-            moves.append((x, y + 1))
-        if not curr.walls['E']:
-            moves.append((x + 1, y))
-        if not curr.walls['W']:
-            moves.append((x - 1, y))
-        for nx, ny in moves:
-            if 0 <= nx < maze.grid_cols and 0 <= ny < maze.grid_rows:
-                n_coords = (nx, ny)
-                if n_coords not in visited:
-                    visited.add(n_coords)
-                    new_path = list(path)
-                    new_path.append(n_coords)
-                    q.append((n_coords, new_path))
-    return None
-
-# --- Classes (Cell, Maze, Player) --- (Unchanged - Assume OK unless error points here)
-class Cell:
-    def __init__(self, x, y):
-        self.x, self.y = x, y
-        self.walls = {'N': True, 'S': True, 'E': True, 'W': True}
-        self.visited_gen = False
-        self.visited_frame = 0
-    def draw(self, screen, cell_size, wall_color):
-        x1, y1 = self.x * cell_size, self.y * cell_size
-        x2, y2 = x1 + cell_size, y1 + cell_size
-        s = screen
-        wc = wall_color
-        if self.walls['N']: pygame.draw.line(s, wc, (x1, y1), (x2, y1))
-        if self.walls['S']: pygame.draw.line(s, wc, (x1, y2), (x2, y2))
-        if self.walls['E']: pygame.draw.line(s, wc, (x2, y1), (x2, y2))
-        if self.walls['W']: pygame.draw.line(s, wc, (x1, y1), (x1, y2))
-    def get_neighbours(self, grid, grid_cols, grid_rows):
-        n = []
-        c = [('N', self.x, self.y - 1), ('S', self.x, self.y + 1), ('E', self.x + 1, self.y), ('W', self.x - 1, self.y)]
-        for _, nx, ny in c:
-            if 0 <= nx < grid_cols and 0 <= ny < grid_rows:
-                n.append(grid[ny][nx])
-        return n
-    def __repr__(self):
-        return f"Cell({self.x},{self.y})"
-class Maze:
-    def __init__(self, grid_cols, grid_rows, cell_size):
-        self.grid_cols, self.grid_rows, self.cell_size = grid_cols, grid_rows, cell_size
-        self.grid = self._initialize_grid()
-        self.generation_stack = []
-        self.frontier = []
-        self.current_gen_cell = None
-        self.start_pos = (0, 0)
-        self.end_pos = (grid_cols - 1, grid_rows - 1)
-    def _initialize_grid(self):
-        return [[Cell(x, y) for x in range(self.grid_cols)] for y in range(self.grid_rows)]
+# --- Sound Assets ---
+# Each sound is a list of (generator, parameters) segments played back to back
+SOUND_GENERATORS = {'sine': generate_sine_wave, 'square': generate_square_wave, 'noise': generate_noise, 'slow_sine_mod': generate_slow_sine_mod}
+SOUND_SPECS = {
+    'select': [('sine', {'f': 660, 'd': 0.05, 'a': 0.2})],
+    'move': [('square', {'f': 220, 'd': 0.04, 'a': 0.15})],
+    'hit_wall': [('noise', {'d': 0.06, 'a': 0.08, 'seed': 1})],
+    'win': [('sine', {'f': 261.63, 'd': 0.10, 'a': 0.3}), ('sine', {'f': 329.63, 'd': 0.10, 'a': 0.3}), ('sine', {'f': 392.00, 'd': 0.15, 'a': 0.3})],
+    'start_game': [('sine', {'f': 440, 'd': 0.2, 'a': 0.25})],
+    'lose': [('sine', {'f': 196.00, 'd': 0.15, 'a': 0.3}), ('sine', {'f': 164.81, 'd': 0.15, 'a': 0.3}), ('sine', {'f': 130.81, 'd': 0.20, 'a': 0.3})],
+    'hint': [('sine', {'f': 880, 'd': 0.15, 'a': 0.2})],
+    'ambience': [('slow_sine_mod', {'base_freq': 40, 'mod_freq': 0.1, 'mod_depth': 5, 'duration': 15.0, 'a': 0.05})],
+}
+SOUND_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'procedural_maze_runner', 'sounds')
+SOUND_CACHE_VERSION = 1 # Bump when a generator's output changes so stale cached PCM is not reused
+
+class SoundBank:
+    """
+    Game sounds, synthesized on first use instead of all before the menu appears.
+    Raw int16 PCM is persisted in cache_dir under a hash of the generator
+    parameters, so later launches only read it back. prewarm() fills the PCM
+    on a background thread; pygame Sound objects are created on the main thread
+    at first use.
+    """
+    def __init__(self, specs, cache_dir):
+        self.specs, self.cache_dir = specs, cache_dir
+        self._pcm = {}
+        self._sounds = {}
+        self._locks = {name: threading.Lock() for name in specs}
+        self._dummy = None
+    def cache_path(self, name):
+        params = json.dumps([self.specs[name], SAMPLE_RATE, SOUND_CACHE_VERSION], sort_keys=True)
+        return os.path.join(self.cache_dir, f"{name}-{hashlib.sha1(params.encode()).hexdigest()[:16]}.pcm")
+    def pcm(self, name):
+        # int16 stereo samples: from memory, else the disk cache, else synthesized (and saved)
+        with self._locks[name]:
+            data = self._pcm.get(name)
+            if data is None:
+                path = self.cache_path(name)
+                try:
+                    data = np.fromfile(path, dtype=np.int16).reshape(-1, 2)
+                    if not data.size: raise ValueError("empty cache file")
+                except (OSError, ValueError):
+                    data = generate_combined_wave([SOUND_GENERATORS[gen](**params) for gen, params in self.specs[name]])
+                    self._save(path, data)
+                self._pcm[name] = data
+            return data
+    def _save(self, path, data):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            data.tofile(tmp)
+            os.replace(tmp, path) # Atomic, so a concurrent launch never reads a half-written file
+        except OSError as e:
+            log(f"Could not cache sound '{path}': {e}")
+    def __getitem__(self, name):
+        snd = self._sounds.get(name)
+        if snd is None:
+            try:
+                snd = pygame.sndarray.make_sound(self.pcm(name))
+            except Exception as e:
+                print(f"Error generating sound '{name}': {e}. Using dummy sound.")
+                if self._dummy is None:
+                    self._dummy = pygame.sndarray.make_sound(np.zeros((100, 2), dtype=np.int16))
+                snd = self._dummy
+            self._sounds[name] = snd
+        return snd
+    def prewarm(self, names=None):
+        # Builds PCM for names (default: all, in SOUND_SPECS order) on a daemon thread
+        def work():
+            for name in names or self.specs:
+                try:
+                    self.pcm(name)
+                except Exception as e:
+                    print(f"Error pre-generating sound '{name}': {e}")
+        thread = threading.Thread(target=work, name="sound-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+# --- Classes (Maze, Player) ---
+def draw_cell_walls(screen, bits, x1, y1, cell_size, wall_color):
+    x2, y2 = x1 + cell_size, y1 + cell_size
+    s = screen
+    wc = wall_color
+    if bits & WALL_N: pygame.draw.line(s, wc, (x1, y1), (x2, y1))
+    if bits & WALL_S: pygame.draw.line(s, wc, (x1, y2), (x2, y2))
+    if bits & WALL_E: pygame.draw.line(s, wc, (x2, y1), (x2, y2))
+    if bits & WALL_W: pygame.draw.line(s, wc, (x1, y1), (x1, y2))
+PIX_BACKGROUND = 0; PIX_VISITED = 1; PIX_WALL = 2 # Pixel codes from wall_pixels(), mapped to colors by a palette
+def wall_pixels(walls, fill, cell_size):
+    # Pixel codes for a block of cells in one pass of array ops (same picture as draw_cell_walls per cell).
+    # walls: (rows, cols) wall bits; fill: (rows, cols) code per cell interior (PIX_BACKGROUND / PIX_VISITED).
+    # Returns (cols*cs + 1, rows*cs + 1) uint8 in surfarray (x, y) order: the last column/row is the E/S border line.
+    cs = cell_size
+    rows, cols = walls.shape
+    img = np.full((rows * cs + 1, cols * cs + 1), PIX_BACKGROUND, dtype=np.uint8)
+    img[:-1, :-1] = fill.repeat(cs, 0).repeat(cs, 1)
+    # Horizontal lines r = 0..rows at pixel row r*cs: N of the cell below or S of the cell above (end pixel included)
+    h = np.zeros((rows + 1, cols), dtype=bool)
+    h[:-1] |= (walls & WALL_N) != 0
+    h[1:] |= (walls & WALL_S) != 0
+    hmask = np.zeros((rows + 1, cols * cs + 1), dtype=bool)
+    hmask[:, :-1] = h.repeat(cs, 1)
+    hmask[:, cs::cs] |= h
+    img[::cs][hmask] = PIX_WALL
+    v = np.zeros((rows, cols + 1), dtype=bool)
+    v[:, :-1] |= (walls & WALL_W) != 0
+    v[:, 1:] |= (walls & WALL_E) != 0
+    vmask = np.zeros((rows * cs + 1, cols + 1), dtype=bool)
+    vmask[:-1] = v.repeat(cs, 0)
+    vmask[cs::cs] |= v
+    img[:, ::cs][vmask] = PIX_WALL
+    return img.T
+def palette(surface, colors):
+    # Pixel code -> mapped surface color, for writing codes through surfarray.pixels2d
+    return np.array([surface.map_rgb(c) for c in colors], dtype=np.uint32)
+def walls_surface(walls, cell_size, wall_color):
+    # Surface of exactly cols*cs x rows*cs for a block of wall bits on the background (rows and tiles)
+    rows, cols = walls.shape
+    surf = pygame.Surface((cols * cell_size, rows * cell_size), 0, 32)
+    codes = wall_pixels(walls, np.zeros((rows, cols), dtype=np.uint8), cell_size)
+    pixels = pygame.surfarray.pixels2d(surf)
+    pixels[:] = palette(surf, (BACKGROUND_COLOR, BACKGROUND_COLOR, wall_color))[codes[:cols * cell_size, :rows * cell_size]]
+    del pixels # Unlocks the surface
+    return surf
+class GridImage:
+    """
+    Walls (and optionally visited cells) of a MazeGrid painted into `surface`
+    with NumPy through surfarray instead of a draw call per wall. update()
+    compares every cell's wall bits and visited flag with what was last painted
+    and repaints only the bounding box of the cells that changed, so during
+    generation a frame costs one array comparison plus a small repaint.
+    """
+    def __init__(self, grid, cell_size, size, wall_color, visited_color=None, background=BACKGROUND_COLOR):
+        self.grid, self.cell_size = grid, cell_size
+        self.wall_color, self.visited_color, self.background = wall_color, visited_color, background
+        self.surface = pygame.Surface(size, 0, 32)
+        self.surface.fill(background)
+        self._palette = palette(self.surface, (background, visited_color or background, wall_color))
+        self._painted = None # Cell state (wall bits | visited << 4) last painted
+    def _state(self):
+        state = np.array(self.grid.walls, dtype=np.uint8) # Copy: generation may be running on the worker thread
+        if self.visited_color is not None:
+            state |= (self.grid.visited_gen != 0).astype(np.uint8) << 4
+        return state
+    def update(self):
+        # Repaints what changed since the last call; returns the repainted pixel rect (None if nothing changed)
+        state = self._state()
+        if self._painted is None:
+            self._painted = np.full_like(state, 0xFF)
+        ys, xs = np.nonzero(state != self._painted)
+        if not len(ys):
+            return None
+        x0, x1, y0, y1 = int(xs.min()), int(xs.max()), int(ys.min()), int(ys.max())
+        # One cell of margin up and left: the lines on the box's top/left edges are shared with those cells
+        xa, ya = max(0, x0 - 1), max(0, y0 - 1)
+        block = state[ya:y1 + 1, xa:x1 + 1]
+        codes = wall_pixels(block & 0x0F, block >> 4, self.cell_size) # Visited flag doubles as PIX_VISITED
+        cs = self.cell_size
+        # Owned pixels: the boxed cells, plus the maze's E/S border line when the box reaches it
+        px0, py0 = x0 * cs, y0 * cs
+        px1 = (x1 + 1) * cs + (1 if x1 == self.grid.cols - 1 else 0)
+        py1 = (y1 + 1) * cs + (1 if y1 == self.grid.rows - 1 else 0)
+        sw, sh = self.surface.get_size()
+        px1, py1 = min(px1, sw), min(py1, sh)
+        if px1 > px0 and py1 > py0:
+            pixels = pygame.surfarray.pixels2d(self.surface)
+            pixels[px0:px1, py0:py1] = self._palette[codes[px0 - xa * cs:px1 - xa * cs, py0 - ya * cs:py1 - ya * cs]]
+            del pixels # Unlocks the surface
+        self._painted[y0:y1 + 1, x0:x1 + 1] = state[y0:y1 + 1, x0:x1 + 1]
+        return pygame.Rect(px0, py0, px1 - px0, py1 - py0)
+class Maze(MazeBase):
+    # Once generation ends the static maze (walls, start/end markers) is rendered once to
+    # static_surface; frames in play then only repair dirty rectangles from that cache.
+    endless = False
+    def __init__(self, grid_cols, grid_rows, cell_size, grid=None, seed=None):
+        super().__init__(grid_cols, grid_rows, cell_size, grid, seed)
+        self._clear_render_cache()
     def reset_grid(self):
-        print("Resetting grid...")
-        [c.__init__(c.x, c.y) for r in self.grid for c in r] # List comprehension for side effect (resetting cells)
-        self.generation_stack = []
-        self.frontier = []
-        self.current_gen_cell = None # Simplified reset
-    def _remove_walls(self, c1, c2):
-        dx, dy = c1.x - c2.x, c1.y - c2.y
-        if dx == 1: c1.walls['W'], c2.walls['E'] = False, False
-        elif dx == -1: c1.walls['E'], c2.walls['W'] = False, False
-        if dy == 1: c1.walls['N'], c2.walls['S'] = False, False
-        elif dy == -1: c1.walls['S'], c2.walls['N'] = False, False
-    def start_generation_rb(self):
-        self.reset_grid()
-        sx, sy = self.start_pos
-        self.current_gen_cell = self.grid[sy][sx] if 0 <= sx < self.grid_cols and 0 <= sy < self.grid_rows else self.grid[0][0]
-        self.current_gen_cell.visited_gen = True
-        self.generation_stack.append(self.current_gen_cell)
-        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
-        print(f"Starting RB Gen from ({self.current_gen_cell.x},{self.current_gen_cell.y})")
-    def generate_step_rb(self):
-        if not self.generation_stack:
-            self.current_gen_cell = None
-            return False
-        self.current_gen_cell = self.generation_stack[-1]
-        unvisited = [n for n in self.current_gen_cell.get_neighbours(self.grid, self.grid_cols, self.grid_rows) if not n.visited_gen]
-        if unvisited:
-            nxt = random.choice(unvisited)
-            self._remove_walls(self.current_gen_cell, nxt)
-            nxt.visited_gen = True
-            self.generation_stack.append(nxt)
+        super().reset_grid()
+        self._clear_render_cache()
+    def _clear_render_cache(self):
+        self.static_surface = None
+        self._static_overlay = None
+        self._fog_positions = deque(maxlen=4) # Player cell over the last frames (fog trail lasts 2 frames)
+        self._fog_mask = None # Alpha mask over _fog_window: transparent = visible, opaque = fogged / fading
+        self._fog_window = self._prev_fog_window = None
+        self._fog_mask_stable = False
+        self._fog_mask_rebuilt = False
+        self._hint_src = None
+        self._hint_cells = frozenset()
+        self._drawn_hint_cells = frozenset()
+        self._grid_image = None # Walls + visited cells while generating, repainted incrementally
+    def generation_image(self, size, wall_color, visited_color):
+        gi = self._grid_image
+        if gi is None or gi.surface.get_size() != size or (gi.wall_color, gi.visited_color) != (wall_color, visited_color):
+            gi = self._grid_image = GridImage(self.grid, self.cell_size, size, wall_color, visited_color)
+        gi.update()
+        return gi.surface
+    def render_static(self, size, wall_color, start_color, end_color):
+        gi = GridImage(self.grid, self.cell_size, size, wall_color)
+        gi.update()
+        surf = gi.surface
+        self._grid_image = None
+        for pos, color in ((self.start_pos, start_color), (self.end_pos, end_color)):
+            pygame.draw.rect(surf, color, self._marker_rect(*pos))
+        self.static_surface = surf
+        # Same image keyed on the background so walls/markers can be laid over a hint fill
+        self._static_overlay = surf.copy()
+        self._static_overlay.set_colorkey(BACKGROUND_COLOR)
+    def _cell_rect(self, x, y):
+        cs = self.cell_size
+        return pygame.Rect(x * cs, y * cs, cs, cs)
+    def _marker_rect(self, x, y):
+        cs = self.cell_size
+        inset = max(1, cs // 10)
+        return pygame.Rect(x * cs + inset, y * cs + inset, cs - 2 * inset, cs - 2 * inset)
+    def _cell_range(self, rect):
+        # Inclusive cell bounds (x0, y0, x1, y1) covered by a pixel rect, clipped to the grid
+        cs = self.cell_size
+        x0, y0 = max(0, rect.left // cs), max(0, rect.top // cs)
+        x1, y1 = min(self.grid_cols - 1, (rect.right - 1) // cs), min(self.grid_rows - 1, (rect.bottom - 1) // cs)
+        return x0, y0, x1, y1
+    def _begin_frame(self, player_pos, fog_enabled, fog_radius, frame_count, hint_path, hint_path_color):
+        self._player_pos, self._fog_enabled, self._frame = player_pos, fog_enabled, frame_count
+        self._hint_color = hint_path_color
+        if hint_path is not self._hint_src:
+            self._hint_src = hint_path
+            self._hint_cells = frozenset(hint_path) if hint_path else frozenset()
+        self._fog_mask_rebuilt = False
+        if fog_enabled:
+            self._fog_positions.append(player_pos)
+            self._mark_visible(player_pos, fog_radius, frame_count)
+            # Rebuild while the player moves or the trail fades; a settled mask is reused as-is
+            settled = len(set(self._fog_positions)) == 1
+            if self._fog_mask is None or not (settled and self._fog_mask_stable):
+                self._build_fog_mask(fog_radius, frame_count)
+                self._fog_mask_stable = settled
+    def _fog_window_cells(self, positions, fog_radius):
+        # Inclusive cell bounds of every cell within fog_radius of any of the positions
+        x0 = max(0, min(p[0] for p in positions) - fog_radius); x1 = min(self.grid_cols - 1, max(p[0] for p in positions) + fog_radius)
+        y0 = max(0, min(p[1] for p in positions) - fog_radius); y1 = min(self.grid_rows - 1, max(p[1] for p in positions) + fog_radius)
+        return x0, y0, x1, y1
+    def _fog_visibility(self, player_pos, fog_radius, frame_count, window):
+        # (visible, fading) boolean arrays over the window; marks visible cells' visited_frame
+        px, py = player_pos
+        x0, y0, x1, y1 = window
+        ys, xs = np.ogrid[y0:y1 + 1, x0:x1 + 1]
+        vis = (xs - px)**2 + (ys - py)**2 <= fog_radius**2
+        frames = self.grid.visited_frame[y0:y1 + 1, x0:x1 + 1]
+        frames[vis] = frame_count
+        age = frame_count - frames
+        return vis, (age >= 0) & (age <= 2) & ~vis
+    def _mark_visible(self, player_pos, fog_radius, frame_count):
+        self._fog_visibility(player_pos, fog_radius, frame_count, self._fog_window_cells((player_pos,), fog_radius))
+    def _build_fog_mask(self, fog_radius, frame_count):
+        # Cells outside the window are always fogged, so mask cost depends on fog_radius, not grid size
+        cs = self.cell_size
+        window = self._fog_window_cells(self._fog_positions, fog_radius)
+        vis, fading = self._fog_visibility(self._player_pos, fog_radius, frame_count, window)
+        rgba = np.empty(vis.shape + (4,), dtype=np.uint8)
+        rgba[...] = (*FOG_COLOR, 255)
+        rgba[fading] = (*BACKGROUND_COLOR, 255)
+        rgba[vis] = 0
+        h, w = vis.shape
+        cells = pygame.image.frombuffer(rgba, (w, h), 'RGBA')
+        self._fog_mask = pygame.transform.scale(cells, (w * cs, h * cs)) # Nearest-neighbour: one block per cell
+        self._prev_fog_window = self._fog_window
+        self._fog_window = pygame.Rect(window[0] * cs, window[1] * cs, w * cs, h * cs)
+        self._fog_mask_rebuilt = True
+    def redraw_region(self, screen, rect):
+        # Recompose one screen rect from the static cache plus fog and hint overlays for the current frame
+        rect = pygame.Rect(rect).clip(screen.get_rect())
+        if not rect.width or not rect.height:
+            return
+        screen.set_clip(rect)
+        if not self._fog_enabled:
+            self._draw_static_and_hints(screen, rect)
         else:
-            self.generation_stack.pop()
-        return True
-    def _add_walls_to_frontier(self, cell):
-        for _, dx, dy in [('N', 0, -1), ('S', 0, 1), ('E', 1, 0), ('W', -1, 0)]:
-            nx, ny = cell.x + dx, cell.y + dy
-            if 0 <= nx < self.grid_cols and 0 <= ny < self.grid_rows:
-                n = self.grid[ny][nx]
-                wt = (cell, n)
-                if wt not in self.frontier and (n, cell) not in self.frontier:
-                    self.frontier.append(wt)
-    def start_generation_prims(self):
-        self.reset_grid()
-        sx, sy = self.start_pos
-        sc = self.grid[sy][sx] if 0 <= sx < self.grid_cols and 0 <= sy < self.grid_rows else self.grid[0][0]
-        sc.visited_gen = True
-        self._add_walls_to_frontier(sc)
-        self.end_pos = (self.grid_cols - 1, self.grid_rows - 1)
-        self.current_gen_cell = sc
-        print(f"Starting Prim's Gen from ({sc.x},{sc.y})")
-    def generate_step_prims(self):
-        if not self.frontier:
-            self.current_gen_cell = None
-            return False
-        c1, c2 = random.choice(self.frontier)
-        self.frontier.remove((c1, c2))
-        if c1.visited_gen ^ c2.visited_gen:
-            self._remove_walls(c1, c2)
-            nc = c1 if not c1.visited_gen else c2
-            nc.visited_gen = True
-            self._add_walls_to_frontier(nc)
-            self.current_gen_cell = nc
-        return True
+            # Fogged everywhere except inside the mask window: cache + hints, then one alpha-mask blit
+            screen.fill(FOG_COLOR, rect)
+            win = rect.clip(self._fog_window)
+            if win.width and win.height:
+                self._draw_static_and_hints(screen, win)
+                screen.blit(self._fog_mask, win, win.move(-self._fog_window.x, -self._fog_window.y))
+        screen.set_clip(None)
+    def _draw_static_and_hints(self, screen, rect):
+        screen.blit(self.static_surface, rect, rect)
+        if self._hint_cells:
+            x0, y0, x1, y1 = self._cell_range(rect)
+            if len(self._hint_cells) < (x1 - x0 + 1) * (y1 - y0 + 1):
+                cells = [c for c in self._hint_cells if x0 <= c[0] <= x1 and y0 <= c[1] <= y1]
+            else:
+                cells = [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1) if (x, y) in self._hint_cells]
+            for x, y in cells:
+                cr = self._cell_rect(x, y)
+                screen.fill(self._hint_color, cr)
+                screen.blit(self._static_overlay, cr, cr)
+    def draw_dirty(self, screen, player_pos, fog_enabled, fog_radius, frame_count, hint_path, hint_path_color, extra_rects=()):
+        # Repairs only what changed since the last frame (plus extra_rects, e.g. last frame's sprites and HUD)
+        # and returns the dirty rects for pygame.display.update(). Requires render_static().
+        self._begin_frame(player_pos, fog_enabled, fog_radius, frame_count, hint_path, hint_path_color)
+        dirty = [pygame.Rect(r) for r in extra_rects]
+        if fog_enabled and self._fog_mask_rebuilt:
+            dirty.append(self._fog_window.union(self._prev_fog_window) if self._prev_fog_window else self._fog_window.copy())
+        if self._hint_cells is not self._drawn_hint_cells:
+            dirty.extend(self._cell_rect(x, y) for x, y in self._hint_cells ^ self._drawn_hint_cells)
+            self._drawn_hint_cells = self._hint_cells
+        for r in dirty:
+            self.redraw_region(screen, r)
+        return dirty
     def draw(self, screen, wall_color, start_color, end_color, player_pos, fog_enabled, fog_radius, frame_count, hint_path, hint_path_color):
-        px, py = player_pos
+        if self.static_surface is not None:
+            self._begin_frame(player_pos, fog_enabled, fog_radius, frame_count, hint_path, hint_path_color)
+            self.redraw_region(screen, screen.get_rect())
+            self._drawn_hint_cells = self._hint_cells
+            return
+        if not fog_enabled and not hint_path: # Still generating: the incrementally painted image
+            screen.blit(self.generation_image(screen.get_size(), wall_color, VISITED_CELL_COLOR), (0, 0))
+            return
         bg = FOG_COLOR if fog_enabled else BACKGROUND_COLOR
         screen.fill(bg)
-        r_sq = fog_radius**2
-        for y in range(self.grid_rows):
-            for x in range(self.grid_cols):
-                c = self.grid[y][x]
-                vis = False
-                d_sq = (x - px)**2 + (y - py)**2
-                if not fog_enabled or d_sq <= r_sq:
-                    vis = True
-                    c.visited_frame = frame_count
-                draw = vis or (fog_enabled and frame_count - c.visited_frame <= 2)
-                if draw:
-                    cc = (x, y)
-                    hint = hint_path and cc in hint_path
-                    if fog_enabled or hint:
-                        bgc = hint_path_color if hint else BACKGROUND_COLOR
-                        pygame.draw.rect(screen, bgc, (x * self.cell_size, y * self.cell_size, self.cell_size, self.cell_size))
-                    if vis:
-                        c.draw(screen, self.cell_size, wall_color)
-                        inset = max(1, self.cell_size // 10)
-                        size = self.cell_size - 2 * inset
-                        if cc == self.start_pos:
-                            pygame.draw.rect(screen, start_color, (x * self.cell_size + inset, y * self.cell_size + inset, size, size))
-                        elif cc == self.end_pos:
-                            pygame.draw.rect(screen, end_color, (x * self.cell_size + inset, y * self.cell_size + inset, size, size))
+        cs = self.cell_size
+        walls = self.grid.flat_walls
+        hint_cells = set(hint_path) if hint_path else None
+        if fog_enabled:
+            # Only cells near the player can be visible or fading; find them with one array op
+            window = self._fog_window_cells((player_pos,), fog_radius)
+            vis, fading = self._fog_visibility(player_pos, fog_radius, frame_count, window)
+            ys, xs = np.nonzero(vis | fading)
+            cells = [(x + window[0], y + window[1], bool(vis[y, x])) for y, x in zip(ys.tolist(), xs.tolist())]
+        else:
+            cells = [(x, y, True) for y in range(self.grid_rows) for x in range(self.grid_cols)]
+        for x, y, vis in cells:
+            cc = (x, y)
+            hint = hint_cells is not None and cc in hint_cells
+            if fog_enabled or hint:
+                bgc = hint_path_color if hint else BACKGROUND_COLOR
+                pygame.draw.rect(screen, bgc, (x * cs, y * cs, cs, cs))
+            if vis:
+                draw_cell_walls(screen, walls[y * self.grid_cols + x], x * cs, y * cs, cs, wall_color)
+                inset = max(1, cs // 10)
+                size = cs - 2 * inset
+                if cc == self.start_pos:
+                    pygame.draw.rect(screen, start_color, (x * cs + inset, y * cs + inset, size, size))
+                elif cc == self.end_pos:
+                    pygame.draw.rect(screen, end_color, (x * cs + inset, y * cs + inset, size, size))
     def draw_generation_overlay(self, screen, visited_color, current_marker_color):
-        for r in self.grid:
-            for c in r:
-                if c.visited_gen:
-                    pygame.draw.rect(screen, visited_color, (c.x * self.cell_size, c.y * self.cell_size, self.cell_size, self.cell_size))
+        cs = self.cell_size
+        screen.blit(self.generation_image(screen.get_size(), WALL_COLOR, visited_color), (0, 0))
         if self.current_gen_cell:
-            x, y = self.current_gen_cell.x, self.current_gen_cell.y
-            inset = max(1, self.cell_size // 5)
-            pygame.draw.rect(screen, current_marker_color, (x * self.cell_size + inset, y * self.cell_size + inset, self.cell_size - 2 * inset, self.cell_size - 2 * inset))
+            x, y = self.current_gen_cell
+            inset = max(1, cs // 5)
+            pygame.draw.rect(screen, current_marker_color, (x * cs + inset, y * cs + inset, cs - 2 * inset, cs - 2 * inset))
+    def camera_offset(self):
+        return (0, 0) # The whole maze fits on screen
+    def run_kind(self):
+        return RUN_MAZE, {}
+class EndlessMaze:
+    # Endless mode: Eller's rows streamed into a StreamingGrid window that follows the player.
+    # Each row is rendered once to its own surface and dropped with the row, and frames blit
+    # only the rows in view, so memory and per-frame cost stay flat however deep the player goes.
+    # There is no exit (so no hints or distance field); the score is the depth reached.
+    endless = True
+    def __init__(self, grid_cols, cell_size, view_rows, seed=None):
+        self.grid_cols, self.cell_size, self.view_rows = grid_cols, cell_size, view_rows
+        self.grid_rows = None
+        self.seed = seed if seed is not None else new_seed()
+        self.algorithm = GEN_ELLER
+        self.start_pos = (0, 0)
+        self.end_pos = None
+        self.distance_field = None
+        self.static_surface = None
+        self.current_gen_cell = None
+        self.top_row = 0
+        self.start_generation(GEN_ELLER)
+    def start_generation(self, algorithm):
+        # Rows a screen behind and a screen ahead of the player are kept
+        self.grid = StreamingGrid(self.grid_cols, self.view_rows, self.view_rows, seed=self.seed)
+        self._row_surfaces = {}
+        self.top_row = 0
+    def advance_generation(self, budget_ms=None):
+        self.grid.follow(self.start_pos[1]) # Rows are produced on demand from here on
+        return False
+    def build_distance_field(self):
+        return None
+    def render_static(self, size, wall_color, start_color, end_color):
+        pass # Rows are rendered as they scroll into view
+    def draw_generation_overlay(self, screen, visited_color, current_marker_color):
+        pass
+    def camera_offset(self):
+        return (0, self.top_row * self.cell_size)
+    def run_kind(self):
+        return RUN_ENDLESS, {'behind': self.grid.behind, 'ahead': self.grid.ahead}
+    def _row_surface(self, y, wall_color, start_color):
+        surf = self._row_surfaces.get(y)
+        if surf is None:
+            cs = self.cell_size
+            surf = walls_surface(np.frombuffer(self.grid.row(y), dtype=np.uint8).reshape(1, self.grid_cols), cs, wall_color)
+            if y == self.start_pos[1]:
+                inset = max(1, cs // 10)
+                pygame.draw.rect(surf, start_color, (self.start_pos[0] * cs + inset, inset, cs - 2 * inset, cs - 2 * inset))
+            self._row_surfaces[y] = surf
+        return surf
+    def draw(self, screen, wall_color, start_color, end_color, player_pos, fog_enabled, fog_radius, frame_count, hint_path, hint_path_color):
+        px, py = player_pos
+        g = self.grid
+        old_first = g.first_row
+        g.follow(py)
+        if g.first_row != old_first:
+            for y in [y for y in self._row_surfaces if y < g.first_row]:
+                del self._row_surfaces[y]
+        # Camera: player a third of the way down the screen, never above the oldest row held
+        self.top_row = max(g.first_row, py - self.view_rows // 3)
+        screen.fill(FOG_COLOR if fog_enabled else BACKGROUND_COLOR)
+        cs = self.cell_size
+        for sy in range(self.view_rows + 1):
+            y = self.top_row + sy
+            if g.row(y) is None:
+                break
+            surf = self._row_surface(y, wall_color, start_color)
+            if not fog_enabled:
+                screen.blit(surf, (0, sy * cs))
+                continue
+            # Fog: only the span of this row inside the circle around the player
+            dy = y - py
+            if abs(dy) > fog_radius:
+                continue
+            half = math.isqrt(fog_radius * fog_radius - dy * dy)
+            x0, x1 = max(0, px - half), min(self.grid_cols - 1, px + half)
+            screen.blit(surf, (x0 * cs, sy * cs), (x0 * cs, 0, (x1 - x0 + 1) * cs, cs))
+class TiledMaze:
+    # Mazes bigger than the screen: walls live in a TiledGrid (tiles generated on first access,
+    # spilled to disk when far away) and a camera centred on the player scrolls the view. Tiles are
+    # rendered once into a small LRU of surfaces and a frame blits only those intersecting the
+    # screen, so per-frame cost doesn't depend on maze size. No hints: a whole-maze distance
+    # field would defeat the point.
+    endless = False
+    def __init__(self, grid_cols, grid_rows, cell_size, seed=None):
+        self.grid_cols, self.grid_rows, self.cell_size = grid_cols, grid_rows, cell_size
+        self.seed = seed if seed is not None else new_seed()
+        self.algorithm = None
+        self.start_pos = (0, 0)
+        self.end_pos = (grid_cols - 1, grid_rows - 1)
+        self.distance_field = None
+        self.static_surface = None
+        self.current_gen_cell = None
+        self.grid = None
+        self.camera = (0, 0)
+        self._tile_surfaces = OrderedDict() # (tx, ty) -> rendered tile, most recently used last
+        self._fog_hole = None
+        self.level = False
+    @classmethod
+    def from_level(cls, level, cell_size):
+        # Scrolls a loaded level (maze_engine Maze) too big for the window instead of generating tiles
+        tiled = cls(level.grid_cols, level.grid_rows, cell_size, seed=level.seed)
+        tiled.seed, tiled.algorithm, tiled.level = level.seed, level.algorithm, True
+        tiled.start_pos, tiled.end_pos = level.start_pos, level.end_pos
+        tiled.grid = GridTiles(level.grid)
+        return tiled
+    def start_generation(self, algorithm):
+        if self.grid:
+            self.grid.close()
+        self.algorithm = algorithm
+        self.grid = TiledGrid(self.grid_cols, self.grid_rows, algorithm, seed=self.seed)
+        self._tile_surfaces.clear()
+    def advance_generation(self, budget_ms=None):
+        return False # Tiles are generated when the camera first reaches them
+    def build_distance_field(self):
+        return None
+    def render_static(self, size, wall_color, start_color, end_color):
+        pass
+    def draw_generation_overlay(self, screen, visited_color, current_marker_color):
+        pass
+    def camera_offset(self):
+        return self.camera
+    def run_kind(self):
+        return (RUN_MAZE if self.level else RUN_TILED), {} # A level replays from its seed like any plain maze
+    def _tile_surface(self, tx, ty, wall_color, start_color, end_color):
+        key = (tx, ty)
+        surf = self._tile_surfaces.get(key)
+        if surf is not None:
+            self._tile_surfaces.move_to_end(key)
+            return surf
+        cs, ts = self.cell_size, self.grid.tile_size
+        w, h = self.grid.tile_shape(tx, ty)
+        surf = walls_surface(np.frombuffer(self.grid.tile(tx, ty), dtype=np.uint8).reshape(h, w), cs, wall_color)
+        inset = max(1, cs // 10)
+        for (mx, my), color in ((self.start_pos, start_color), (self.end_pos, end_color)):
+            if mx // ts == tx and my // ts == ty:
+                pygame.draw.rect(surf, color, ((mx - tx * ts) * cs + inset, (my - ty * ts) * cs + inset, cs - 2 * inset, cs - 2 * inset))
+        self._tile_surfaces[key] = surf
+        if len(self._tile_surfaces) > TILE_SURFACE_CACHE:
+            self._tile_surfaces.popitem(last=False)
+        return surf
+    def _tile_range(self, rect, margin=0):
+        # Inclusive tile bounds (tx0, ty0, tx1, ty1) of a pixel rect grown by margin tiles
+        tp = self.grid.tile_size * self.cell_size
+        return (max(0, rect.left // tp - margin), max(0, rect.top // tp - margin),
+                min(self.grid.tile_cols - 1, (rect.right - 1) // tp + margin), min(self.grid.tile_rows - 1, (rect.bottom - 1) // tp + margin))
+    def _draw_fog(self, screen, player_pos, fog_radius):
+        # Fog everywhere except a circle around the player: four fills plus one pre-built mask
+        cs, r = self.cell_size, fog_radius
+        side = (2 * r + 1) * cs
+        if self._fog_hole is None or self._fog_hole.get_width() != side:
+            ys, xs = np.ogrid[-r:r + 1, -r:r + 1]
+            rgba = np.zeros((2 * r + 1, 2 * r + 1, 4), dtype=np.uint8)
+            rgba[xs**2 + ys**2 > r**2] = (*FOG_COLOR, 255)
+            cells = pygame.image.frombuffer(rgba, (2 * r + 1, 2 * r + 1), 'RGBA')
+            self._fog_hole = pygame.transform.scale(cells, (side, side))
+        hole = pygame.Rect((player_pos[0] - r) * cs - self.camera[0], (player_pos[1] - r) * cs - self.camera[1], side, side)
+        sw, sh = screen.get_size()
+        for rect in ((0, 0, sw, hole.top), (0, hole.bottom, sw, sh - hole.bottom), (0, hole.top, hole.left, side), (hole.right, hole.top, sw - hole.right, side)):
+            if rect[2] > 0 and rect[3] > 0:
+                screen.fill(FOG_COLOR, rect)
+        screen.blit(self._fog_hole, hole)
+    def draw(self, screen, wall_color, start_color, end_color, player_pos, fog_enabled, fog_radius, frame_count, hint_path, hint_path_color):
+        cs = self.cell_size
+        view = screen.get_rect()
+        # Camera: player centred, clamped to the maze edges
+        cx = min(max(0, player_pos[0] * cs + cs // 2 - view.width // 2), max(0, self.grid_cols * cs - view.width))
+        cy = min(max(0, player_pos[1] * cs + cs // 2 - view.height // 2), max(0, self.grid_rows * cs - view.height))
+        self.camera = (cx, cy)
+        view.topleft = (cx, cy)
+        screen.fill(BACKGROUND_COLOR)
+        tp = self.grid.tile_size * cs
+        tx0, ty0, tx1, ty1 = self._tile_range(view)
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                screen.blit(self._tile_surface(tx, ty, wall_color, start_color, end_color), (tx * tp - cx, ty * tp - cy))
+        if fog_enabled:
+            self._draw_fog(screen, player_pos, fog_radius)
+        # Render at most one tile of the surrounding ring per frame, so scrolling onto it costs nothing
+        mx0, my0, mx1, my1 = self._tile_range(view, 1)
+        for ty in range(my0, my1 + 1):
+            for tx in range(mx0, mx1 + 1):
+                if (tx, ty) not in self._tile_surfaces:
+                    self._tile_surface(tx, ty, wall_color, start_color, end_color)
+                    return
 class Player:
     def __init__(self, x, y, cell_size, color):
         self.x, self.y = x, y
@@ -241,18 +639,18 @@ class Player:
     def update_pixel_pos(self):
         self.pixel_x = self.x * self.cell_size + self.cell_size // 2
         self.pixel_y = self.y * self.cell_size + self.cell_size // 2
-    def draw(self, screen):
-        pygame.draw.circle(screen, self.color, (self.pixel_x, self.pixel_y), self.radius)
+    @property
+    def rect(self):
+        return pygame.Rect(self.pixel_x - self.radius - 1, self.pixel_y - self.radius - 1, 2 * self.radius + 3, 2 * self.radius + 3)
+    def draw(self, screen, offset=(0, 0)):
+        # offset = camera position in pixels (scrolling mazes)
+        ox, oy = offset
+        pygame.draw.circle(screen, self.color, (self.pixel_x - ox, self.pixel_y - oy), self.radius)
+        return self.rect.move(-ox, -oy)
     def move(self, dx, dy, maze, sounds):
-        curr = maze.grid[self.y][self.x]
-        move = False
-        if dx == 1 and not curr.walls['E']: move = True
-        elif dx == -1 and not curr.walls['W']: move = True
-        elif dy == 1 and not curr.walls['S']: move = True
-        elif dy == -1 and not curr.walls['N']: move = True
-        if move:
-            self.x += dx
-            self.y += dy
+        new_pos = try_move(maze.grid, (self.x, self.y), dx, dy)
+        if new_pos:
+            self.x, self.y = new_pos
             self.update_pixel_pos()
             sounds['move'].play()
             return True
@@ -261,92 +659,239 @@ class Player:
             return False
 
 # --- Helper Functions ---
-def draw_text(screen, text, size, x, y, color, align="midtop"):
+def log(*args):
+    if LOG_ENABLED:
+        print(*args)
+
+_fonts = {} # size -> pygame Font; loading the default font is far slower than rendering with it
+_text_cache = OrderedDict() # (text, size, color) -> rendered surface, most recently used last
+
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+def render_text(text, size, color):
+    # Cached font.render(); static menu and HUD lines are rasterized once
+    key = (text, size, color)
+    surf = _text_cache.get(key)
+    if surf is not None:
+        _text_cache.move_to_end(key)
+        return surf
+    surf = _text_cache[key] = get_font(size).render(text, True, color)
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return surf
+
+def draw_text(screen, text, size, x, y, color, align="midtop", glyphs=False):
+    # glyphs=True for text that changes every frame (timer, counters): drawn from per-character
+    # surfaces, so a new value costs a few blits instead of a render and never floods the cache
+    t0 = time.perf_counter()
     try:
-        font = pygame.font.Font(None, size)
-        surf = font.render(text, True, color)
+        if glyphs:
+            parts = [render_text(ch, size, color) for ch in text]
+            rect = pygame.Rect(0, 0, sum(p.get_width() for p in parts), get_font(size).get_height())
+            setattr(rect, align, (x, y))
+            gx = rect.x
+            for p in parts:
+                screen.blit(p, (gx, rect.y))
+                gx += p.get_width()
+            return rect
+        surf = render_text(text, size, color)
         rect = surf.get_rect()
         setattr(rect, align, (x, y))
         screen.blit(surf, rect) # Simplified alignment
+        return rect
     except Exception as e:
         print(f"Error drawing text '{text}': {e}")
+    finally:
+        if profiler: profiler.add_nested("text", time.perf_counter() - t0)
 
-# --- Dim Surface ---
-dim_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA); dim_surface.fill(COLOR_DIM_OVERLAY)
-
-# --- Pygame Setup ---
-print("Initializing Pygame...")
-screen = None # Initialize screen to None
-ambience_channel = None
-try:
-    print(" Pre-initializing Mixer...")
-    pygame.mixer.pre_init(SAMPLE_RATE, -16, 2, AUDIO_BUFFER_SIZE)
-    print(" Initializing Pygame Core...")
-    pygame.init() # Initialize all Pygame modules
-    print(" Initializing Font...")
-    pygame.font.init() # Explicitly initialize font
-    print(" Setting Mixer Channels...")
-    pygame.mixer.set_num_channels(8)
-    print(" Getting Ambience Channel...")
-    ambience_channel = pygame.mixer.Channel(AMBIENCE_CHANNEL_NUM)
-    print(" Setting Display Mode...")
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    print(" Setting Caption...")
-    pygame.display.set_caption(WINDOW_TITLE)
-    print(" Creating Clock...")
-    clock = pygame.time.Clock()
-    print(" Pygame initialized successfully.")
-except Exception as e:
-    print(f"Fatal Error initializing Pygame: {e}")
-    # Attempt cleanup even if initialization failed partially
-    if pygame.mixer.get_init(): pygame.mixer.quit()
-    if pygame.font.get_init(): pygame.font.quit()
-    if pygame.get_init(): pygame.quit()
-    sys.exit() # Exit if Pygame cannot initialize
-
-# --- Generate Sound Assets ---
-print("Generating sound assets...")
-sounds = {}
-try:
-    # (Sound generation code remains the same, ensure amplitudes are reasonable)
-    sounds['select'] = pygame.sndarray.make_sound(generate_sine_wave(660, 0.05, a=0.2)); sounds['move'] = pygame.sndarray.make_sound(generate_square_wave(220, 0.04, a=0.15)); sounds['hit_wall'] = pygame.sndarray.make_sound(generate_noise(0.06, a=0.08))
-    win1=generate_sine_wave(261.63,0.10,a=0.3); win2=generate_sine_wave(329.63,0.10,a=0.3); win3=generate_sine_wave(392.00,0.15,a=0.3); sounds['win'] = pygame.sndarray.make_sound(generate_combined_wave([win1,win2,win3]))
-    sounds['start_game'] = pygame.sndarray.make_sound(generate_sine_wave(440, 0.2, a=0.25))
-    lose1=generate_sine_wave(196.00,0.15,a=0.3); lose2=generate_sine_wave(164.81,0.15,a=0.3); lose3=generate_sine_wave(130.81,0.20,a=0.3); sounds['lose'] = pygame.sndarray.make_sound(generate_combined_wave([lose1,lose2,lose3]))
-    sounds['hint'] = pygame.sndarray.make_sound(generate_sine_wave(880, 0.15, a=0.2))
-    sounds['ambience'] = pygame.sndarray.make_sound(generate_slow_sine_mod(base_freq=40, mod_freq=0.1, mod_depth=5, duration=15.0, a=0.05))
-    print("Sound assets generated successfully.")
-except Exception as e:
-    print(f"Error generating sounds: {e}. Using dummy sounds.")
-    sound_keys = ['select','move','hit_wall','win','start_game','lose','hint','ambience']
-    dummy_sound_data = np.zeros((100, 2), dtype=np.int16)
-    dummy_sound = pygame.sndarray.make_sound(dummy_sound_data)
-    sounds = {k: dummy_sound for k in sound_keys}
-
+class FrameProfiler:
+    """
+    Per-frame phase timings for the game loop. mark(phase) charges the time
+    since the previous mark to phase; time reported through add_nested() inside
+    that span (text rendering within the draw pass) is moved to its own phase.
+    Keeps PROFILE_WINDOW frames for rolling percentiles and, with trace_path,
+    writes every frame to a .csv (streamed) or .json (written on close) trace.
+    """
+    def __init__(self, phases=PROFILE_PHASES, window=PROFILE_WINDOW, trace_path=None):
+        self.phases = phases
+        self.history = {name: deque(maxlen=window) for name in phases + ("total",)}
+        self.frame = 0
+        self.trace_path = trace_path
+        self._trace_rows = None; self._csv_file = None; self._csv = None
+        if trace_path and trace_path.endswith(".json"):
+            self._trace_rows = []
+        elif trace_path:
+            self._csv_file = open(trace_path, "w", newline="")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(("frame", "state") + phases + ("total",))
+        self.begin_frame()
+    def begin_frame(self):
+        self._current = dict.fromkeys(self.phases, 0.0)
+        self._nested = 0.0
+        self._last = time.perf_counter()
+    def add_nested(self, phase, seconds):
+        self._current[phase] += seconds
+        self._nested += seconds
+    def mark(self, phase):
+        now = time.perf_counter()
+        self._current[phase] += now - self._last - self._nested
+        self._nested = 0.0
+        self._last = now
+    def end_frame(self, state):
+        ms = {name: t * 1000.0 for name, t in self._current.items()}
+        ms["total"] = sum(ms.values())
+        for name, value in ms.items():
+            self.history[name].append(value)
+        if self._csv:
+            self._csv.writerow([self.frame, state] + [f"{ms[name]:.4f}" for name in self.phases + ("total",)])
+        elif self._trace_rows is not None:
+            self._trace_rows.append(dict(frame=self.frame, state=state, **{k: round(v, 4) for k, v in ms.items()}))
+        self.frame += 1
+        self.begin_frame()
+    def percentiles(self, name, ps=(50, 95, 99)):
+        values = sorted(self.history[name])
+        if not values:
+            return [0.0] * len(ps)
+        return [values[min(len(values) - 1, len(values) * p // 100)] for p in ps]
+    def summary(self):
+        out = {}
+        for name, values in self.history.items():
+            p50, p95, p99 = self.percentiles(name)
+            out[name] = {"p50": p50, "p95": p95, "p99": p99, "max": max(values, default=0.0)}
+        return out
+    def draw_hud(self, screen):
+        # Last / p50 / p95 / p99 ms per phase, top left; returns the rects drawn (for dirty-rect updates)
+        rects = []
+        y = 40
+        rects.append(draw_text(screen, "phase      last   p50   p95   p99 ms", 18, 10, y, COLOR_YELLOW, align="topleft"))
+        for name in self.phases + ("total",):
+            last = self.history[name][-1] if self.history[name] else 0.0
+            p50, p95, p99 = self.percentiles(name)
+            y += 16
+            rects.append(draw_text(screen, f"{name:<10} {last:5.2f} {p50:5.2f} {p95:5.2f} {p99:5.2f}", 18, 10, y, COLOR_YELLOW, align="topleft", glyphs=True))
+        return rects
+    def close(self):
+        if self._csv_file:
+            self._csv_file.close()
+            self._csv_file = self._csv = None
+        elif self._trace_rows is not None:
+            with open(self.trace_path, "w") as f:
+                json.dump({"phases": list(self.phases), "window": self.history["total"].maxlen, "summary": self.summary(), "frames": self._trace_rows}, f)
+            self._trace_rows = None
 
 # --- Game Objects and State Variables ---
 maze = None; player = None; game_state = STATE_MENU; paused_from_state = None
+settings_return_state = STATE_MENU # Where Settings goes back to: the menu or the pause screen (which keeps paused_from_state)
 timer_start_ticks = 0; time_limit_seconds = 0; pause_start_ticks = 0; total_paused_time = 0
-frame_counter = 0; hint_path = None; hint_timer_end = 0
+frame_counter = 0; hint_path = None; hint_timer_end = 0; hint_pending = False
+profiler = None; profile_hud = False # FrameProfiler created by main(); overlay toggled with PROFILE_HUD_KEY
+job_results = queue.Queue() # Messages from background generation / distance-field jobs, drained every frame
+gen_job = None; field_job = None; gen_progress = None # Running jobs and the latest generation snapshot
+last_drawn_state = None; prev_sprite_rects = [] # Dirty-rect bookkeeping: what was drawn over the maze last frame
+start_game_requested = False
+level_path = None # Saved maze file to play instead of generating one (--level)
+first_seed = None # Seed for the first game (--seed); later games get fresh seeds
+record_dir = None # Where finished runs are saved for replay (--record)
+move_log = MoveLog() # Moves made in the current game
+MOVE_KEYS = {pygame.K_UP: (0, -1), pygame.K_w: (0, -1), pygame.K_DOWN: (0, 1), pygame.K_s: (0, 1),
+             pygame.K_LEFT: (-1, 0), pygame.K_a: (-1, 0), pygame.K_RIGHT: (1, 0), pygame.K_d: (1, 0)}
+screen = None; clock = None; ambience_channel = None; sounds = None; dim_surface = None # Created by main()
+
+def load_level(path):
+    # Saved maze, scaled to fit the window, or scrolled with a camera when that would make cells too small
+    # to play; its walls are memory-mapped, not read up front
+    maze = Maze.load(path)
+    fit = min(SCREEN_WIDTH // maze.grid_cols, SCREEN_HEIGHT // maze.grid_rows)
+    if fit >= LEVEL_MIN_CELL_SIZE:
+        maze.cell_size = fit
+    else:
+        maze = TiledMaze.from_level(maze, LEVEL_SCROLL_CELL_SIZE)
+    log(f"Loaded level {path}: {maze.grid_cols}x{maze.grid_rows}, cell size {maze.cell_size}{' (scrolling)' if fit < LEVEL_MIN_CELL_SIZE else ''}, algorithm {maze.algorithm}, seed {maze.seed}")
+    return maze
+
+def save_recording(won):
+    # Writes the finished run (maze inputs + moves) to record_dir; replay with python -m maze_engine.replay
+    if not record_dir or not player or maze.seed is None:
+        return
+    kind, extra = maze.run_kind()
+    run = make_run(kind, maze.grid_cols, maze.grid_rows, maze.algorithm, maze.seed, move_log, won, **extra)
+    os.makedirs(record_dir, exist_ok=True)
+    path = os.path.join(record_dir, f"run_{time.strftime('%Y%m%d_%H%M%S')}_{maze.seed}.json")
+    save_run(path, run)
+    log(f"Recorded {len(move_log)} moves to {path}")
+
+def cancel_jobs():
+    # Stops background work for the current maze; late messages from cancelled jobs are ignored
+    global gen_job, field_job
+    for job in (gen_job, field_job):
+        if job:
+            job.cancel()
+    gen_job = field_job = None
+
+def finish_generation(current_ticks):
+    # Generation done (on this thread or the worker): place the player and start the distance field in the background
+    global game_state, paused_from_state, pause_start_ticks, player, timer_start_ticks, total_paused_time, hint_path, hint_timer_end, hint_pending, field_job
+    if game_state in (STATE_PAUSED, STATE_SETTINGS): # Finished while paused or in Settings (bulk generation can't stop midway): stay paused
+        paused_from_state = STATE_PLAYING
+        pause_start_ticks = current_ticks
+    else:
+        game_state = STATE_PLAYING
+    log("Gen finished -> PLAYING.")
+    sx, sy = maze.start_pos
+    player = Player(sx, sy, maze.cell_size, PLAYER_COLOR)
+    log(f"Player at ({sx},{sy})")
+    sounds['start_game'].play()
+    timer_start_ticks = current_ticks
+    total_paused_time = 0
+    hint_path = None
+    hint_timer_end = 0
+    hint_pending = False
+    field = maze.build_distance_field()
+    if field:
+        field_job = distance_field_job(field, job_results, DISTANCE_FIELD_BUDGET_MS).start()
+    maze.render_static(screen.get_size(), WALL_COLOR, START_COLOR, END_COLOR)
+    if game_state == STATE_PLAYING and not ambience_channel.get_busy():
+        ambience_channel.play(sounds['ambience'], loops=-1)
 
 # --- Function to Start a New Game --- (Unchanged)
-def start_new_game():
-    global maze, player, game_state, grid_cols, grid_rows, cell_size, fog_radius, hint_duration_ms, timer_start_ticks, time_limit_seconds, total_paused_time, paused_from_state, hint_path, hint_timer_end
+def start_new_game(seed=None):
+    # seed=None picks a fresh seed (or --seed for the first game); the same seed and settings give the same maze
+    global maze, player, game_state, grid_cols, grid_rows, cell_size, fog_radius, hint_duration_ms, timer_start_ticks, time_limit_seconds, total_paused_time, paused_from_state, hint_path, hint_timer_end, hint_pending
+    global first_seed, move_log, gen_job, gen_progress
+    cancel_jobs()
+    if seed is None:
+        seed, first_seed = first_seed, None
+    if seed is None:
+        seed = new_seed()
     difficulty_str = game_settings["difficulty"]
     settings = DIFFICULTY_SETTINGS_MAP[difficulty_str]
     grid_cols, grid_rows, cell_size = settings['cols'], settings['rows'], settings['cell_size']
     time_factor = settings['time_factor']
     fog_radius = settings['fog_radius']
     hint_duration_ms = settings['hint_base_ms']
-    print(f"Starting: {difficulty_str}, {grid_cols}x{grid_rows}, Algo={game_settings['algorithm']}, Timer={game_settings['timer_enabled']}, Fog={game_settings['fog_enabled']}, Hints={game_settings['hints_enabled']}")
-    maze = Maze(grid_cols, grid_rows, cell_size)
+    log(f"Starting: {difficulty_str}, {grid_cols}x{grid_rows}, Algo={game_settings['algorithm']}, Gen={game_settings['gen_mode']}, Timer={game_settings['timer_enabled']}, Fog={game_settings['fog_enabled']}, Hints={game_settings['hints_enabled']}")
+    if level_path:
+        maze = load_level(level_path)
+        grid_cols, grid_rows, cell_size = maze.grid_cols, maze.grid_rows, maze.cell_size
+    elif game_settings["algorithm"] == ALGORITHM_ENDLESS:
+        maze = EndlessMaze(min(grid_cols, SCREEN_WIDTH // cell_size), cell_size, SCREEN_HEIGHT // cell_size, seed)
+    elif grid_cols * cell_size > SCREEN_WIDTH or grid_rows * cell_size > SCREEN_HEIGHT:
+        maze = TiledMaze(grid_cols, grid_rows, cell_size, seed) # Too big for the screen: scroll instead
+    else:
+        maze = Maze(grid_cols, grid_rows, cell_size, seed=seed)
+    log(f"Seed: {maze.seed}")
     player = None
+    move_log = MoveLog()
     game_state = STATE_GENERATING
-    if game_settings['timer_enabled']:
+    if game_settings['timer_enabled'] and not maze.endless: # No time limit without an exit
         base_time = 5
         time_per_cell = 0.1
         time_limit_seconds = base_time + (grid_cols * grid_rows * time_per_cell * time_factor)
-        print(f"Time limit: {time_limit_seconds:.1f}s")
+        log(f"Time limit: {time_limit_seconds:.1f}s")
     else:
         time_limit_seconds = 0
     timer_start_ticks = 0
@@ -354,290 +899,425 @@ def start_new_game():
     paused_from_state = None
     hint_path = None
     hint_timer_end = 0
-    algo_func = maze.start_generation_prims if game_settings["algorithm"] == ALGORITHM_PRIMS else maze.start_generation_rb
-    algo_func()
+    hint_pending = False
+    gen_progress = None
+    if not level_path:
+        maze.start_generation(ALGORITHM_GENERATORS[game_settings["algorithm"]])
+        budget = GEN_MODE_BUDGET_MS[game_settings["gen_mode"]]
+        if budget != 0: # Fast / Instant run on a worker thread; Animated stays one step per frame here
+            gen_job = generation_job(maze, job_results, budget).start()
     ambience_channel.stop()
 
-# --- Main Game Loop ---
-print("Starting main game loop...")
-running = True
-try: # Wrap main loop in try...except
-    while running:
-        # Timekeeping
-        current_ticks = pygame.time.get_ticks()
-        delta_time_ms = clock.tick(60) # Limit FPS, get ms since last frame
-        frame_counter = (frame_counter + 1) % 3600 # Increment and wrap frame counter
-
-        # --- Event Handling ---
-        events = pygame.event.get()
-        for event in events:
-            if event.type == pygame.QUIT: running = False
-            if event.type == pygame.KEYDOWN:
-                # --- State-Specific Input Handling ---
-                # (Input logic remains the same as the previous version)
-                if game_state == STATE_MENU:
-                    if event.key == pygame.K_s:
-                        game_state = STATE_SETTINGS
-                        paused_from_state = STATE_MENU
-                        settings_menu_selection_index = 0
-                        sounds['select'].play()
-                    # elif event.key in (pygame.K_RETURN, pygame.K_SPACE): # Defer this to after drawing
-                    #     sounds['select'].play()
-                    #     time.sleep(0.05)
-                    #     start_new_game()
-                    elif event.key == pygame.K_ESCAPE:
-                        running = False
-                    # Add a flag to start game *after* drawing the menu once
-                    elif event.key in (pygame.K_RETURN, pygame.K_SPACE):
-                         start_game_requested = True # Set a flag instead of starting immediately
-                elif game_state == STATE_SETTINGS:
-                    if event.key == pygame.K_UP:
-                        settings_menu_selection_index = (settings_menu_selection_index - 1) % len(SETTINGS_OPTIONS)
-                        sounds['select'].play()
-                    elif event.key == pygame.K_DOWN:
-                        settings_menu_selection_index = (settings_menu_selection_index + 1) % len(SETTINGS_OPTIONS)
-                        sounds['select'].play()
-                    elif event.key in (pygame.K_RETURN, pygame.K_SPACE, pygame.K_LEFT, pygame.K_RIGHT):
-                        option = SETTINGS_OPTIONS[settings_menu_selection_index]
-                        changed = False
-                        direction = 1 if event.key != pygame.K_LEFT else -1
-                        if option == "Difficulty":
-                            idx = DIFFICULTY_LEVELS.index(game_settings["difficulty"])
-                            game_settings["difficulty"] = DIFFICULTY_LEVELS[(idx + direction) % len(DIFFICULTY_LEVELS)]
-                            changed = True
-                        elif option == "Timer":
-                            game_settings["timer_enabled"] = not game_settings["timer_enabled"]
-                            changed = True
-                        elif option == "Fog of War":
-                            game_settings["fog_enabled"] = not game_settings["fog_enabled"]
-                            changed = True
-                        elif option == "Hints":
-                            game_settings["hints_enabled"] = not game_settings["hints_enabled"]
-                            changed = True
-                        elif option == "Algorithm":
-                            idx = ALGORITHM_CHOICES.index(game_settings["algorithm"])
-                            game_settings["algorithm"] = ALGORITHM_CHOICES[(idx + direction) % len(ALGORITHM_CHOICES)]
-                            changed = True
-                        elif option == "Back":
-                            game_state = paused_from_state if paused_from_state is not None else STATE_MENU
-                            changed = True
-                        if changed:
+def main(level=None, seed=None, record=None, profile=False, profile_trace=None, quiet=False):
+    global level_path, first_seed, record_dir, profiler, profile_hud, LOG_ENABLED, screen, clock, ambience_channel, sounds, dim_surface, game_state, paused_from_state, settings_return_state, settings_menu_selection_index
+    global pause_start_ticks, total_paused_time, frame_counter, hint_path, hint_timer_end, hint_pending
+    global start_game_requested, last_drawn_state, prev_sprite_rects, gen_job, field_job, gen_progress
+    level_path, first_seed, record_dir = level, seed, record
+    if quiet:
+        LOG_ENABLED = False
+        set_verbose(False)
+    profiler = FrameProfiler(trace_path=profile_trace)
+    profile_hud = profile
+    # --- Dim Surface ---
+    dim_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA); dim_surface.fill(COLOR_DIM_OVERLAY)
+
+    # --- Pygame Setup ---
+    log("Initializing Pygame...")
+    try:
+        log(" Pre-initializing Mixer...")
+        pygame.mixer.pre_init(SAMPLE_RATE, -16, 2, AUDIO_BUFFER_SIZE)
+        log(" Initializing Pygame Core...")
+        pygame.init() # Initialize all Pygame modules
+        log(" Initializing Font...")
+        pygame.font.init() # Explicitly initialize font
+        log(" Setting Mixer Channels...")
+        pygame.mixer.set_num_channels(8)
+        log(" Getting Ambience Channel...")
+        ambience_channel = pygame.mixer.Channel(AMBIENCE_CHANNEL_NUM)
+        log(" Setting Display Mode...")
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        log(" Setting Caption...")
+        pygame.display.set_caption(WINDOW_TITLE)
+        log(" Creating Clock...")
+        clock = pygame.time.Clock()
+        log(" Pygame initialized successfully.")
+    except Exception as e:
+        print(f"Fatal Error initializing Pygame: {e}")
+        # Attempt cleanup even if initialization failed partially
+        if pygame.mixer.get_init(): pygame.mixer.quit()
+        if pygame.font.get_init(): pygame.font.quit()
+        if pygame.get_init(): pygame.quit()
+        sys.exit() # Exit if Pygame cannot initialize
+
+    # --- Sound Assets ---
+    # Generated lazily and cached on disk, so the menu appears without waiting for synthesis
+    sounds = SoundBank(SOUND_SPECS, SOUND_CACHE_DIR)
+    sounds.prewarm()
+
+    # --- Main Game Loop ---
+    log("Starting main game loop...")
+    running = True
+    try: # Wrap main loop in try...except
+        while running:
+            # Timekeeping
+            current_ticks = pygame.time.get_ticks()
+            delta_time_ms = clock.tick(60) # Limit FPS, get ms since last frame
+            frame_counter = (frame_counter + 1) % 3600 # Increment and wrap frame counter
+            profiler.begin_frame() # Excludes the clock.tick() wait
+
+            # --- Event Handling ---
+            events = pygame.event.get()
+            for event in events:
+                if event.type == pygame.QUIT: running = False
+                if event.type == pygame.KEYDOWN and event.key == PROFILE_HUD_KEY:
+                    profile_hud = not profile_hud
+                    last_drawn_state = None # Full redraw, so the overlay area is repainted
+                elif event.type == pygame.KEYDOWN:
+                    # --- State-Specific Input Handling ---
+                    # (Input logic remains the same as the previous version)
+                    if game_state == STATE_MENU:
+                        if event.key == pygame.K_s:
+                            game_state = STATE_SETTINGS
+                            settings_return_state = STATE_MENU
+                            settings_menu_selection_index = 0
                             sounds['select'].play()
-                    elif event.key in (pygame.K_ESCAPE, pygame.K_b):
-                        game_state = paused_from_state if paused_from_state is not None else STATE_MENU
-                        sounds['select'].play()
-                elif game_state == STATE_PLAYING:
-                    if event.key == pygame.K_ESCAPE:
-                        game_state = STATE_PAUSED
-                        paused_from_state = STATE_PLAYING
-                        pause_start_ticks = current_ticks
-                        print("Paused")
-                        ambience_channel.pause()
-                    elif event.key == pygame.K_h and game_settings["hints_enabled"] and player and maze and not hint_path:
-                        print("Hint key...")
-                        path = find_path_bfs(maze, (player.x, player.y), maze.end_pos)
-                        if path:
-                            hint_path = path
-                            hint_timer_end = current_ticks + hint_duration_ms
-                            sounds['hint'].play()
-                            print(f"Hint found ({len(path)}). Show: {hint_duration_ms / 1000.0:.1f}s.")
-                        else:
-                            print("Hint path not found.")
-                    elif player: # Movement
-                        moved = False
-                        if event.key in (pygame.K_UP, pygame.K_w): moved = player.move(0, -1, maze, sounds)
-                        elif event.key in (pygame.K_DOWN, pygame.K_s): moved = player.move(0, 1, maze, sounds)
-                        elif event.key in (pygame.K_LEFT, pygame.K_a): moved = player.move(-1, 0, maze, sounds)
-                        elif event.key in (pygame.K_RIGHT, pygame.K_d): moved = player.move(1, 0, maze, sounds)
-                        if moved and (player.x, player.y) == maze.end_pos:
-                            print("Win!")
-                            sounds['win'].play()
-                            game_state = STATE_WON
-                            ambience_channel.stop()
-                elif game_state == STATE_PAUSED:
-                    if event.key in (pygame.K_ESCAPE, pygame.K_r):
-                        if paused_from_state == STATE_PLAYING:
-                            game_state = STATE_PLAYING
-                            p_dur = current_ticks - pause_start_ticks
-                            total_paused_time += p_dur
-                            print(f"Resumed. Paused: {p_dur / 1000.0:.1f}s")
+                        # elif event.key in (pygame.K_RETURN, pygame.K_SPACE): # Defer this to after drawing
+                        #     sounds['select'].play()
+                        #     time.sleep(0.05)
+                        #     start_new_game()
+                        elif event.key == pygame.K_ESCAPE:
+                            running = False
+                        # Add a flag to start game *after* drawing the menu once
+                        elif event.key in (pygame.K_RETURN, pygame.K_SPACE):
+                             start_game_requested = True # Set a flag instead of starting immediately
+                    elif game_state == STATE_SETTINGS:
+                        if event.key == pygame.K_UP:
+                            settings_menu_selection_index = (settings_menu_selection_index - 1) % len(SETTINGS_OPTIONS)
                             sounds['select'].play()
-                            ambience_channel.unpause()
-                        else:
+                        elif event.key == pygame.K_DOWN:
+                            settings_menu_selection_index = (settings_menu_selection_index + 1) % len(SETTINGS_OPTIONS)
+                            sounds['select'].play()
+                        elif event.key in (pygame.K_RETURN, pygame.K_SPACE, pygame.K_LEFT, pygame.K_RIGHT):
+                            option = SETTINGS_OPTIONS[settings_menu_selection_index]
+                            changed = False
+                            direction = 1 if event.key != pygame.K_LEFT else -1
+                            if option == "Difficulty":
+                                idx = DIFFICULTY_LEVELS.index(game_settings["difficulty"])
+                                game_settings["difficulty"] = DIFFICULTY_LEVELS[(idx + direction) % len(DIFFICULTY_LEVELS)]
+                                changed = True
+                            elif option == "Timer":
+                                game_settings["timer_enabled"] = not game_settings["timer_enabled"]
+                                changed = True
+                            elif option == "Fog of War":
+                                game_settings["fog_enabled"] = not game_settings["fog_enabled"]
+                                changed = True
+                            elif option == "Hints":
+                                game_settings["hints_enabled"] = not game_settings["hints_enabled"]
+                                changed = True
+                            elif option == "Algorithm":
+                                idx = ALGORITHM_CHOICES.index(game_settings["algorithm"])
+                                game_settings["algorithm"] = ALGORITHM_CHOICES[(idx + direction) % len(ALGORITHM_CHOICES)]
+                                changed = True
+                            elif option == "Generation":
+                                idx = GEN_MODE_CHOICES.index(game_settings["gen_mode"])
+                                game_settings["gen_mode"] = GEN_MODE_CHOICES[(idx + direction) % len(GEN_MODE_CHOICES)]
+                                changed = True
+                            elif option == "Back":
+                                game_state = settings_return_state
+                                changed = True
+                            if changed:
+                                sounds['select'].play()
+                        elif event.key in (pygame.K_ESCAPE, pygame.K_b):
+                            game_state = settings_return_state
+                            sounds['select'].play()
+                    elif game_state == STATE_GENERATING:
+                        if event.key == pygame.K_ESCAPE:
+                            game_state = STATE_PAUSED
+                            paused_from_state = STATE_GENERATING
+                            if gen_job: gen_job.pause()
+                            log("Paused generation")
+                        elif event.key == pygame.K_c:
+                            cancel_jobs()
                             game_state = STATE_MENU
                             sounds['select'].play()
+                            log("Generation cancelled")
+                    elif game_state == STATE_PLAYING:
+                        if event.key == pygame.K_ESCAPE:
+                            game_state = STATE_PAUSED
+                            paused_from_state = STATE_PLAYING
+                            pause_start_ticks = current_ticks
+                            log("Paused")
+                            ambience_channel.pause()
+                        elif event.key == pygame.K_h and game_settings["hints_enabled"] and player and maze and maze.distance_field and not hint_path and not hint_pending:
+                            log("Hint key...")
+                            hint_pending = True # Served from the distance field once it reaches the player
+                        elif player and event.key in MOVE_KEYS: # Movement
+                            dx, dy = MOVE_KEYS[event.key]
+                            if player.move(dx, dy, maze, sounds):
+                                move_log.record(dx, dy)
+                                if (player.x, player.y) == maze.end_pos:
+                                    log("Win!")
+                                    sounds['win'].play()
+                                    game_state = STATE_WON
+                                    ambience_channel.stop()
+                                    save_recording(True)
+                    elif game_state == STATE_PAUSED:
+                        if event.key in (pygame.K_ESCAPE, pygame.K_r):
+                            if paused_from_state == STATE_PLAYING:
+                                game_state = STATE_PLAYING
+                                p_dur = current_ticks - pause_start_ticks
+                                total_paused_time += p_dur
+                                log(f"Resumed. Paused: {p_dur / 1000.0:.1f}s")
+                                sounds['select'].play()
+                                ambience_channel.unpause()
+                            elif paused_from_state == STATE_GENERATING:
+                                game_state = STATE_GENERATING
+                                if gen_job: gen_job.resume()
+                                sounds['select'].play()
+                            else:
+                                cancel_jobs()
+                                game_state = STATE_MENU
+                                sounds['select'].play()
+                                ambience_channel.stop()
+                        elif event.key == pygame.K_s:
+                            game_state = STATE_SETTINGS
+                            settings_return_state = STATE_PAUSED
+                            settings_menu_selection_index = 0
+                            sounds['select'].play()
+                        elif event.key == pygame.K_m:
+                            save_recording(False) # Abandoned runs (and every endless run) end here
+                            cancel_jobs()
+                            game_state = STATE_MENU
+                            paused_from_state = None
+                            sounds['select'].play()
                             ambience_channel.stop()
-                    elif event.key == pygame.K_s:
-                        game_state = STATE_SETTINGS
-                        paused_from_state = STATE_PAUSED
-                        settings_menu_selection_index = 0
-                        sounds['select'].play()
-                    elif event.key == pygame.K_m:
-                        game_state = STATE_MENU
-                        paused_from_state = None
-                        sounds['select'].play()
-                        ambience_channel.stop()
-                    elif event.key == pygame.K_q:
-                        running = False
-                elif game_state in (STATE_WON, STATE_LOST):
-                    if event.key in (pygame.K_r, pygame.K_RETURN, pygame.K_SPACE):
-                        sounds['select'].play()
-                        time.sleep(0.05)
-                        start_new_game()
-                    elif event.key == pygame.K_m:
-                        game_state = STATE_MENU
-                        paused_from_state = None
-                        sounds['select'].play()
-                    elif event.key == pygame.K_ESCAPE:
-                        running = False
-
-        # --- Input Processing (Post-Event Loop) ---
-        # Handle state changes triggered by flags set in the event loop
-        if game_state == STATE_MENU and 'start_game_requested' in locals() and start_game_requested:
-            sounds['select'].play()
-            time.sleep(0.05)
-            start_new_game()
-            start_game_requested = False # Reset flag
-
-
-        # --- Game Logic ---
-        if game_state == STATE_GENERATING:
-            if maze:
-                gen_func = maze.generate_step_prims if game_settings["algorithm"] == ALGORITHM_PRIMS else maze.generate_step_rb
-                if not gen_func():
-                    game_state = STATE_PLAYING
-                    print("Gen finished -> PLAYING.")
-                    sx, sy = maze.start_pos
-                    player = Player(sx, sy, maze.cell_size, PLAYER_COLOR)
-                    print(f"Player at ({sx},{sy})")
-                    sounds['start_game'].play()
-                    timer_start_ticks = current_ticks
-                    total_paused_time = 0
-                    hint_path = None
-                    hint_timer_end = 0
-                    if not ambience_channel.get_busy():
-                        ambience_channel.play(sounds['ambience'], loops=-1)
-            else:
-                game_state = STATE_MENU # Error case
-        elif game_state == STATE_PLAYING:
-            if game_settings['timer_enabled']: # Timer Update
-                eff_start = timer_start_ticks + total_paused_time
-                elapsed = (current_ticks - eff_start) / 1000.0
-                if time_limit_seconds > 0 and elapsed >= time_limit_seconds:
-                    print("Time up!")
-                    sounds['lose'].play()
-                    game_state = STATE_LOST
-                    ambience_channel.stop()
-            if hint_path and current_ticks >= hint_timer_end:
-                hint_path = None
-                print("Hint expired.") # Hint Timer
-            if not ambience_channel.get_busy():
-                ambience_channel.play(sounds['ambience'], loops=-1) # Keep ambience playing
-
-        # --- Drawing ---
-        if screen: # Check if screen was initialized
-            # Base drawing (Maze and Player)
-            if game_state in [STATE_GENERATING, STATE_PLAYING, STATE_PAUSED, STATE_WON, STATE_LOST]:
-                player_coords = (player.x, player.y) if player else (0,0)
-                active_hint_path = hint_path if game_state == STATE_PLAYING and hint_path and current_ticks < hint_timer_end else None
-                if maze: maze.draw(screen, WALL_COLOR, START_COLOR, END_COLOR, player_coords, game_settings["fog_enabled"], fog_radius, frame_counter, active_hint_path, HINT_PATH_COLOR)
-                if player and game_state != STATE_GENERATING: player.draw(screen)
-
-            # Draw overlays / menus on top
+                        elif event.key == pygame.K_q:
+                            save_recording(False)
+                            running = False
+                    elif game_state in (STATE_WON, STATE_LOST):
+                        if event.key in (pygame.K_r, pygame.K_RETURN, pygame.K_SPACE):
+                            sounds['select'].play()
+                            time.sleep(0.05)
+                            start_new_game()
+                        elif event.key == pygame.K_m:
+                            cancel_jobs()
+                            game_state = STATE_MENU
+                            paused_from_state = None
+                            sounds['select'].play()
+                        elif event.key == pygame.K_ESCAPE:
+                            running = False
+
+            # --- Input Processing (Post-Event Loop) ---
+            # Handle state changes triggered by flags set in the event loop
+            if game_state == STATE_MENU and start_game_requested:
+                sounds['select'].play()
+                time.sleep(0.05)
+                start_new_game()
+                start_game_requested = False # Reset flag
+            profiler.mark("events")
+
+            # --- Game Logic ---
+            for kind, job, payload in drain(job_results): # Background jobs; stale ones (cancelled / replaced) are skipped
+                if job is gen_job:
+                    if kind == JOB_PROGRESS:
+                        gen_progress = payload
+                    elif kind == JOB_DONE:
+                        gen_job = None
+                        finish_generation(current_ticks)
+                    else:
+                        gen_job = None
+                        if kind == JOB_FAILED:
+                            print(f"Error generating maze: {payload}")
+                            game_state = STATE_MENU
+                elif job is field_job and kind != JOB_PROGRESS:
+                    field_job = None
+                    if kind == JOB_FAILED:
+                        print(f"Error building distance field: {payload}")
+                    else:
+                        log("Distance field complete.")
             if game_state == STATE_GENERATING:
-                if maze:
-                    maze.draw_generation_overlay(screen, VISITED_CELL_COLOR, CURRENT_CELL_MARKER_COLOR)
-                draw_text(screen, f"Generating ({game_settings['algorithm']})...", 24, SCREEN_WIDTH // 2, 10, COLOR_WHITE)
+                if not maze:
+                    game_state = STATE_MENU # Error case
+                elif gen_job is None and not maze.advance_generation(GEN_MODE_BUDGET_MS[game_settings["gen_mode"]]):
+                    finish_generation(current_ticks)
             elif game_state == STATE_PLAYING:
-                if game_settings['timer_enabled'] and time_limit_seconds > 0:
+                if hint_pending and maze.distance_field and maze.distance_field.reached((player.x, player.y)):
+                    hint_pending = False
+                    path = maze.distance_field.path((player.x, player.y), HINT_MAX_STEPS)
+                    if path:
+                        hint_path = path
+                        hint_timer_end = current_ticks + hint_duration_ms
+                        sounds['hint'].play()
+                        log(f"Hint found ({len(path)}). Show: {hint_duration_ms / 1000.0:.1f}s.")
+                    else:
+                        log("Hint path not found.")
+                if game_settings['timer_enabled']: # Timer Update
                     eff_start = timer_start_ticks + total_paused_time
                     elapsed = (current_ticks - eff_start) / 1000.0
-                    remaining = max(0, time_limit_seconds - elapsed)
-                    draw_text(screen, f"Time: {remaining:.1f}", 30, SCREEN_WIDTH - 10, 10, TIMER_COLOR, align="topright")
-                hint_text = "[H] Hint" if game_settings["hints_enabled"] else ""
-                draw_text(screen, hint_text, 20, 10, SCREEN_HEIGHT - 30, COLOR_GREY, align="topleft")
-                draw_text(screen, "[Esc] Pause", 20, SCREEN_WIDTH - 10, SCREEN_HEIGHT - 30, COLOR_GREY, align="topright")
-            elif game_state == STATE_PAUSED:
-                screen.blit(dim_surface, (0, 0))
-                draw_text(screen, "Paused", 60, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4, COLOR_WHITE)
-                draw_text(screen, "[R/Esc] Resume", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60, COLOR_WHITE)
-                draw_text(screen, "[S] Settings", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 10, COLOR_WHITE)
-                draw_text(screen, "[M] Main Menu", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40, COLOR_WHITE)
-                draw_text(screen, "[Q] Quit Game", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 90, COLOR_WHITE)
-            elif game_state == STATE_SETTINGS:
-                screen.fill(BACKGROUND_COLOR)
-                draw_text(screen, "Settings", 48, SCREEN_WIDTH // 2, 50, COLOR_WHITE)
-                y_pos = 120
-                option_gap = 40
-                for i, option_name in enumerate(SETTINGS_OPTIONS):
-                    prefix = "> " if i == settings_menu_selection_index else "  "
-                    text_color = COLOR_YELLOW if i == settings_menu_selection_index else COLOR_WHITE
-                    if option_name == "Difficulty":
-                        display_text = f"{prefix}Difficulty: [{game_settings['difficulty']}]"
-                    elif option_name == "Timer":
-                        status = "On" if game_settings['timer_enabled'] else "Off"
-                        display_text = f"{prefix}Timer: [{status}]"
-                        text_color = (COLOR_GREEN if game_settings['timer_enabled'] else COLOR_RED) if i != settings_menu_selection_index else COLOR_YELLOW
-                    elif option_name == "Fog of War":
-                        status = "On" if game_settings['fog_enabled'] else "Off"
-                        display_text = f"{prefix}Fog of War: [{status}]"
-                        text_color = (COLOR_GREEN if game_settings['fog_enabled'] else COLOR_RED) if i != settings_menu_selection_index else COLOR_YELLOW
-                    elif option_name == "Hints":
-                        status = "On" if game_settings['hints_enabled'] else "Off"
-                        display_text = f"{prefix}Hints: [{status}]"
-                        text_color = (COLOR_GREEN if game_settings['hints_enabled'] else COLOR_RED) if i != settings_menu_selection_index else COLOR_YELLOW
-                    elif option_name == "Algorithm":
-                        display_text = f"{prefix}Algorithm: [{game_settings['algorithm']}]"
-                    elif option_name == "Back":
-                        display_text = f"{prefix}Back to {'Pause Menu' if paused_from_state == STATE_PAUSED else 'Main Menu'}"
+                    if time_limit_seconds > 0 and elapsed >= time_limit_seconds:
+                        log("Time up!")
+                        sounds['lose'].play()
+                        game_state = STATE_LOST
+                        ambience_channel.stop()
+                        save_recording(False)
+                if hint_path and current_ticks >= hint_timer_end:
+                    hint_path = None
+                    log("Hint expired.") # Hint Timer
+                if not ambience_channel.get_busy():
+                    ambience_channel.play(sounds['ambience'], loops=-1) # Keep ambience playing
+            profiler.mark("generation") # Animated generation steps, background job results, timers
+
+            # --- Drawing ---
+            if screen: # Check if screen was initialized
+                dirty_rects = None # None = whole frame redrawn, flip; otherwise only these rects changed
+                sprite_rects = [] # Drawn over the maze this frame; repaired from the maze cache next frame
+                # Base drawing (Maze and Player)
+                if game_state in [STATE_GENERATING, STATE_PLAYING, STATE_PAUSED, STATE_WON, STATE_LOST]:
+                    player_coords = (player.x, player.y) if player else (0,0)
+                    active_hint_path = hint_path if game_state == STATE_PLAYING and hint_path and current_ticks < hint_timer_end else None
+                    if maze and game_state == STATE_PLAYING and last_drawn_state == STATE_PLAYING and maze.static_surface is not None:
+                        dirty_rects = maze.draw_dirty(screen, player_coords, game_settings["fog_enabled"], fog_radius, frame_counter, active_hint_path, HINT_PATH_COLOR, prev_sprite_rects)
+                    elif maze:
+                        maze.draw(screen, WALL_COLOR, START_COLOR, END_COLOR, player_coords, game_settings["fog_enabled"], fog_radius, frame_counter, active_hint_path, HINT_PATH_COLOR)
+                    if player and game_state != STATE_GENERATING: sprite_rects.append(player.draw(screen, maze.camera_offset()))
+
+                # Draw overlays / menus on top
+                if game_state == STATE_GENERATING:
+                    if maze:
+                        maze.draw_generation_overlay(screen, VISITED_CELL_COLOR, CURRENT_CELL_MARKER_COLOR)
+                    progress = f" {100 * gen_progress['done'] // gen_progress['total']}%" if gen_progress else ""
+                    draw_text(screen, f"Generating ({game_settings['algorithm']})...{progress}", 24, SCREEN_WIDTH // 2, 10, COLOR_WHITE, glyphs=bool(progress))
+                    draw_text(screen, "[Esc] Pause  [C] Cancel", 20, SCREEN_WIDTH // 2, SCREEN_HEIGHT - 30, COLOR_GREY)
+                elif game_state == STATE_PLAYING:
+                    if game_settings['timer_enabled'] and time_limit_seconds > 0:
+                        eff_start = timer_start_ticks + total_paused_time
+                        elapsed = (current_ticks - eff_start) / 1000.0
+                        remaining = max(0, time_limit_seconds - elapsed)
+                        sprite_rects.append(draw_text(screen, f"Time: {remaining:.1f}", 30, SCREEN_WIDTH - 10, 10, TIMER_COLOR, align="topright", glyphs=True))
+                    hint_text = "[H] Hint" if game_settings["hints_enabled"] and maze.distance_field else ""
+                    sprite_rects.append(draw_text(screen, hint_text, 20, 10, SCREEN_HEIGHT - 30, COLOR_GREY, align="topleft"))
+                    remaining_steps = maze.distance_field.distance((player.x, player.y)) if game_settings["hints_enabled"] and maze.distance_field else None
+                    if remaining_steps is not None:
+                        sprite_rects.append(draw_text(screen, f"Exit: {remaining_steps} steps", 20, 100, SCREEN_HEIGHT - 30, COLOR_GREY, align="topleft", glyphs=True))
+                    if maze.endless:
+                        sprite_rects.append(draw_text(screen, f"Depth: {player.y}", 20, 10, SCREEN_HEIGHT - 30, COLOR_GREY, align="topleft", glyphs=True))
+                    sprite_rects.append(draw_text(screen, "[Esc] Pause", 20, SCREEN_WIDTH - 10, SCREEN_HEIGHT - 30, COLOR_GREY, align="topright"))
+                elif game_state == STATE_PAUSED:
+                    screen.blit(dim_surface, (0, 0))
+                    draw_text(screen, "Paused", 60, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4, COLOR_WHITE)
+                    if maze and maze.seed is not None:
+                        draw_text(screen, f"Seed {maze.seed}", 20, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4 + 45, COLOR_GREY)
+                    draw_text(screen, "[R/Esc] Resume", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60, COLOR_WHITE)
+                    draw_text(screen, "[S] Settings", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 10, COLOR_WHITE)
+                    draw_text(screen, "[M] Main Menu", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40, COLOR_WHITE)
+                    draw_text(screen, "[Q] Quit Game", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 90, COLOR_WHITE)
+                elif game_state == STATE_SETTINGS:
+                    screen.fill(BACKGROUND_COLOR)
+                    draw_text(screen, "Settings", 48, SCREEN_WIDTH // 2, 50, COLOR_WHITE)
+                    y_pos = 120
+                    option_gap = 40
+                    for i, option_name in enumerate(SETTINGS_OPTIONS):
+                        prefix = "> " if i == settings_menu_selection_index else "  "
+                        text_color = COLOR_YELLOW if i == settings_menu_selection_index else COLOR_WHITE
+                        if option_name == "Difficulty":
+                            display_text = f"{prefix}Difficulty: [{game_settings['difficulty']}]"
+                        elif option_name == "Timer":
+                            status = "On" if game_settings['timer_enabled'] else "Off"
+                            display_text = f"{prefix}Timer: [{status}]"
+                            text_color = (COLOR_GREEN if game_settings['timer_enabled'] else COLOR_RED) if i != settings_menu_selection_index else COLOR_YELLOW
+                        elif option_name == "Fog of War":
+                            status = "On" if game_settings['fog_enabled'] else "Off"
+                            display_text = f"{prefix}Fog of War: [{status}]"
+                            text_color = (COLOR_GREEN if game_settings['fog_enabled'] else COLOR_RED) if i != settings_menu_selection_index else COLOR_YELLOW
+                        elif option_name == "Hints":
+                            status = "On" if game_settings['hints_enabled'] else "Off"
+                            display_text = f"{prefix}Hints: [{status}]"
+                            text_color = (COLOR_GREEN if game_settings['hints_enabled'] else COLOR_RED) if i != settings_menu_selection_index else COLOR_YELLOW
+                        elif option_name == "Algorithm":
+                            display_text = f"{prefix}Algorithm: [{game_settings['algorithm']}]"
+                        elif option_name == "Generation":
+                            display_text = f"{prefix}Generation: [{game_settings['gen_mode']}]"
+                        elif option_name == "Back":
+                            display_text = f"{prefix}Back to {'Pause Menu' if settings_return_state == STATE_PAUSED else 'Main Menu'}"
+                            y_pos += option_gap
+                        else:
+                            display_text = f"{prefix}{option_name}"
+                        draw_text(screen, display_text, 30, SCREEN_WIDTH // 2, y_pos, text_color)
                         y_pos += option_gap
-                    else:
-                        display_text = f"{prefix}{option_name}"
-                    draw_text(screen, display_text, 30, SCREEN_WIDTH // 2, y_pos, text_color)
-                    y_pos += option_gap
-                draw_text(screen, "(Arrows: Nav / Enter,Left,Right: Change)", 22, SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50, COLOR_GREY)
-            elif game_state == STATE_WON:
-                draw_text(screen, "-- You Win! --", 74, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3, COLOR_GREEN)
-                draw_text(screen, "[Enter/Space/R] Play Again", 30, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, COLOR_WHITE)
-                draw_text(screen, "[M] Main Menu  [Esc] Quit", 24, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40, COLOR_WHITE)
-            elif game_state == STATE_LOST:
-                draw_text(screen, "-- Time's Up! --", 74, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3, COLOR_RED)
-                draw_text(screen, "[Enter/Space/R] Try Again", 30, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, COLOR_WHITE)
-                draw_text(screen, "[M] Main Menu  [Esc] Quit", 24, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40, COLOR_WHITE)
-            elif game_state == STATE_MENU:
-                draw_text(screen, "Maze Runner", 64, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4, COLOR_WHITE)
-                draw_text(screen, "[Enter/Space] Start Game", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, COLOR_WHITE)
-                draw_text(screen, "[S] Settings", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50, COLOR_WHITE)
-                draw_text(screen, "[Esc] Quit", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100, COLOR_WHITE)
-
-            # Update Display
-            print(f"Drawing State: {game_state} - Flipping display...") # DIAGNOSTIC PRINT
-            pygame.display.flip() # Make drawn frame visible
-        else:
-            print("Error: Screen surface not available for drawing.")
-            running = False # Stop loop if screen is gone
-
-except Exception as e:
-    # Catch any unexpected error during the main loop
-    print("\n--- UNEXPECTED ERROR IN MAIN LOOP ---")
-    print(f"Error Type: {type(e).__name__}")
-    print(f"Error Message: {e}")
-    import traceback
-    traceback.print_exc() # Print detailed traceback
-    print("------------------------------------")
-    running = False # Ensure loop exits on error
-
-# --- Cleanup ---
-print("Exiting...")
-# Stop mixer first to avoid potential hangs
-if pygame.mixer.get_init():
-    print(" Quitting Mixer...")
-    pygame.mixer.quit()
-# Quit other modules
-if pygame.font.get_init():
-    print(" Quitting Font...")
-    pygame.font.quit()
-print(" Quitting Pygame Core...")
-pygame.quit()
-print(" Exiting Script.")
-sys.exit()
+                    draw_text(screen, "(Arrows: Nav / Enter,Left,Right: Change)", 22, SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50, COLOR_GREY)
+                elif game_state == STATE_WON:
+                    draw_text(screen, "-- You Win! --", 74, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3, COLOR_GREEN)
+                    draw_text(screen, "[Enter/Space/R] Play Again", 30, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, COLOR_WHITE)
+                    draw_text(screen, "[M] Main Menu  [Esc] Quit", 24, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40, COLOR_WHITE)
+                elif game_state == STATE_LOST:
+                    draw_text(screen, "-- Time's Up! --", 74, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3, COLOR_RED)
+                    draw_text(screen, "[Enter/Space/R] Try Again", 30, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, COLOR_WHITE)
+                    draw_text(screen, "[M] Main Menu  [Esc] Quit", 24, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40, COLOR_WHITE)
+                elif game_state == STATE_MENU:
+                    draw_text(screen, "Maze Runner", 64, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4, COLOR_WHITE)
+                    draw_text(screen, "[Enter/Space] Start Game", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, COLOR_WHITE)
+                    draw_text(screen, "[S] Settings", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50, COLOR_WHITE)
+                    draw_text(screen, "[Esc] Quit", 36, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100, COLOR_WHITE)
+
+                if profile_hud:
+                    sprite_rects.extend(profiler.draw_hud(screen))
+                profiler.mark("draw") # Maze, fog and overlays; draw_text time is charged to "text"
+
+                # Update Display
+                if game_state != last_drawn_state:
+                    log(f"Drawing State: {game_state}")
+                sprite_rects = [r for r in sprite_rects if r]
+                if dirty_rects is None:
+                    pygame.display.flip() # Make drawn frame visible
+                else:
+                    pygame.display.update(dirty_rects + sprite_rects) # Only the changed rects
+                prev_sprite_rects = sprite_rects
+                last_drawn_state = game_state
+                profiler.mark("flip")
+                profiler.end_frame(game_state)
+            else:
+                print("Error: Screen surface not available for drawing.")
+                running = False # Stop loop if screen is gone
+
+    except Exception as e:
+        # Catch any unexpected error during the main loop
+        print("\n--- UNEXPECTED ERROR IN MAIN LOOP ---")
+        print(f"Error Type: {type(e).__name__}")
+        print(f"Error Message: {e}")
+        import traceback
+        traceback.print_exc() # Print detailed traceback
+        print("------------------------------------")
+        running = False # Ensure loop exits on error
+
+    # --- Cleanup ---
+    cancel_jobs()
+    if profiler.frame:
+        for name, p in profiler.summary().items():
+            log(f"Frame {name}: p50 {p['p50']:.2f} ms, p95 {p['p95']:.2f} ms, p99 {p['p99']:.2f} ms, max {p['max']:.2f} ms (last {len(profiler.history[name])} frames)")
+    profiler.close()
+    log("Exiting...")
+    # Stop mixer first to avoid potential hangs
+    if pygame.mixer.get_init():
+        log(" Quitting Mixer...")
+        pygame.mixer.quit()
+    # Quit other modules
+    if pygame.font.get_init():
+        log(" Quitting Font...")
+        _fonts.clear(); _text_cache.clear() # Fonts are invalid once the module quits
+        pygame.font.quit()
+    log(" Quitting Pygame Core...")
+    pygame.quit()
+    log(" Exiting Script.")
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description=WINDOW_TITLE)
+    parser.add_argument('--level', metavar='PATH', help="play a saved .maze file instead of generating mazes")
+    parser.add_argument('--seed', type=int, help="seed for the first maze (same seed and settings = same maze)")
+    parser.add_argument('--record', metavar='DIR', help="save each finished run's moves here for python -m maze_engine.replay")
+    parser.add_argument('--profile', action='store_true', help=f"show the frame-time overlay from the start ({pygame.key.name(PROFILE_HUD_KEY).upper()} toggles it)")
+    parser.add_argument('--profile-trace', metavar='PATH', help="write per-frame phase timings to PATH (.csv, or .json with a summary)")
+    parser.add_argument('--quiet', action='store_true', help="no console logging")
+    args = parser.parse_args()
+    main(args.level, args.seed, args.record, args.profile, args.profile_trace, args.quiet)
+    sys.exit()